@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Network Monitor API Cache Proxy
+Reverse proxy in front of uhttpd that collapses concurrent identical API
+GETs into one CGI run, serves the answer for a short TTL (then stale while
+it revalidates) with an ETag for If-None-Match, and passes POST actions
+through, dropping the cached answers they change
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from api_probe import ConnectionPool, ProbeError
+from netmon_daemon import (CGI_TIMEOUT, body_etag, etag_matches, json_body, keep_alive_requested, read_request,
+                           write_response)
+
+CACHED_PATHS = ("/cgi-bin/advanced-api.sh", "/cgi-bin/netmon-api.sh", "/cgi-bin/netmon-api.lua")
+CACHED_ACTIONS = ("get_devices", "get_websites", "get_speed_history")
+# POST action -> cached actions whose answers it changes
+INVALIDATES = {
+    "set_speed_limit": ("get_devices",),
+    "block_device": ("get_devices",),
+}
+STATS_PATH = "/netmon-proxy/stats"
+DEFAULT_TTL = 2.0  # below the dashboard's 5 s poll, so every poll sees an answer at most this old
+DEFAULT_STALE = 10.0
+
+FORWARD_HEADERS = ("content-type", "accept", "user-agent")
+HOP_BY_HOP = ("connection", "keep-alive", "proxy-connection", "transfer-encoding", "content-length")
+STAT_KEYS = ("requests", "hit", "stale", "coalesced", "miss", "passthrough", "upstream", "upstream_errors",
+             "invalidations", "not_modified")
+
+
+def cache_key(request):
+    """(path, action, query in a stable order) for a cacheable GET, otherwise None"""
+    if request["method"] != "GET" or request["path"] not in CACHED_PATHS:
+        return None
+    query = parse_qsl(request["query"], keep_blank_values=True)
+    action = dict(query).get("action")
+    if action not in CACHED_ACTIONS:
+        return None
+    return request["path"], action, urlencode(sorted(query))
+
+
+def post_action(request):
+    """The action of a POST, taken from the JSON body like advanced-api.sh does"""
+    try:
+        params = json.loads(request["body"] or b"{}")
+    except ValueError:
+        params = {}
+    if isinstance(params, dict) and params.get("action"):
+        return params["action"]
+    return dict(parse_qsl(request["query"])).get("action")
+
+
+def header_name(name):
+    return "-".join(part.capitalize() for part in name.split("-"))
+
+
+def header_value(headers, name):
+    return next((value for key, value in headers if key.lower() == name), None)
+
+
+class CacheProxy:
+    """Single-flight cache for the dashboard's polling GETs; everything else goes straight upstream"""
+
+    def __init__(self, upstream_host, upstream_port=80, host="0.0.0.0", port=8090, ttl=DEFAULT_TTL,
+                 stale=DEFAULT_STALE, connections=4, timeout=CGI_TIMEOUT):
+        self.upstream_host = upstream_host
+        self.upstream_port = upstream_port
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.stale = stale
+        self.connections = connections
+        self.timeout = timeout
+        self.entries = {}   # key -> response dict plus "stored" (monotonic)
+        self.inflight = {}  # key -> task running the one upstream request for it
+        self.generation = {}  # action -> bumped by each invalidating POST
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        self.pool = None
+        self.server = None
+
+    # -- upstream ---------------------------------------------------------
+
+    async def forward(self, request, conditional=True):
+        """Send the request to uhttpd as is; upstream failures become a 502"""
+        forwarded = FORWARD_HEADERS + ("if-none-match",) if conditional else FORWARD_HEADERS
+        headers = {header_name(name): value for name, value in request["headers"].items() if name in forwarded}
+        body = request["body"] if request["body"] or request["method"] == "POST" else None
+        try:
+            response = await self.pool.request(request["method"], request["target"], body, headers)
+        except (ProbeError, OSError, asyncio.TimeoutError) as e:
+            self.stats["upstream_errors"] += 1
+            return {"status": 502, "headers": [("Content-Type", "text/plain")],
+                    "body": f"Upstream error: {e or type(e).__name__}".encode()}
+        return {
+            "status": response["status"],
+            "headers": [(header_name(name), value) for name, value in response["headers"].items()
+                        if name not in HOP_BY_HOP],
+            "body": response["body"],
+        }
+
+    async def fetch(self, key, request):
+        """One upstream run for key; a 200 is stored unless a POST invalidated the action meanwhile"""
+        generation = self.generation.get(key[1], 0)
+        self.stats["upstream"] += 1
+        # The answer is shared, so it is fetched unconditionally whatever the first client sent
+        response = await self.forward(request, conditional=False)
+        if response["status"] == 200:
+            if header_value(response["headers"], "etag") is None:
+                # The CGI scripts send no validator; one from the body still spares clients the download
+                response["headers"].append(("ETag", body_etag(response["body"])))
+                if header_value(response["headers"], "cache-control") is None:
+                    response["headers"].append(("Cache-Control", "no-cache"))
+            if self.generation.get(key[1], 0) == generation:
+                self.entries[key] = dict(response, stored=time.monotonic())
+        return response
+
+    def flight(self, key, request):
+        """The running upstream request for key, starting one if there is none"""
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self.fetch(key, request))
+            self.inflight[key] = task
+
+            def landed(_):
+                if self.inflight.get(key) is task:
+                    del self.inflight[key]
+            task.add_done_callback(landed)
+        return task
+
+    # -- cache ------------------------------------------------------------
+
+    async def lookup(self, key, request):
+        """Returns (response, X-Cache state, age in seconds)"""
+        entry = self.entries.get(key)
+        if entry:
+            age = time.monotonic() - entry["stored"]
+            if age < self.ttl:
+                return entry, "HIT", age
+            if age < self.ttl + self.stale:
+                # Answer now and let one background run bring the entry up to date
+                self.flight(key, request)
+                return entry, "STALE", age
+        state = "COALESCED" if key in self.inflight else "MISS"
+        # shield: a client hanging up must not cancel the run other clients are waiting on
+        response = await asyncio.shield(self.flight(key, request))
+        return response, state, 0.0
+
+    def invalidate(self, action):
+        """Drop the cached answers a POST action changes; runs already in flight will not be stored"""
+        for affected in INVALIDATES.get(action, ()):
+            self.generation[affected] = self.generation.get(affected, 0) + 1
+            for key in [k for k in self.entries if k[1] == affected]:
+                del self.entries[key]
+            for key in [k for k in self.inflight if k[1] == affected]:
+                del self.inflight[key]
+            self.stats["invalidations"] += 1
+
+    def snapshot_stats(self):
+        stats = dict(self.stats, entries=len(self.entries), ttl_s=self.ttl, stale_s=self.stale)
+        cached = stats["requests"] - stats["passthrough"]
+        stats["cacheable"] = cached
+        stats["upstream_per_cacheable"] = round(stats["upstream"] / cached, 4) if cached else None
+        return stats
+
+    # -- serving ----------------------------------------------------------
+
+    async def dispatch(self, request):
+        if request["path"] == STATS_PATH:
+            return 200, [("Content-Type", "application/json")], json_body(self.snapshot_stats())
+        self.stats["requests"] += 1
+        key = cache_key(request)
+        if key is None:
+            self.stats["passthrough"] += 1
+            response = await self.forward(request)
+            if request["method"] == "POST":
+                self.invalidate(post_action(request))
+            return response["status"], response["headers"], response["body"]
+
+        response, state, age = await self.lookup(key, request)
+        self.stats[state.lower()] += 1
+        headers = response["headers"] + [("X-Cache", state), ("Age", str(int(age)))]
+        if response["status"] == 200 and etag_matches(request["headers"].get("if-none-match"),
+                                                       header_value(response["headers"], "etag")):
+            self.stats["not_modified"] += 1
+            return 304, headers, b""
+        return response["status"], headers, response["body"]
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    await write_response(writer, 400, [("Content-Type", "text/plain")], b"Bad Request", False)
+                    break
+                if request is None:
+                    break
+                keep_alive = keep_alive_requested(request)
+                status, headers, body = await self.dispatch(request)
+                await write_response(writer, status, headers, body, keep_alive, request["method"] == "HEAD")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    # -- lifecycle --------------------------------------------------------
+
+    async def start(self):
+        self.pool = ConnectionPool(self.upstream_host, self.upstream_port, size=self.connections,
+                                   timeout=self.timeout)
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in list(self.inflight.values()):
+            task.cancel()
+        if self.pool:
+            await self.pool.close()
+
+
+def print_proxy_stats(stats, indent=""):
+    print(f"{indent}📊 {stats['cacheable']} API GETs answered with {stats['upstream']} CGI runs "
+          f"(hit {stats['hit']}, stale {stats['stale']}, coalesced {stats['coalesced']}, miss {stats['miss']}); "
+          f"{stats['passthrough']} requests passed through, {stats['not_modified']} answered 304")
+    if stats["upstream_errors"] or stats["invalidations"]:
+        print(f"{indent}   {stats['upstream_errors']} upstream errors, {stats['invalidations']} invalidations")
+
+
+async def serve(args):
+    upstream = urlsplit(args.upstream)
+    proxy = CacheProxy(upstream.hostname, upstream.port or 80, args.host, args.port, args.ttl, args.stale,
+                       args.connections)
+    await proxy.start()
+    print(f"🚀 Network Monitor cache proxy listening on {args.host}:{proxy.port} -> {args.upstream}")
+    print(f"🗄️ API GETs cached for {args.ttl:g} s, then served stale for up to {args.stale:g} s while refreshing")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), args.stats_interval or None)
+        except asyncio.TimeoutError:
+            print_proxy_stats(proxy.snapshot_stats())
+    await proxy.stop()
+    print_proxy_stats(proxy.snapshot_stats())
+    print("🏁 Proxy stopped")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Single-flight caching proxy for the Network Monitor CGI API")
+    parser.add_argument("--upstream", default="http://127.0.0.1:8080", help="uhttpd serving the CGI scripts")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Seconds an API answer is served as fresh")
+    parser.add_argument("--stale", type=float, default=DEFAULT_STALE,
+                        help="Further seconds it is served stale while one request refreshes it")
+    parser.add_argument("--connections", type=int, default=4, help="Keep-alive connections to the upstream")
+    parser.add_argument("--stats-interval", type=float, default=0, help="Print hit/upstream counts every N s")
+    args = parser.parse_args()
+    if args.ttl < 0 or args.stale < 0:
+        print("❌ --ttl and --stale must not be negative")
+        return 1
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Network Monitor API Probe Engine
+Checks CGI endpoints concurrently over pooled keep-alive HTTP connections
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+# (path, expects JSON body)
+DEFAULT_ENDPOINTS = [
+    ("/cgi-bin/netmon-api.sh?action=get_devices", True),
+    ("/cgi-bin/netmon-api.lua?action=get_devices", True),
+    ("/cgi-bin/advanced-api.sh?action=get_devices", True),
+    ("/cgi-bin/test.sh", False),
+]
+DEVICES_PATH = "/cgi-bin/advanced-api.sh?action=get_devices"
+# Safe to send again on a fresh connection when a kept-alive one turns out to be closed
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class ProbeError(Exception):
+    """Raised when an HTTP exchange cannot be completed"""
+
+
+class ConnectionPool:
+    """Small pool of persistent HTTP/1.1 connections to a single host"""
+
+    def __init__(self, host, port=80, size=4, timeout=10.0):
+        self.host = host
+        self.port = int(port)
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def _connect(self):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        self.opened += 1
+        return reader, writer
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send one request and return a response dict"""
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._connect()
+            try:
+                response = await self._send(conn, method, path, body, headers)
+            except ProbeError as e:
+                # A timeout is the server being slow, not a stale connection, and a POST
+                # may already have been acted on; neither is sent twice
+                if (not reused or isinstance(e.__cause__, asyncio.TimeoutError)
+                        or method.upper() not in IDEMPOTENT_METHODS):
+                    raise
+                response = None
+            if response is None:
+                # Idle keep-alive connection was closed by the server, retry fresh
+                conn = await self._connect()
+                reused = False
+                response = await self._send(conn, method, path, body, headers)
+
+            response["connection_reused"] = reused
+            if response["keep_alive"]:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return response
+
+    async def _send(self, conn, method, path, body, headers):
+        """One exchange on conn; the connection is closed if it fails, and a broken,
+        timed-out or unparseable exchange is raised as ProbeError"""
+        try:
+            return await asyncio.wait_for(self._exchange(conn, method, path, body, headers), self.timeout)
+        except (ProbeError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+            conn[1].close()
+            if isinstance(e, ProbeError):
+                raise
+            raise ProbeError(str(e) or type(e).__name__) from e
+        except BaseException:
+            conn[1].close()
+            raise
+
+    async def _exchange(self, conn, method, path, body, headers):
+        reader, writer = conn
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            "Accept: */*",
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+        started = time.perf_counter()
+        writer.write(raw)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ProbeError("connection closed before response")
+        first_byte = time.perf_counter()
+
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ProbeError(f"malformed status line: {status_line[:60]!r}")
+        version, status = parts[0], int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        connection = response_headers.get("connection", "").lower()
+        keep_alive = connection != "close" and not (version == "HTTP/1.0" and connection != "keep-alive")
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            payload = b""
+        elif "chunked" in response_headers.get("transfer-encoding", "").lower():
+            payload = await self._read_chunked(reader)
+        elif "content-length" in response_headers:
+            payload = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            payload = await reader.read()
+            keep_alive = False
+
+        return {
+            "status": status,
+            "reason": reason,
+            "headers": response_headers,
+            "body": payload,
+            "ttfb_ms": (first_byte - started) * 1000,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "keep_alive": keep_alive,
+        }
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                # Skip trailers
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+def classify_response(response, expect_json=True):
+    """Decide pass/fail from status code, headers and body"""
+    result = {
+        "status": response["status"],
+        "content_type": response["headers"].get("content-type", ""),
+        "bytes": len(response["body"]),
+        "latency_ms": round(response["latency_ms"], 2),
+        "ttfb_ms": round(response["ttfb_ms"], 2),
+        "connection_reused": response.get("connection_reused", False),
+        "json_valid": None,
+        "api_success": None,
+        "ok": False,
+        "error": None,
+    }
+
+    # Per-request cost attributed by an instrumented router emulator
+    cost = {name[len("x-netmon-"):].replace("-", "_"): value
+            for name, value in response["headers"].items() if name.startswith("x-netmon-")}
+    if cost:
+        result["server_cost"] = cost
+
+    if response["status"] != 200:
+        result["error"] = f"HTTP {response['status']} {response['reason']}".strip()
+        return result
+
+    text = response["body"].decode("utf-8", errors="replace")
+    if not expect_json:
+        result["ok"] = bool(text.strip())
+        if not result["ok"]:
+            result["error"] = "Empty response body"
+        return result
+
+    try:
+        data = json.loads(text)
+        result["json_valid"] = True
+    except ValueError as e:
+        result["json_valid"] = False
+        result["error"] = f"Invalid JSON: {e}"
+        return result
+
+    result["api_success"] = bool(isinstance(data, dict) and data.get("success"))
+    if "json" not in result["content_type"]:
+        result["error"] = f"Unexpected Content-Type: {result['content_type'] or 'missing'}"
+    elif not result["api_success"]:
+        result["error"] = (data.get("error") if isinstance(data, dict) else None) or "success flag not set"
+    else:
+        result["ok"] = True
+    return result
+
+
+async def probe_endpoints_async(base_url, endpoints=None, connections=4, timeout=10.0, rounds=1):
+    """Probe all endpoints concurrently, optionally for several rounds"""
+    parts = urlsplit(base_url)
+    pool = ConnectionPool(parts.hostname, parts.port or 80, size=connections, timeout=timeout)
+    prefix = parts.path.rstrip("/")
+    sweep_started = time.perf_counter()
+
+    async def probe(path, expect_json, round_index):
+        url = f"{parts.scheme}://{parts.netloc}{prefix}{path}"
+        started = time.perf_counter()
+        entry = {"url": url, "path": path, "round": round_index,
+                 "offset_ms": round((started - sweep_started) * 1000, 2)}
+        try:
+            response = await pool.request("GET", prefix + path)
+            entry.update(classify_response(response, expect_json))
+        except (ProbeError, OSError, asyncio.TimeoutError) as e:
+            entry.update({"status": None, "ok": False, "error": str(e) or type(e).__name__})
+        # Wall time including the wait for a pooled connection, unlike latency_ms
+        entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return entry
+
+    results = []
+    try:
+        for round_index in range(rounds):
+            results.extend(await asyncio.gather(*(
+                probe(path, expect_json, round_index)
+                for path, expect_json in (endpoints or DEFAULT_ENDPOINTS)
+            )))
+    finally:
+        await pool.close()
+    return results
+
+
+def probe_endpoints(base_url, endpoints=None, connections=4, timeout=10.0, rounds=1):
+    """Synchronous wrapper around probe_endpoints_async"""
+    return asyncio.run(probe_endpoints_async(base_url, endpoints, connections, timeout, rounds))
+
+
+def print_probe_results(results, indent=""):
+    """Print one status line per probe"""
+    for entry in results:
+        icon = "✅" if entry["ok"] else "❌"
+        status = entry.get("status") or "---"
+        latency = f"{entry['latency_ms']:.1f} ms" if "latency_ms" in entry else "n/a"
+        line = f"{indent}{icon} [{status}] {entry['url']} - {latency}"
+        if entry.get("error"):
+            line += f" ({entry['error']})"
+        if entry.get("server_cost"):
+            cost = entry["server_cost"]
+            line += f" [server: {cost.get('cpu_ms')} ms CPU, {cost.get('processes')} processes, {cost.get('execs')} execs]"
+        print(line)
+
+
+async def check_conditional_async(base_url, path=DEVICES_PATH, polls=3, interval=2.5, timeout=10.0):
+    """Poll path three ways, plain, with If-None-Match and with since=<version>, and compare body bytes"""
+    parts = urlsplit(base_url)
+    target = parts.path.rstrip("/") + path
+    pool = ConnectionPool(parts.hostname, parts.port or 80, size=1, timeout=timeout)
+    result = {"url": f"{parts.scheme}://{parts.netloc}{target}", "polls": 0, "etag": False, "versioned": False,
+              "full_bytes": 0, "not_modified": 0, "conditional_bytes": 0, "deltas": 0, "delta_bytes": 0,
+              "error": None}
+    try:
+        first = await pool.request("GET", target)
+        if first["status"] != 200:
+            raise ProbeError(f"HTTP {first['status']} {first['reason']}".strip())
+        etag = first["headers"].get("etag")
+        data = json.loads(first["body"])
+        version = data.get("version") if isinstance(data, dict) else None
+        result["etag"], result["versioned"] = bool(etag), bool(version)
+
+        for _ in range(polls):
+            await asyncio.sleep(interval)
+            full = await pool.request("GET", target)
+            result["full_bytes"] += len(full["body"])
+            if etag:
+                conditional = await pool.request("GET", target, headers={"If-None-Match": etag})
+                if conditional["status"] == 304:
+                    result["not_modified"] += 1
+                else:
+                    etag = conditional["headers"].get("etag", etag)
+                result["conditional_bytes"] += len(conditional["body"])
+            if version:
+                delta = await pool.request("GET", f"{target}&since={quote(version)}")
+                data = json.loads(delta["body"])
+                result["deltas"] += int(bool(data.get("delta")))
+                result["delta_bytes"] += len(delta["body"])
+                version = data.get("version") or version
+            result["polls"] += 1
+    except (ProbeError, OSError, asyncio.TimeoutError, ValueError) as e:
+        result["error"] = str(e) or type(e).__name__
+    finally:
+        await pool.close()
+
+    polls, full = result["polls"], result["full_bytes"]
+    result["not_modified_rate"] = round(result["not_modified"] / polls, 3) if polls and result["etag"] else None
+    result["conditional_saving"] = round(1 - result["conditional_bytes"] / full, 3) \
+        if full and result["etag"] else None
+    result["delta_saving"] = round(1 - result["delta_bytes"] / full, 3) if full and result["versioned"] else None
+    return result
+
+
+def check_conditional(base_url, path=DEVICES_PATH, polls=3, interval=2.5, timeout=10.0):
+    """Synchronous wrapper around check_conditional_async"""
+    return asyncio.run(check_conditional_async(base_url, path, polls, interval, timeout))
+
+
+def print_conditional_results(result, indent=""):
+    """Print 304 rate and body bytes saved by conditional and delta polling"""
+    if result["error"]:
+        print(f"{indent}❌ {result['url']}: {result['error']}")
+        return
+    print(f"{indent}📦 {result['polls']} polls of {result['url']}: {result['full_bytes']:,} body bytes unconditionally")
+    if result["etag"]:
+        print(f"{indent}{'✅' if result['not_modified'] else '⚠️'} If-None-Match: {result['not_modified']}/"
+              f"{result['polls']} answered 304, {result['conditional_bytes']:,} bytes "
+              f"({result['conditional_saving']:.0%} saved)")
+    else:
+        print(f"{indent}⚠️ No ETag; conditional GETs cannot be answered with 304")
+    if result["versioned"]:
+        print(f"{indent}✅ Deltas (since=version): {result['deltas']}/{result['polls']}, "
+              f"{result['delta_bytes']:,} bytes ({result['delta_saving']:.0%} saved)")
+    else:
+        print(f"{indent}ℹ️ No device list version; delta polling unavailable")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Probe Network Monitor CGI endpoints")
+    parser.add_argument("base_url", nargs="?", default="http://192.168.1.1:8080")
+    parser.add_argument("--rounds", type=int, default=1, help="Number of sweeps over the same pool")
+    parser.add_argument("--connections", type=int, default=4, help="Keep-alive pool size")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--conditional", action="store_true",
+                        help="Also check ETag/304 and since= delta polling of get_devices")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = probe_endpoints(args.base_url, connections=args.connections,
+                              timeout=args.timeout, rounds=args.rounds)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    conditional = check_conditional(args.base_url, timeout=args.timeout) if args.conditional else None
+
+    if args.json:
+        print(json.dumps({"elapsed_ms": round(elapsed_ms, 2), "results": results, "conditional": conditional},
+                         indent=2))
+    else:
+        print(f"🔌 Probing API endpoints at {args.base_url}")
+        print_probe_results(results, "   ")
+        print(f"⏱️ Sweep finished in {elapsed_ms:.1f} ms")
+        if conditional:
+            print_conditional_results(conditional, "   ")
+
+    return 0 if all(entry["ok"] for entry in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Neighbour Watcher
+Snapshots /proc/net/arp, diffs it against the previous snapshot in linear
+time (added, removed and changed IP/MAC/interface/flags) and keeps each
+neighbour's first-seen and last-seen times in memory
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ARP_PATH = "/proc/net/arp"
+INCOMPLETE_MAC = "00:00:00:00:00:00"
+ENTRY_FIELDS = ("hw_type", "flags", "mac", "device")
+
+
+def parse_arp(text):
+    """{(ip, interface): (hw_type, flags, mac, interface)} from /proc/net/arp text"""
+    table = {}
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) >= 6:
+            table[(fields[0], fields[5])] = (fields[1], fields[2], fields[3], fields[5])
+    return table
+
+
+def diff_tables(old, new):
+    """Keys added, changed and removed between two parsed tables; one pass over each"""
+    added, changed = [], []
+    for key, value in new.items():
+        previous = old.get(key)
+        if previous is None:
+            added.append(key)
+        elif previous != value:
+            changed.append(key)
+    removed = [key for key in old if key not in new]
+    return added, changed, removed
+
+
+def delta_size(delta):
+    return len(delta["added"]) + len(delta["changed"]) + len(delta["removed"])
+
+
+class NeighbourTable:
+    """The neighbour table as of the last scan; scan() returns only what changed since the one before"""
+
+    def __init__(self, path=ARP_PATH, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.table = {}
+        self.first_seen = {}
+        self.scanned_at = None
+        self.scans = 0
+        self._raw = None
+        self._lock = threading.Lock()
+
+    def entry(self, key, value=None, last_seen=None):
+        hw_type, flags, mac, device = value or self.table[key]
+        return {"ip": key[0], "mac": mac, "device": device, "flags": flags, "hw_type": hw_type,
+                "first_seen": self.first_seen.get(key),
+                "last_seen": last_seen if last_seen is not None else self.scanned_at}
+
+    def entries(self, complete_only=True):
+        """Current neighbours; complete_only skips the unresolved ones, like the CGI scripts do"""
+        with self._lock:
+            return [self.entry(key, value) for key, value in self.table.items()
+                    if not complete_only or value[2] != INCOMPLETE_MAC]
+
+    def scan(self, now=None):
+        """Read the table and return {"added", "changed", "removed"} relative to the previous scan
+
+        An unreadable table leaves the last snapshot in place rather than
+        reporting every neighbour as gone.
+        """
+        now = self.clock() if now is None else now
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return {"scanned_at": now, "added": [], "changed": [], "removed": []}
+
+        with self._lock:
+            previous_scan = self.scanned_at
+            self.scanned_at = now
+            self.scans += 1
+            if raw == self._raw:
+                # Byte-identical: nothing to parse, every neighbour was simply seen again
+                return {"scanned_at": now, "added": [], "changed": [], "removed": []}
+
+            table = parse_arp(raw.decode("ascii", errors="replace"))
+            old = self.table
+            added, changed, removed = diff_tables(old, table)
+            for key in added:
+                self.first_seen[key] = now
+            gone = [self.entry(key, old[key], previous_scan) for key in removed]
+            for key in removed:
+                del self.first_seen[key]
+            self.table = table
+            self._raw = raw
+
+            changes = []
+            for key in changed:
+                entry = self.entry(key, table[key])
+                entry["previous"] = {field: before
+                                     for field, before, after in zip(ENTRY_FIELDS, old[key], table[key])
+                                     if before != after}
+                changes.append(entry)
+            return {"scanned_at": now, "added": [self.entry(key, table[key]) for key in added],
+                    "changed": changes, "removed": gone}
+
+
+def print_delta(delta, indent=""):
+    stamp = time.strftime("%H:%M:%S", time.localtime(delta["scanned_at"]))
+    for entry in delta["added"]:
+        print(f"{indent}{stamp} ➕ {entry['ip']:<16} {entry['mac']} on {entry['device']} (flags {entry['flags']})")
+    for entry in delta["changed"]:
+        what = ", ".join(f"{field} {before} -> {entry[field]}" for field, before in entry["previous"].items())
+        print(f"{indent}{stamp} 🔁 {entry['ip']:<16} {what}")
+    for entry in delta["removed"]:
+        print(f"{indent}{stamp} ➖ {entry['ip']:<16} {entry['mac']} on {entry['device']}")
+
+
+def arp_text(rows):
+    """/proc/net/arp text for (ip, flags, mac, device) rows"""
+    lines = ["IP address       HW type     Flags       HW address            Mask     Device"]
+    lines += [f"{ip:<16} 0x1         {flags:<11} {mac}     *        {device}" for ip, flags, mac, device in rows]
+    return "\n".join(lines) + "\n"
+
+
+def bench_rows(count, churn, generation):
+    """count neighbours; from generation 1 on, every 1/churn-th one answers from a new MAC"""
+    step = max(int(round(1 / churn)), 1) if churn else 0
+    rows = []
+    for i in range(count):
+        ip = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+        tail = (i + generation * count if step and i % step == 0 else i) % (1 << 24)
+        rows.append((ip, "0x2", f"02:00:00:{tail >> 16:02x}:{tail >> 8 & 0xff:02x}:{tail & 0xff:02x}", "br-lan"))
+    return rows
+
+
+def run_bench(sizes, churn=0.01, repeats=5):
+    """Time a changed scan (parse + diff) and an unchanged scan at each table size"""
+    results = []
+    workdir = tempfile.mkdtemp(prefix="netmon-arp-")
+    path = os.path.join(workdir, "arp")
+    try:
+        for size in sizes:
+            changed_ms, unchanged_ms = [], []
+            for repeat in range(repeats):
+                table = NeighbourTable(path)
+                with open(path, "w", encoding="ascii") as f:
+                    f.write(arp_text(bench_rows(size, churn, 0)))
+                table.scan()
+                with open(path, "w", encoding="ascii") as f:
+                    f.write(arp_text(bench_rows(size, churn, repeat + 1)))
+                started = time.perf_counter()
+                delta = table.scan()
+                changed_ms.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                table.scan()
+                unchanged_ms.append((time.perf_counter() - started) * 1000)
+            results.append({"entries": size, "changed": len(delta["changed"]),
+                            "changed_scan_ms": round(statistics.median(changed_ms), 3),
+                            "unchanged_scan_ms": round(statistics.median(unchanged_ms), 3),
+                            "us_per_entry": round(statistics.median(changed_ms) * 1000 / size, 3) if size else None})
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(workdir)
+    return results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Watch the neighbour table and print what changes")
+    parser.add_argument("--path", default=ARP_PATH, help="ARP table to watch")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between scans")
+    parser.add_argument("--duration", type=float, help="Stop watching after this many seconds")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="Print the delta between two ARP files")
+    parser.add_argument("--bench", metavar="SIZES", help="Time scans of tables with these entry counts")
+    parser.add_argument("--churn", type=float, default=0.01, help="With --bench: fraction of entries changed")
+    parser.add_argument("--json", action="store_true", help="Print deltas/results as JSON")
+    args = parser.parse_args()
+
+    if args.bench:
+        sizes = [int(v) for v in args.bench.split(",") if v.strip()]
+        results = run_bench(sizes, args.churn)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return 0
+        print(f"⏱️ Neighbour table scans ({args.churn:.1%} of entries changed)")
+        print(f"   {'entries':>8} {'changed':>8} {'diff scan ms':>13} {'same scan ms':>13} {'µs/entry':>9}")
+        for r in results:
+            print(f"   {r['entries']:>8,} {r['changed']:>8,} {r['changed_scan_ms']:>13.2f} "
+                  f"{r['unchanged_scan_ms']:>13.2f} {r['us_per_entry']:>9.2f}")
+        return 0
+
+    if args.diff:
+        table = NeighbourTable(args.diff[0])
+        table.scan()
+        table.path = args.diff[1]
+        delta = table.scan()
+        if args.json:
+            print(json.dumps(delta, indent=2))
+        else:
+            print_delta(delta, "   ")
+            print(f"📋 {len(delta['added'])} added, {len(delta['changed'])} changed, {len(delta['removed'])} removed")
+        return 0
+
+    table = NeighbourTable(args.path)
+    first = table.scan()
+    print(f"👀 Watching {args.path}: {len(first['added'])} neighbours")
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(args.interval)
+            delta = table.scan()
+            if delta_size(delta):
+                if args.json:
+                    print(json.dumps(delta), flush=True)
+                else:
+                    print_delta(delta, "   ")
+    except KeyboardInterrupt:
+        pass
+    print(f"🏁 {table.scans} scans, {len(table.table)} neighbours")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ Automated Network Monitor Web Interface Tester
 No user input required - runs automatically
 """
 
+import argparse
 import time
 import json
 import os
@@ -16,6 +17,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from api_probe import probe_endpoints, print_probe_results
+from page_readiness import PageReadiness
+from run_tracing import RunTracer, print_trace_summary
+
 def setup_chrome_driver():
     """Setup Chrome WebDriver"""
     print("🚀 Setting up Chrome WebDriver...")
@@ -45,16 +50,20 @@ def setup_chrome_driver():
         print(f"❌ Failed to setup ChromeDriver: {e}")
         return None
 
-def test_network_monitor(router_ip="192.168.1.1", port="8080"):
+def test_network_monitor(router_ip="192.168.1.1", port="8080", tracer=None):
     """Test Network Monitor web interface"""
     print(f"🎯 Testing Network Monitor at {router_ip}:{port}")
     print("=" * 60)
     
-    driver = setup_chrome_driver()
+    if tracer is None:
+        tracer = RunTracer("auto_test_netmon", base_url=f"http://{router_ip}:{port}")
+    with tracer.span("driver_startup", "driver"):
+        driver = setup_chrome_driver()
     if not driver:
         return False
     
     test_results = []
+    readiness = PageReadiness(driver, tracer=tracer)
     
     try:
         base_url = f"http://{router_ip}:{port}"
@@ -71,101 +80,89 @@ def test_network_monitor(router_ip="192.168.1.1", port="8080"):
         
         print("🔍 Testing web interface URLs...")
         for url in test_urls:
-            try:
-                print(f"   Testing: {url}")
-                driver.get(url)
-                time.sleep(3)
-                
-                title = driver.title
-                body_text = driver.find_element(By.TAG_NAME, "body").text.lower()
-                
-                if "not found" in body_text:
-                    print(f"   ❌ 404 Not Found")
-                elif "forbidden" in body_text:
-                    print(f"   ❌ 403 Forbidden")
-                elif "network monitor" in body_text or "network monitor" in title.lower():
-                    print(f"   ✅ Working! Title: {title}")
-                    working_url = url
-                    test_results.append({"url": url, "status": "working", "title": title})
-                    break
-                else:
-                    print(f"   ⚠️ Unexpected content")
+            with tracer.span("url_probe", "page", url=url) as span:
+                try:
+                    print(f"   Testing: {url}")
+                    readiness.load(url, f"url:{url}")
+                    
+                    title = driver.title
+                    body_text = driver.find_element(By.TAG_NAME, "body").text.lower()
                     
-            except Exception as e:
-                print(f"   ❌ Error: {str(e)[:50]}...")
+                    if "not found" in body_text:
+                        print(f"   ❌ 404 Not Found")
+                    elif "forbidden" in body_text:
+                        print(f"   ❌ 403 Forbidden")
+                    elif "network monitor" in body_text or "network monitor" in title.lower():
+                        print(f"   ✅ Working! Title: {title}")
+                        working_url = url
+                        span.set(working=True)
+                        test_results.append({"url": url, "status": "working", "title": title})
+                        break
+                    else:
+                        print(f"   ⚠️ Unexpected content")
+                        
+                except Exception as e:
+                    print(f"   ❌ Error: {str(e)[:50]}...")
         
         # Test API endpoints
         print("\n🔌 Testing API endpoints...")
-        api_endpoints = [
-            f"{base_url}/cgi-bin/netmon-api.sh?action=get_devices",
-            f"{base_url}/cgi-bin/netmon-api.lua?action=get_devices",
-            f"{base_url}/cgi-bin/test.sh"
-        ]
+        with tracer.span("api_endpoints", "api"):
+            started = time.perf_counter()
+            api_results = probe_endpoints(base_url)
+            for entry in api_results:
+                tracer.add_span(f"api:{entry['path']}", started + entry["offset_ms"] / 1000,
+                                entry["elapsed_ms"] / 1000, "api", "ok" if entry["ok"] else "error",
+                                url=entry["url"], http_status=entry.get("status"),
+                                latency_ms=entry.get("latency_ms"), error=entry.get("error"))
+        print_probe_results(api_results, "   ")
         
-        working_apis = []
-        for endpoint in api_endpoints:
-            try:
-                print(f"   Testing: {endpoint}")
-                driver.get(endpoint)
-                time.sleep(2)
-                
-                body_text = driver.find_element(By.TAG_NAME, "body").text
-                
-                if "forbidden" in body_text.lower():
-                    print(f"   ❌ 403 Forbidden")
-                elif "not found" in body_text.lower():
-                    print(f"   ❌ 404 Not Found")
-                elif '"success"' in body_text or "cgi is working" in body_text.lower():
-                    print(f"   ✅ Working!")
-                    working_apis.append(endpoint)
-                else:
-                    print(f"   ⚠️ Unexpected response: {body_text[:50]}...")
-                    
-            except Exception as e:
-                print(f"   ❌ Error: {str(e)[:50]}...")
+        working_apis = [entry["url"] for entry in api_results if entry["ok"]]
         
         # Test JavaScript functionality if we have a working URL
         if working_url:
             print(f"\n📜 Testing JavaScript on: {working_url}")
-            try:
-                driver.get(working_url)
-                time.sleep(5)
-                
-                # Check for JavaScript errors
-                logs = driver.get_log('browser')
-                js_errors = [log for log in logs if log['level'] == 'SEVERE']
-                
-                if js_errors:
-                    print("   ❌ JavaScript errors found:")
-                    for error in js_errors[:3]:  # Show first 3 errors
-                        print(f"      • {error['message'][:80]}...")
-                else:
-                    print("   ✅ No severe JavaScript errors")
-                
-                # Check device count element
+            with tracer.span("javascript", "javascript", url=working_url):
                 try:
-                    device_count = driver.find_element(By.ID, "deviceCount").text
-                    print(f"   📱 Device Count: {device_count}")
-                    if device_count and device_count != "-":
-                        print("   ✅ Device count is updating")
+                    readiness.load(working_url, "javascript:load")
+                    readiness.first_api_fetch("javascript:first_api_fetch")
+                    
+                    # Check for JavaScript errors
+                    logs = driver.get_log('browser')
+                    js_errors = [log for log in logs if log['level'] == 'SEVERE']
+                    
+                    if js_errors:
+                        print("   ❌ JavaScript errors found:")
+                        for error in js_errors[:3]:  # Show first 3 errors
+                            print(f"      • {error['message'][:80]}...")
                     else:
-                        print("   ⚠️ Device count not updating")
-                except:
-                    print("   ❌ Device count element not found")
-                
-                # Test refresh button
-                try:
-                    refresh_btn = driver.find_element(By.ID, "refreshBtn")
-                    if refresh_btn:
-                        print("   ✅ Refresh button found")
-                        refresh_btn.click()
-                        time.sleep(2)
-                        print("   ✅ Refresh button works")
-                except:
-                    print("   ❌ Refresh button not working")
+                        print("   ✅ No severe JavaScript errors")
+                    
+                    # Check device count element
+                    try:
+                        driver.find_element(By.ID, "deviceCount")
+                        device_count = readiness.device_count_ready(step="javascript:device_count")
+                        print(f"   📱 Device Count: {device_count}")
+                        if device_count and device_count != "-":
+                            print("   ✅ Device count is updating")
+                        else:
+                            print("   ⚠️ Device count not updating")
+                    except:
+                        print("   ❌ Device count element not found")
                     
-            except Exception as e:
-                print(f"   ❌ JavaScript test failed: {e}")
+                    # Test refresh button
+                    try:
+                        refresh_btn = driver.find_element(By.ID, "refreshBtn")
+                        if refresh_btn:
+                            print("   ✅ Refresh button found")
+                            if readiness.click_and_wait_refresh(step="javascript:refresh"):
+                                print("   ✅ Refresh button works")
+                            else:
+                                print("   ⚠️ Refresh did not complete in time")
+                    except:
+                        print("   ❌ Refresh button not working")
+                        
+                except Exception as e:
+                    print(f"   ❌ JavaScript test failed: {e}")
         
         # Generate results summary
         print("\n" + "=" * 60)
@@ -177,6 +174,9 @@ def test_network_monitor(router_ip="192.168.1.1", port="8080"):
         else:
             print("❌ No working web interface found")
         
+        print("\n⏱️ Wait timings:")
+        readiness.print_timings("   ")
+        
         if working_apis:
             print(f"✅ Working APIs ({len(working_apis)}):")
             for api in working_apis:
@@ -186,7 +186,11 @@ def test_network_monitor(router_ip="192.168.1.1", port="8080"):
         
         # Generate auto-fix script
         print("\n🔧 Generating auto-fix script...")
-        generate_auto_fix_script(working_url is None, not working_apis)
+        with tracer.span("fix_script", "fix"):
+            generate_auto_fix_script(working_url is None, not working_apis)
+        
+        print("\n🧭 Where the run spent its time:")
+        print_trace_summary(tracer, "   ")
         
         return working_url is not None and working_apis
         
@@ -492,11 +496,24 @@ echo "   • Restart services: /etc/init.d/uhttpd restart"
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Automated Network Monitor web interface tester")
+    parser.add_argument("--trace", metavar="FILE", help="Write the run's timing spans as Chrome trace-event JSON")
+    parser.add_argument("--trace-csv", metavar="FILE", help="Write the run's timing spans as a flat CSV")
+    args = parser.parse_args()
+    
     print("🚀 Automated Network Monitor Tester")
     print("📡 Testing router at 192.168.1.1:8080")
     print("=" * 60)
     
-    success = test_network_monitor()
+    tracer = RunTracer("auto_test_netmon", base_url="http://192.168.1.1:8080")
+    with tracer.span("test_network_monitor", "run"):
+        success = test_network_monitor(tracer=tracer)
+    if args.trace:
+        tracer.write_chrome_trace(args.trace)
+        print(f"🧭 Trace written to {args.trace}")
+    if args.trace_csv:
+        tracer.write_csv(args.trace_csv)
+        print(f"🧭 Trace CSV written to {args.trace_csv}")
     
     print("\n" + "=" * 60)
     if success:
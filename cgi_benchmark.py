@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Network Monitor CGI Benchmark
+Drives concurrent load at each API action and reports throughput and
+p50/p95/p99 latency as device count and client count grow
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from urllib.parse import urlsplit
+
+from api_probe import ConnectionPool, ProbeError
+
+ACTIONS = {
+    "get_devices": ("GET", "/cgi-bin/advanced-api.sh?action=get_devices", None),
+    "get_websites": ("GET", "/cgi-bin/advanced-api.sh?action=get_websites", None),
+    "get_speed_history": ("GET", "/cgi-bin/advanced-api.sh?action=get_speed_history", None),
+    "set_speed_limit": ("POST", "/cgi-bin/advanced-api.sh",
+                        {"action": "set_speed_limit", "device_ip": "192.168.1.2", "speed_limit_kbps": 1024}),
+    "block_device": ("POST", "/cgi-bin/advanced-api.sh",
+                     {"action": "block_device", "device_ip": "192.168.1.2", "block": False}),
+    "report": ("POST", "/cgi-bin/netmon-report.lua",
+               {"start_date": "2024-01-01", "end_date": "2024-01-31", "report_type": "summary"}),
+}
+# Actions that change tc/iptables state on the router, and the request that undoes each
+MUTATING_ACTIONS = {
+    "set_speed_limit": ("POST", "/cgi-bin/advanced-api.sh",
+                        {"action": "set_speed_limit", "device_ip": "192.168.1.2", "speed_limit_kbps": 0}),
+    "block_device": ("POST", "/cgi-bin/advanced-api.sh",
+                     {"action": "block_device", "device_ip": "192.168.1.2", "block": False}),
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles for one benchmark cell"""
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "max_ms": round(max(latencies), 2) if latencies else None,
+    }
+
+
+def encode_body(body):
+    # JSON.stringify() style, which is what the shell parsers expect
+    return json.dumps(body, separators=(",", ":")) if body is not None else None
+
+
+async def run_cell(base_url, action, clients, duration, requests_per_client=None, timeout=60.0, on_sample=None):
+    """Run `clients` closed-loop clients against one action and summarize"""
+    method, path, body = ACTIONS[action]
+    parts = urlsplit(base_url)
+    payload = encode_body(body)
+    headers = {"Content-Type": "application/json"} if payload else None
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        # One keep-alive connection per client, like one open dashboard
+        pool = ConnectionPool(parts.hostname, parts.port or 80, size=1, timeout=timeout)
+        sent = 0
+        try:
+            while True:
+                if requests_per_client is not None:
+                    if sent >= requests_per_client:
+                        break
+                elif time.perf_counter() >= deadline:
+                    break
+                sent += 1
+                started_at = time.time()
+                try:
+                    response = await pool.request(method, path, payload, headers)
+                    ok = response["status"] == 200
+                    latency = response["latency_ms"]
+                except (ProbeError, OSError, asyncio.TimeoutError):
+                    ok, latency = False, None
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+                if on_sample:
+                    on_sample({"action": action, "clients": clients, "t": started_at,
+                               "latency_ms": latency, "ok": ok})
+        finally:
+            await pool.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def reset_actions(base_url, actions, timeout=60.0):
+    """Undo what the mutating actions left behind (speed limit back to 0, device unblocked);
+    returns the actions whose reset failed"""
+    parts = urlsplit(base_url)
+    pool = ConnectionPool(parts.hostname, parts.port or 80, size=1, timeout=timeout)
+    failed = []
+    try:
+        for action in actions:
+            method, path, body = MUTATING_ACTIONS[action]
+            try:
+                response = await pool.request(method, path, encode_body(body), {"Content-Type": "application/json"})
+                if response["status"] != 200:
+                    failed.append(action)
+            except (ProbeError, OSError, asyncio.TimeoutError):
+                failed.append(action)
+    finally:
+        await pool.close()
+    return failed
+
+
+def default_actions(live):
+    """Every action on the emulator; against a live router only those that change nothing"""
+    return [action for action in ACTIONS if not (live and action in MUTATING_ACTIONS)]
+
+
+def parse_counts(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def print_table(rows):
+    """Print benchmark rows as an aligned table"""
+    header = f"{'devices':>7} {'action':<18} {'clients':>7} {'req':>6} {'err':>5} {'rps':>8} " \
+             f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+    for row in rows:
+        print(f"{str(row['devices']):>7} {row['action']:<18} {row['clients']:>7} {row['requests']:>6} "
+              f"{row['errors']:>5} {row['throughput_rps']:>8.1f} {fmt(row['p50_ms'])} "
+              f"{fmt(row['p95_ms'])} {fmt(row['p99_ms'])}")
+
+
+def run_benchmark(device_counts, client_counts, actions, duration, requests_per_client=None,
+                  url=None, on_cell=None, on_sample=None, server_samples=None, sample_interval=0.25):
+    """Run the full device x action x client grid; returns the result rows
+
+    With a server_samples list, the emulator's server and CGI processes are
+    sampled every sample_interval seconds and the samples appended to it.
+    """
+    rows = []
+
+    def run_grid(base_url, devices):
+        for action in actions:
+            for clients in client_counts:
+                row = {"devices": devices, "action": action, "clients": clients}
+                row.update(asyncio.run(run_cell(base_url, action, clients, duration,
+                                                requests_per_client, on_sample=on_sample)))
+                rows.append(row)
+                if on_cell:
+                    on_cell(row)
+
+    if url:
+        try:
+            run_grid(url, "live")
+        finally:
+            mutated = [action for action in actions if action in MUTATING_ACTIONS]
+            if mutated:
+                failed = asyncio.run(reset_actions(url, mutated))
+                if failed:
+                    print(f"⚠️ Could not reset {', '.join(failed)} on {url}; check tc/iptables on the router")
+        return rows
+
+    from router_emulator import RouterEmulator
+    from server_sampler import ServerSampler
+    for devices in device_counts:
+        with RouterEmulator(devices=devices) as emulator:
+            if server_samples is None:
+                run_grid(emulator.base_url, devices)
+                continue
+            with ServerSampler(cgi_roots=lambda: emulator.cgi_pids, interval=sample_interval) as sampler:
+                run_grid(emulator.base_url, devices)
+            server_samples.extend(dict(sample, devices=devices) for sample in sampler.samples)
+    return rows
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the Network Monitor CGI API")
+    parser.add_argument("--url", help="Benchmark a live router instead of the local emulator")
+    parser.add_argument("--devices", default="10,100,1000", help="Comma-separated emulator device counts")
+    parser.add_argument("--clients", default="1,4,16", help="Comma-separated concurrent client counts")
+    parser.add_argument("--actions", help="Comma-separated actions to run (default: all; with --url, "
+                                           "all but set_speed_limit/block_device)")
+    parser.add_argument("--allow-mutating", action="store_true",
+                        help="With --url: allow set_speed_limit/block_device against the live router "
+                             "(the limit is reset to 0 and the device unblocked afterwards)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per benchmark cell")
+    parser.add_argument("--requests", type=int, help="Fixed requests per client instead of --duration")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    parser.add_argument("--server-samples", metavar="FILE",
+                        help="Sample the emulator's CPU/RSS/fds/processes and write them lined up with "
+                             "every request's latency")
+    parser.add_argument("--sample-interval", type=float, default=0.25, help="Seconds between server samples")
+    args = parser.parse_args()
+
+    if args.actions:
+        actions = [a.strip() for a in args.actions.split(",") if a.strip()]
+    else:
+        actions = default_actions(bool(args.url) and not args.allow_mutating)
+    unknown = [a for a in actions if a not in ACTIONS]
+    if unknown:
+        print(f"❌ Unknown actions: {', '.join(unknown)} (choose from {', '.join(ACTIONS)})")
+        return 1
+    mutating = [a for a in actions if a in MUTATING_ACTIONS]
+    if args.url and mutating and not args.allow_mutating:
+        print(f"❌ {', '.join(mutating)} would change tc/iptables rules on {args.url}; "
+              f"pass --allow-mutating to run them against a live router")
+        return 1
+
+    print("🏁 Network Monitor CGI benchmark")
+    print("=" * 60)
+
+    def on_cell(row):
+        icon = "✅" if row["errors"] == 0 else "⚠️" if row["errors"] < row["requests"] else "❌"
+        print(f"   {icon} {row['devices']} devices / {row['action']} / "
+              f"{row['clients']} clients: {row['throughput_rps']} req/s, {row['errors']} errors")
+
+    sampling = bool(args.server_samples)
+    if sampling and args.url:
+        print("⚠️ Server sampling needs the local emulator; ignoring --server-samples with --url")
+        sampling = False
+    client_samples = [] if sampling else None
+    server_samples = [] if sampling else None
+
+    rows = run_benchmark(parse_counts(args.devices), parse_counts(args.clients), actions,
+                         args.duration, args.requests, args.url, on_cell=on_cell,
+                         on_sample=client_samples.append if sampling else None,
+                         server_samples=server_samples, sample_interval=args.sample_interval)
+    print()
+    print_table(rows)
+
+    if sampling:
+        from server_sampler import line_up, print_alignment, print_server_summary
+        report = line_up(server_samples, client_samples)
+        print("\n📈 Server side during the run:")
+        print_server_summary(server_samples, "   ")
+        print_alignment(report, "   ")
+        with open(args.server_samples, "w", encoding="utf-8") as f:
+            json.dump({"server": server_samples, "alignment": report}, f, indent=2)
+        print(f"📄 Server samples written to {args.server_samples}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "results": rows}, f, indent=2)
+        print(f"\n📄 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Network Monitor CGI Cost Attribution
+Counts processes, exec'd binaries, CPU and wall time per API action and
+per device using an instrumented router emulator
+"""
+
+import argparse
+import json
+import sys
+import urllib.request
+from collections import Counter
+
+from cgi_benchmark import ACTIONS, encode_body, parse_counts
+from router_emulator import RouterEmulator
+
+
+def send_action(base_url, action):
+    """Send one request for an action through the emulator"""
+    method, path, body = ACTIONS[action]
+    payload = encode_body(body)
+    request = urllib.request.Request(
+        base_url + path, method=method,
+        data=payload.encode("utf-8") if payload else None,
+        headers={"Content-Type": "application/json"} if payload else {})
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+    except OSError:
+        pass  # Failed requests (e.g. no lua interpreter) still show up in the cost log
+
+
+def average_costs(records):
+    """Mean per-request cost over several records of the same action"""
+    count = len(records)
+    execs = Counter()
+    for record in records:
+        execs.update(record["execs"])
+    processes = [r["processes"] for r in records if r["processes"] is not None]
+    return {
+        "requests": count,
+        "wall_ms": sum(r["wall_ms"] for r in records) / count,
+        "cpu_ms": sum(r["cpu_user_ms"] + r["cpu_sys_ms"] for r in records) / count,
+        "processes": sum(processes) / len(processes) if processes else None,
+        "execs": {name: total / count for name, total in execs.items()},
+    }
+
+
+def per_device(low, high, low_devices, high_devices):
+    """Marginal cost of one extra device between two device counts"""
+    span = high_devices - low_devices
+
+    def slope(a, b):
+        return (b - a) / span if a is not None and b is not None else None
+
+    binaries = set(low["execs"]) | set(high["execs"])
+    return {
+        "wall_ms": slope(low["wall_ms"], high["wall_ms"]),
+        "cpu_ms": slope(low["cpu_ms"], high["cpu_ms"]),
+        "processes": slope(low["processes"], high["processes"]),
+        "execs": {name: slope(low["execs"].get(name, 0), high["execs"].get(name, 0)) for name in binaries},
+    }
+
+
+def measure(actions, device_counts, repeat):
+    """Run every action `repeat` times at every device count; returns {action: {devices: costs}}"""
+    results = {action: {} for action in actions}
+    for devices in device_counts:
+        with RouterEmulator(devices=devices, instrument=True) as emulator:
+            for action in actions:
+                send_action(emulator.base_url, action)  # warm-up, not recorded
+                emulator.cost_log.clear()
+                for _ in range(repeat):
+                    send_action(emulator.base_url, action)
+                if emulator.cost_log:
+                    results[action][devices] = average_costs(emulator.cost_log)
+    return results
+
+
+def build_breakdown(results, device_counts):
+    """Flatten measurements into per-action rows and per-binary rows"""
+    low_devices, high_devices = min(device_counts), max(device_counts)
+    actions = []
+    binaries = []
+    for action, by_devices in results.items():
+        if high_devices not in by_devices:
+            continue
+        high = by_devices[high_devices]
+        marginal = None
+        if low_devices != high_devices and low_devices in by_devices:
+            marginal = per_device(by_devices[low_devices], high, low_devices, high_devices)
+        actions.append({
+            "action": action,
+            "devices": high_devices,
+            "wall_ms": round(high["wall_ms"], 2),
+            "cpu_ms": round(high["cpu_ms"], 2),
+            "processes": high["processes"],
+            "execs": round(sum(high["execs"].values()), 1),
+            "per_device": marginal,
+        })
+        for name, count in sorted(high["execs"].items(), key=lambda item: -item[1]):
+            binaries.append({
+                "action": action,
+                "binary": name,
+                "execs_per_request": round(count, 2),
+                "execs_per_device": round(marginal["execs"][name], 3) if marginal else None,
+            })
+    return actions, binaries
+
+
+def print_breakdown(actions, binaries):
+    """Print the per-action and per-binary breakdown tables"""
+    fmt = lambda v, spec: format(v, spec) if v is not None else "-"
+    print(f"{'action':<18} {'devices':>7} {'wall ms':>9} {'cpu ms':>9} {'procs':>7} {'execs':>7} "
+          f"{'cpu ms/dev':>11} {'procs/dev':>10}")
+    print("-" * 84)
+    for row in actions:
+        marginal = row["per_device"] or {}
+        print(f"{row['action']:<18} {row['devices']:>7} {row['wall_ms']:>9.1f} {row['cpu_ms']:>9.1f} "
+              f"{fmt(row['processes'], '.0f'):>7} {row['execs']:>7.0f} "
+              f"{fmt(marginal.get('cpu_ms'), '.2f'):>11} {fmt(marginal.get('processes'), '.1f'):>10}")
+
+    print(f"\n{'action':<18} {'binary':<12} {'execs/request':>14} {'execs/device':>13}")
+    print("-" * 60)
+    for row in binaries:
+        print(f"{row['action']:<18} {row['binary']:<12} {row['execs_per_request']:>14.1f} "
+              f"{fmt(row['execs_per_device'], '.2f'):>13}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Attribute process-spawn and CPU cost to CGI actions")
+    parser.add_argument("--devices", default="10,50", help="Device counts; the smallest and largest give per-device cost")
+    parser.add_argument("--actions", default=",".join(ACTIONS), help="Comma-separated actions to measure")
+    parser.add_argument("--repeat", type=int, default=3, help="Requests per action and device count")
+    parser.add_argument("--json", metavar="FILE", help="Also write the breakdown as JSON")
+    args = parser.parse_args()
+
+    device_counts = parse_counts(args.devices)
+    actions = [a.strip() for a in args.actions.split(",") if a.strip()]
+    print(f"🔬 Measuring {len(actions)} actions at {device_counts} devices ({args.repeat} requests each)")
+    print("   Note: exec shims add one sh start-up to every exec'd binary\n")
+
+    results = measure(actions, device_counts, args.repeat)
+    action_rows, binary_rows = build_breakdown(results, device_counts)
+    print_breakdown(action_rows, binary_rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"actions": action_rows, "binaries": binary_rows, "raw": results}, f, indent=2)
+        print(f"\n📄 Breakdown written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Client Profiles
+DevTools CPU and network throttling presets for the Selenium testers, and
+the page hooks that measure time to the first device row, long tasks during
+the 5 s refresh and refreshes that run into the next interval
+"""
+
+import statistics
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from frontend_bench import install_long_task_hook
+
+POLL_INTERVAL_MS = 5000  # setInterval(loadData, 5000) in advanced_script.js
+DEVICE_ROW_SELECTOR = "#deviceList .device-item"
+
+# cpu_rate: slowdown factor for Emulation.setCPUThrottlingRate (1 = none)
+# latency_ms / down_kbps / up_kbps / packet_loss: Network.emulateNetworkConditions
+# (0 kbps = unthrottled; packet_loss in percent, honoured by recent Chrome only)
+PROFILES = {
+    "desktop": {"cpu_rate": 1, "latency_ms": 0, "down_kbps": 0, "up_kbps": 0, "packet_loss": 0},
+    "phone-wifi": {"cpu_rate": 4, "latency_ms": 20, "down_kbps": 30000, "up_kbps": 15000, "packet_loss": 0},
+    "low-end-phone": {"cpu_rate": 6, "latency_ms": 150, "down_kbps": 1600, "up_kbps": 750, "packet_loss": 1},
+    "congested-wifi": {"cpu_rate": 6, "latency_ms": 300, "down_kbps": 400, "up_kbps": 400, "packet_loss": 5},
+}
+
+# Installed before page scripts: wraps setInterval so every poll tick records
+# when it started and when the promise it returned settled, and notes when the
+# first device row appears
+REFRESH_HOOK_JS = """
+(function () {
+    if (window.__netmonTicks) { return; }
+    window.__netmonTicks = [];
+    window.__netmonFirstRow = null;
+    var originalSetInterval = window.setInterval;
+    window.setInterval = function (callback, delay) {
+        if (typeof callback !== 'function' || !(delay >= 1000)) {
+            return originalSetInterval.apply(this, arguments);
+        }
+        var args = Array.prototype.slice.call(arguments, 2);
+        return originalSetInterval.call(window, function () {
+            var tick = {start_ms: performance.now(), end_ms: null, interval_ms: delay};
+            window.__netmonTicks.push(tick);
+            var finish = function () { tick.end_ms = performance.now(); };
+            var result;
+            try {
+                result = callback.apply(this, args);
+            } catch (e) {
+                finish();
+                throw e;
+            }
+            if (result && typeof result.then === 'function') { result.then(finish, finish); } else { finish(); }
+            return result;
+        }, delay);
+    };
+    var observer = new MutationObserver(function () {
+        if (document.querySelector('%s')) {
+            window.__netmonFirstRow = performance.now();
+            observer.disconnect();
+        }
+    });
+    observer.observe(document, {childList: true, subtree: true});
+})();
+""" % DEVICE_ROW_SELECTOR
+
+CLIENT_METRICS_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+return {
+    first_row_ms: window.__netmonFirstRow,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+    now_ms: performance.now(),
+    ticks: window.__netmonTicks || [],
+    long_tasks: window.__netmonLongTasks || []
+};
+"""
+
+
+def parse_profiles(value):
+    """Comma-separated profile names ("all" for every preset)"""
+    names = list(PROFILES) if value in (None, "", "all") else [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [n for n in names if n not in PROFILES]
+    if unknown:
+        raise ValueError(f"unknown profile(s) {', '.join(unknown)}; choose from {', '.join(PROFILES)}")
+    return names
+
+
+def install_client_hooks(driver):
+    """Register the refresh and long-task hooks for every page the driver opens"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": REFRESH_HOOK_JS})
+    except (AttributeError, WebDriverException):
+        return False
+    return install_long_task_hook(driver)
+
+
+def apply_profile(driver, name):
+    """Throttle the driver's CPU and network; returns the settings that took effect"""
+    profile = dict(PROFILES[name])
+    driver.execute_cdp_cmd("Emulation.setCPUThrottlingRate", {"rate": profile["cpu_rate"]})
+    conditions = {
+        "offline": False,
+        "latency": profile["latency_ms"],
+        "downloadThroughput": profile["down_kbps"] * 1000 / 8 if profile["down_kbps"] else -1,
+        "uploadThroughput": profile["up_kbps"] * 1000 / 8 if profile["up_kbps"] else -1,
+    }
+    driver.execute_cdp_cmd("Network.enable", {})
+    try:
+        driver.execute_cdp_cmd("Network.emulateNetworkConditions", dict(conditions, packetLoss=profile["packet_loss"]))
+    except WebDriverException:
+        # Older Chrome rejects the experimental packetLoss parameter
+        driver.execute_cdp_cmd("Network.emulateNetworkConditions", conditions)
+        profile["packet_loss"] = None
+    return profile
+
+
+def clear_profile(driver):
+    """Back to an unthrottled browser"""
+    try:
+        driver.execute_cdp_cmd("Emulation.setCPUThrottlingRate", {"rate": 1})
+        driver.execute_cdp_cmd("Network.emulateNetworkConditions", {
+            "offline": False, "latency": 0, "downloadThroughput": -1, "uploadThroughput": -1})
+    except (AttributeError, WebDriverException):
+        pass
+
+
+def analyze_client(metrics, interval_ms=POLL_INTERVAL_MS):
+    """Refresh durations, overlaps and long tasks inside refresh windows"""
+    ticks = metrics["ticks"]
+    finished = [t["end_ms"] - t["start_ms"] for t in ticks if t["end_ms"] is not None]
+
+    # A refresh overlaps when it is still running as the next tick fires
+    overlaps = 0
+    for i, tick in enumerate(ticks):
+        next_start = ticks[i + 1]["start_ms"] if i + 1 < len(ticks) else tick["start_ms"] + interval_ms
+        end = tick["end_ms"] if tick["end_ms"] is not None else metrics["now_ms"]
+        if end > next_start:
+            overlaps += 1
+
+    # Long tasks that started while a refresh was in flight
+    refresh_tasks = []
+    for task in metrics["long_tasks"]:
+        for tick in ticks:
+            end = tick["end_ms"] if tick["end_ms"] is not None else tick["start_ms"] + interval_ms
+            if tick["start_ms"] <= task["start_ms"] <= end:
+                refresh_tasks.append(task["duration_ms"])
+                break
+
+    first_row = metrics["first_row_ms"]
+    return {
+        "first_row_ms": round(first_row, 1) if first_row is not None else None,
+        "dom_content_loaded_ms": round(metrics["dom_content_loaded_ms"], 1)
+        if metrics["dom_content_loaded_ms"] else None,
+        "refreshes": len(ticks),
+        "unfinished": sum(1 for t in ticks if t["end_ms"] is None),
+        "refresh_median_ms": round(statistics.median(finished), 1) if finished else None,
+        "refresh_max_ms": round(max(finished), 1) if finished else None,
+        "overlaps": overlaps,
+        "long_tasks": len(refresh_tasks),
+        "long_task_ms": round(sum(refresh_tasks), 1),
+        "max_long_task_ms": round(max(refresh_tasks), 1) if refresh_tasks else 0,
+        "holds": bool(ticks) and not overlaps,
+    }
+
+
+def measure_profile(driver, readiness, url, name, window_s=30, interval_ms=POLL_INTERVAL_MS):
+    """Load url cold under one profile and watch its refreshes for window_s seconds"""
+    settings = apply_profile(driver, name)
+    try:
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    except WebDriverException:
+        pass
+    # Throttled loads take a while; give them well beyond the usual readiness timeout
+    readiness.load(url, f"profile:{name}:load", timeout=120)
+    readiness.wait(f"profile:{name}:first_row",
+                   lambda d: d.execute_script("return window.__netmonFirstRow;"), timeout=120)
+    time.sleep(window_s)
+    result = analyze_client(driver.execute_script(CLIENT_METRICS_JS), interval_ms)
+    result.update({"profile": name, "settings": settings, "window_s": window_s})
+    return result
+
+
+def print_client_results(results, indent=""):
+    print(f"{indent}   {'profile':<16} {'cpu':>4} {'rtt ms':>7} {'first row':>10} {'refreshes':>9} "
+          f"{'median':>8} {'max':>8} {'overlap':>7} {'long tasks':>11}")
+    for r in results:
+        flag = "✅" if r["holds"] else "❌"
+        first_row = f"{r['first_row_ms']:,.0f}" if r["first_row_ms"] is not None else "never"
+        median = f"{r['refresh_median_ms']:,.0f}" if r["refresh_median_ms"] is not None else "n/a"
+        longest = f"{r['refresh_max_ms']:,.0f}" if r["refresh_max_ms"] is not None else "n/a"
+        print(f"{indent}{flag} {r['profile']:<16} {r['settings']['cpu_rate']:>3}x {r['settings']['latency_ms']:>7} "
+              f"{first_row:>10} {r['refreshes']:>9} {median:>8} {longest:>8} {r['overlaps']:>7} "
+              f"{r['long_tasks']:>3} / {r['long_task_ms']:>5,.0f}")
+    failing = [r["profile"] for r in results if not r["holds"]]
+    if failing:
+        print(f"{indent}⚠️ Polling every {POLL_INTERVAL_MS // 1000} s does not hold on: {', '.join(failing)}")
+    elif results:
+        print(f"{indent}✅ Every refresh finished inside its {POLL_INTERVAL_MS // 1000} s interval on all profiles")
+    if any(r["settings"]["packet_loss"] is None for r in results):
+        print(f"{indent}ℹ️ This Chrome ignores packet loss emulation; latency and bandwidth still applied")
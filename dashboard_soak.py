@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Dashboard Soak Sampling
+Samples heap, DOM node, listener and poll latency figures from an open
+dashboard and turns the series into growth trends and a leak verdict
+"""
+
+from selenium.common.exceptions import WebDriverException
+
+PAGE_METRICS_JS = """
+var memory = performance.memory || {};
+var fetches = window.__netmonFetches || [];
+return {
+    heap_used: memory.usedJSHeapSize || null,
+    heap_total: memory.totalJSHeapSize || null,
+    dom_nodes: document.getElementsByTagName('*').length,
+    fetch_count: fetches.length,
+    fetches: fetches.slice(arguments[0]).filter(function (f) {
+        return f.duration_ms !== null;
+    }).map(function (f) { return f.duration_ms; })
+};
+"""
+
+# Growth per hour above which a metric counts as leaking, and the minimum
+# relative growth over the run so noise on a flat series does not trip it
+LEAK_THRESHOLDS = {
+    "heap_used": (1024 * 1024, 0.10),
+    "dom_nodes": (100, 0.05),
+    "listeners": (50, 0.05),
+}
+MIN_SAMPLES = 3
+
+
+class SoakSampler:
+    """Collects one sample per call from a dashboard left open in the driver"""
+
+    def __init__(self, driver, collect_garbage=True):
+        self.driver = driver
+        self.collect_garbage = collect_garbage
+        self.samples = []
+        self._fetch_offset = 0
+        self._cdp = True
+        try:
+            driver.execute_cdp_cmd("Performance.enable", {})
+        except (AttributeError, WebDriverException):
+            self._cdp = False
+
+    def cdp_metrics(self):
+        """Chrome's own counters (JSEventListeners, Nodes, JSHeapUsedSize)"""
+        if not self._cdp:
+            return {}
+        try:
+            if self.collect_garbage:
+                # Only retained memory counts towards a leak
+                self.driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+            result = self.driver.execute_cdp_cmd("Performance.getMetrics", {})
+        except WebDriverException:
+            return {}
+        return {m["name"]: m["value"] for m in result.get("metrics", [])}
+
+    def sample(self, elapsed):
+        """Take one sample `elapsed` seconds into the run"""
+        cdp = self.cdp_metrics()
+        page = self.driver.execute_script(PAGE_METRICS_JS, self._fetch_offset)
+        self._fetch_offset = page["fetch_count"]
+        polls = page["fetches"]
+
+        sample = {
+            "elapsed_s": round(elapsed, 1),
+            "heap_used": cdp.get("JSHeapUsedSize") or page["heap_used"],
+            "dom_nodes": int(cdp["Nodes"]) if "Nodes" in cdp else page["dom_nodes"],
+            "listeners": int(cdp["JSEventListeners"]) if "JSEventListeners" in cdp else None,
+            "polls": len(polls),
+            "poll_latency_ms": round(sum(polls) / len(polls), 1) if polls else None,
+        }
+        self.samples.append(sample)
+        return sample
+
+
+def linear_slope(points):
+    """Least-squares slope of [(x, y)]; None with fewer than two distinct x"""
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def analyze_soak(samples):
+    """Growth trend per metric and an overall verdict: leak, stable or inconclusive"""
+    trends = {}
+    leaking = []
+    for metric in ("heap_used", "dom_nodes", "listeners", "poll_latency_ms"):
+        series = [(s["elapsed_s"] / 3600.0, s[metric]) for s in samples if s.get(metric) is not None]
+        slope = linear_slope(series)
+        first, last = (series[0][1], series[-1][1]) if series else (None, None)
+        growth = (last - first) / first if first else None
+        trends[metric] = {
+            "first": first,
+            "last": last,
+            "per_hour": round(slope, 2) if slope is not None else None,
+            "growth_pct": round(growth * 100, 1) if growth is not None else None,
+        }
+        if metric in LEAK_THRESHOLDS and slope is not None and growth is not None:
+            per_hour, relative = LEAK_THRESHOLDS[metric]
+            if slope > per_hour and growth > relative:
+                leaking.append(metric)
+
+    if len(samples) < MIN_SAMPLES:
+        verdict = "inconclusive"
+    else:
+        verdict = "leak" if leaking else "stable"
+    return {"verdict": verdict, "leaking": leaking, "samples": len(samples), "trends": trends}
+
+
+def print_soak_sample(sample, indent=""):
+    heap = f"{sample['heap_used'] / 1048576:.1f} MB" if sample["heap_used"] else "n/a"
+    latency = f"{sample['poll_latency_ms']} ms" if sample["poll_latency_ms"] is not None else "n/a"
+    print(f"{indent}⏲️ {sample['elapsed_s']:>7.0f} s | heap {heap} | {sample['dom_nodes']} nodes | "
+          f"{sample['listeners'] if sample['listeners'] is not None else 'n/a'} listeners | "
+          f"{sample['polls']} polls @ {latency}")
+
+
+def print_soak_report(report, indent=""):
+    """Print the trend table and verdict"""
+    units = {"heap_used": "bytes", "dom_nodes": "nodes", "listeners": "listeners", "poll_latency_ms": "ms"}
+    for metric, trend in report["trends"].items():
+        per_hour = trend["per_hour"] if trend["per_hour"] is not None else "n/a"
+        growth = f"{trend['growth_pct']}%" if trend["growth_pct"] is not None else "n/a"
+        flag = "❌" if metric in report["leaking"] else "✅"
+        print(f"{indent}{flag} {metric}: {trend['first']} -> {trend['last']} "
+              f"({per_hour} {units[metric]}/hour, {growth})")
+    icon = {"leak": "❌", "stable": "✅"}.get(report["verdict"], "⚠️")
+    print(f"{indent}{icon} Verdict: {report['verdict']} ({report['samples']} samples)")
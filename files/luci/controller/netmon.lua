@@ -17,6 +17,9 @@ function action_status()
         interface = uci:get("netmon", "config", "interface") or "lan",
         log_level = uci:get("netmon", "config", "log_level") or "info",
         data_retention = uci:get("netmon", "config", "data_retention") or "30",
+        raw_retention_hours = uci:get("netmon", "config", "raw_retention_hours") or "24",
+        hourly_retention_days = uci:get("netmon", "config", "hourly_retention_days") or "7",
+        max_db_size_mb = uci:get("netmon", "config", "max_db_size_mb") or "64",
         update_interval = uci:get("netmon", "config", "update_interval") or "60",
         web_port = uci:get("netmon", "config", "web_port") or "8080"
     }
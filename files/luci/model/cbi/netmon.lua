@@ -26,6 +26,20 @@ o = s:option(Value, "data_retention", translate("Data Retention (days)"))
 o.default = "30"
 o.datatype = "uinteger"
 
+o = s:option(Value, "raw_retention_hours", translate("Raw Traffic Retention (hours)"),
+    translate("Per-packet rows are kept this long, then only hourly and daily summaries remain"))
+o.default = "24"
+o.datatype = "uinteger"
+
+o = s:option(Value, "hourly_retention_days", translate("Hourly Summary Retention (days)"))
+o.default = "7"
+o.datatype = "uinteger"
+
+o = s:option(Value, "max_db_size_mb", translate("Database Size Limit (MB)"),
+    translate("Oldest data is trimmed beyond this size; 0 disables the limit"))
+o.default = "64"
+o.datatype = "uinteger"
+
 o = s:option(Value, "update_interval", translate("Update Interval (seconds)"))
 o.default = "60"
 o.datatype = "uinteger"
@@ -1,9 +1,11 @@
 // Advanced Network Monitor JavaScript
 // Global variables
 let devices = [];
+let devicesVersion = null; // device list version from the API, when it serves deltas
 let websiteVisits = [];
 let speedHistory = {};
 let refreshInterval = null;
+let pushSource = null;
 let currentDevice = null;
 
 // Initialize the application
@@ -36,9 +38,66 @@ function setupEventListeners() {
     });
 }
 
-// Start auto-refresh
+// Start auto-refresh: pushed updates where the API streams them, polling otherwise
 function startAutoRefresh() {
-    refreshInterval = setInterval(loadData, 5000); // Refresh every 5 seconds for live data
+    if (window.EventSource) {
+        startPush();
+    } else {
+        startPolling();
+    }
+}
+
+function startPolling() {
+    if (!refreshInterval) {
+        refreshInterval = setInterval(loadData, 5000); // Refresh every 5 seconds for live data
+    }
+}
+
+function stopPolling() {
+    clearInterval(refreshInterval);
+    refreshInterval = null;
+}
+
+// Server-Sent Events from the API daemon. The browser reconnects by itself and
+// resumes with Last-Event-ID; we poll whenever the stream is down.
+function startPush() {
+    pushSource = new EventSource('/api/events');
+    pushSource.addEventListener('open', stopPolling);
+    pushSource.addEventListener('error', function() {
+        startPolling();
+        if (pushSource && pushSource.readyState === EventSource.CLOSED) {
+            pushSource = null; // no push endpoint (plain CGI), stay on polling
+        }
+    });
+    pushSource.addEventListener('devices', function(event) {
+        const data = JSON.parse(event.data);
+        if (!data.delta) {
+            devices = data.devices || [];
+        } else if (data.since === devicesVersion) {
+            applyDeviceDelta(data);
+        } else {
+            // Missed an update; start over from the full list
+            devicesVersion = null;
+            loadDevices().then(renderDevices, () => {});
+            return;
+        }
+        devicesVersion = data.version || null;
+        renderDevices();
+    });
+    pushSource.addEventListener('websites', function(event) {
+        websiteVisits = JSON.parse(event.data).websites || [];
+        renderWebsiteList();
+    });
+    pushSource.addEventListener('speed_history', function(event) {
+        speedHistory = JSON.parse(event.data).speed_history || {};
+        updateSpeedChart();
+    });
+}
+
+function renderDevices() {
+    updateDashboardStats();
+    renderDeviceList();
+    updateSpeedChart();
 }
 
 // Load all data
@@ -62,12 +121,23 @@ async function loadData() {
 // Load devices with advanced stats
 async function loadDevices() {
     try {
-        const response = await fetch('/cgi-bin/advanced-api.sh?action=get_devices');
+        // With a version, ask only for what changed since then
+        const url = devicesVersion
+            ? `/cgi-bin/advanced-api.sh?action=get_devices&since=${encodeURIComponent(devicesVersion)}`
+            : '/cgi-bin/advanced-api.sh?action=get_devices';
+        const response = await fetch(url);
         if (!response.ok) throw new Error('API Error');
         
         const data = await response.json();
         if (data.success) {
-            devices = data.devices || [];
+            if (!data.delta) {
+                devices = data.devices || [];
+            } else if (data.since === devicesVersion) {
+                applyDeviceDelta(data);
+            } else {
+                return; // an overlapping refresh already moved us on
+            }
+            devicesVersion = data.version || null;
         } else {
             throw new Error(data.error || 'Failed to load devices');
         }
@@ -80,6 +150,7 @@ async function loadDevices() {
             
             const data = await response.json();
             if (data.success) {
+                devicesVersion = null;
                 devices = (data.devices || []).map(device => ({
                     ...device,
                     speed_in_mbps: Math.random() * 10, // Demo speeds
@@ -97,6 +168,20 @@ async function loadDevices() {
     }
 }
 
+// Apply a get_devices&since= answer to the current device list
+function applyDeviceDelta(delta) {
+    const removed = new Set(delta.removed || []);
+    const updates = new Map();
+    (delta.changed || []).concat(delta.added || []).forEach(device => updates.set(device.ip, device));
+    
+    devices = devices.filter(device => !removed.has(device.ip)).map(device => {
+        const update = updates.get(device.ip);
+        updates.delete(device.ip);
+        return update || { ...device, last_seen: delta.last_seen || device.last_seen };
+    });
+    updates.forEach(device => devices.push(device));
+}
+
 // Load website visits
 async function loadWebsiteVisits() {
     try {
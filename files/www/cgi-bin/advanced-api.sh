@@ -12,6 +12,9 @@ echo ""
 # Database path
 DB_FILE="/var/lib/netmon/netmon.db"
 
+# Hostnames resolved by netmon_daemon.py / hostname_cache.py
+HOSTS_CACHE="/tmp/netmon-hosts"
+
 # Parse request method and data
 REQUEST_METHOD="${REQUEST_METHOD:-GET}"
 QUERY_STRING="${QUERY_STRING:-}"
@@ -24,6 +27,9 @@ parse_query() {
             action=*)
                 ACTION=$(echo "$param" | cut -d'=' -f2)
                 ;;
+            hours=*)
+                HOURS=$(echo "$param" | cut -d'=' -f2)
+                ;;
         esac
     done
 }
@@ -101,10 +107,13 @@ get_devices() {
                 
                 # Get hostname
                 hostname="Device-${ip##*.}"
-                if command -v nslookup >/dev/null 2>&1; then
+                # Prefer the shared hostname cache ("*" = known to have no PTR record)
+                resolved=""
+                [ -f "$HOSTS_CACHE" ] && resolved=$(awk -v ip="$ip" '$1 == ip {print $2; exit}' "$HOSTS_CACHE")
+                if [ -z "$resolved" ] && command -v nslookup >/dev/null 2>&1; then
                     resolved=$(nslookup "$ip" 2>/dev/null | awk '/name =/ {gsub(/\.$/, "", $4); print $4; exit}')
-                    [ -n "$resolved" ] && hostname="$resolved"
                 fi
+                [ -n "$resolved" ] && [ "$resolved" != "*" ] && hostname="$resolved"
                 
                 # Get enhanced data from database
                 db_data=""
@@ -183,9 +192,48 @@ get_websites() {
     echo ']}'
 }
 
-# Get speed history
+# Get speed history for the last HOURS (default 24), from the rollup level
+# netmon_rollup.py keeps for that range: raw samples up to 2 hours, hourly
+# buckets up to a week, daily buckets beyond
 get_speed_history() {
-    echo '{"success":true,"speed_history":{}}'
+    # Same bounds as netmon_rollup.history_hours(): anything but a positive whole
+    # number gets the default, and no range goes back past what data_retention keeps
+    hours=24
+    digits=${HOURS#"${HOURS%%[!0]*}"}
+    case "$HOURS" in
+        ''|*[!0-9]*) ;;
+        *)
+            if [ -n "$digits" ]; then
+                hours=$digits
+                [ "${#digits}" -gt 6 ] && hours=999999
+            fi
+            ;;
+    esac
+    max_hours=8784
+    retention_days=$(uci -q get netmon.config.data_retention 2>/dev/null)
+    case "$retention_days" in
+        ''|*[!0-9]*) ;;
+        *) [ "$retention_days" -gt 0 ] && [ $((retention_days * 24)) -lt "$max_hours" ] && max_hours=$((retention_days * 24)) ;;
+    esac
+    [ "$hours" -gt "$max_hours" ] && hours=$max_hours
+    since=$(( $(date +%s) - hours * 3600 ))
+    
+    if [ "$hours" -le 2 ]; then
+        samples="SELECT device_ip, timestamp AS t, speed_in_mbps AS avg_in, speed_out_mbps AS avg_out, speed_in_mbps AS peak_in, speed_out_mbps AS peak_out FROM speed_history WHERE timestamp >= $since"
+    else
+        level="hourly"
+        [ "$hours" -gt 168 ] && level="daily"
+        samples="SELECT device_ip, bucket AS t, ROUND(sum_in_mbps / samples, 2) AS avg_in, ROUND(sum_out_mbps / samples, 2) AS avg_out, peak_in_mbps AS peak_in, peak_out_mbps AS peak_out FROM speed_$level WHERE bucket >= $since"
+    fi
+    
+    history=""
+    if command -v sqlite3 >/dev/null 2>&1; then
+        # One sqlite3 call builds the whole object; no rollup table yet means {}
+        history=$(sqlite3 "$DB_FILE" "SELECT json_group_object(device_ip, json(samples)) FROM (SELECT device_ip, json_group_array(json_object('timestamp', t, 'speed_in_mbps', avg_in, 'speed_out_mbps', avg_out, 'peak_in_mbps', peak_in, 'peak_out_mbps', peak_out)) AS samples FROM ($samples ORDER BY device_ip, t) GROUP BY device_ip);" 2>/dev/null)
+    fi
+    [ -n "$history" ] || history='{}'
+    
+    echo "{\"success\":true,\"speed_history\":$history}"
 }
 
 # Set speed limit for device
@@ -25,6 +25,9 @@ END_DATE=${END_DATE:-$(date +%Y-%m-%d)}
 REPORT_TYPE=${REPORT_TYPE:-summary}
 FORMAT=${FORMAT:-pdf}
 
+# Hostnames resolved by netmon_daemon.py / hostname_cache.py
+HOSTS_CACHE="/tmp/netmon-hosts"
+
 # Create temporary directory for report generation
 TEMP_DIR="/tmp/netmon-report-$$"
 mkdir -p "$TEMP_DIR"
@@ -70,10 +73,13 @@ generate_report_data() {
         while IFS=' ' read -r ip hw_type flags mac mask device; do
             if [ "$ip" != "IP" ] && [ "$mac" != "00:00:00:00:00:00" ] && [ -n "$mac" ]; then
                 hostname="Device-${ip##*.}"
-                if command -v nslookup >/dev/null 2>&1; then
+                # Prefer the shared hostname cache ("*" = known to have no PTR record)
+                resolved=""
+                [ -f "$HOSTS_CACHE" ] && resolved=$(awk -v ip="$ip" '$1 == ip {print $2; exit}' "$HOSTS_CACHE")
+                if [ -z "$resolved" ] && command -v nslookup >/dev/null 2>&1; then
                     resolved=$(nslookup "$ip" 2>/dev/null | awk '/name =/ {gsub(/\.$/, "", $4); print $4; exit}')
-                    [ -n "$resolved" ] && hostname="$resolved"
                 fi
+                [ -n "$resolved" ] && [ "$resolved" != "*" ] && hostname="$resolved"
                 
                 # Random data usage for demo
                 usage_mb=$(($(od -An -N2 -tu2 /dev/urandom 2>/dev/null | tr -d ' ') % 1000 + 50))
@@ -36,21 +36,128 @@ local function open_db()
     return db
 end
 
--- Generate HTML report
-local function generate_html_report(start_date, end_date, report_type)
-    local db, err = open_db()
-    if not db then
-        return nil, err
+-- Report rows are written straight from SQLite cursors as they are stepped,
+-- and totals come from SQL aggregates, so memory stays flat however many
+-- rows the period holds
+local COPY_CHUNK = 65536
+local WEBSITE_LIMIT = 100 -- Limit to first 100 entries
+
+local DEVICES_SQL = "SELECT ip, mac, hostname, first_seen, last_seen, is_active FROM devices ORDER BY last_seen DESC"
+local RANGE = "timestamp BETWEEN strftime('%%s', '%s') AND strftime('%%s', '%s')"
+local PERIOD_SQL = "SELECT CAST(strftime('%%s', '%s') AS INTEGER) AS s, CAST(strftime('%%s', '%s') AS INTEGER) AS e"
+
+-- When netmon_rollup.py has run, whole days come from traffic_daily and only
+-- the partial days at either end, plus rows past the rollup's high-water
+-- mark, are read from traffic; the unary + keeps that tail on the rowid
+local DAY = 86400
+local ROLLUP_TOTALS_SQL = "SELECT COALESCE(SUM(bytes_received), 0) AS download, COALESCE(SUM(bytes_sent), 0) AS upload FROM (" ..
+    "SELECT bytes_received, bytes_sent FROM traffic_daily WHERE bucket >= %d AND bucket < %d " ..
+    "UNION ALL SELECT bytes_received, bytes_sent FROM traffic WHERE timestamp >= %d AND timestamp < %d " ..
+    "UNION ALL SELECT bytes_received, bytes_sent FROM traffic WHERE timestamp >= %d AND timestamp <= %d " ..
+    "UNION ALL SELECT bytes_received, bytes_sent FROM traffic WHERE id > %d AND +timestamp >= %d AND +timestamp < %d)"
+local ROLLUP_WEBSITES_SQL = "SELECT COUNT(DISTINCT domain) AS count FROM (" ..
+    "SELECT domain FROM traffic_daily WHERE bucket >= %d AND bucket < %d AND domain != '' " ..
+    "UNION ALL SELECT url AS domain FROM traffic WHERE timestamp >= %d AND timestamp < %d AND url IS NOT NULL AND url != '' " ..
+    "UNION ALL SELECT url AS domain FROM traffic WHERE timestamp >= %d AND timestamp <= %d AND url IS NOT NULL AND url != '' " ..
+    "UNION ALL SELECT url AS domain FROM traffic WHERE id > %d AND +timestamp >= %d AND +timestamp < %d AND url IS NOT NULL AND url != '')"
+
+local CONTENT_TYPES = {
+    pdf = "application/pdf",
+    html = "text/html",
+    csv = "text/csv",
+    json = "application/json"
+}
+
+-- Format bytes
+local function format_bytes(bytes)
+    if bytes == 0 then return "0 B" end
+    local k = 1024
+    local sizes = {"B", "KB", "MB", "GB", "TB"}
+    local i = math.floor(math.log(bytes) / math.log(k)) + 1
+    if i > #sizes then i = #sizes end
+    return string.format("%.2f %s", bytes / math.pow(k, i-1), sizes[i])
+end
+
+-- Format timestamp
+local function format_datetime(timestamp)
+    return os.date("%Y-%m-%d %H:%M:%S", timestamp)
+end
+
+local function csv_field(value)
+    value = tostring(value)
+    if value:find('[,"\r\n]') then
+        return '"' .. value:gsub('"', '""') .. '"'
+    end
+    return value
+end
+
+local function csv_row(out, ...)
+    local fields = {...}
+    for i = 1, #fields do
+        fields[i] = csv_field(fields[i])
+    end
+    out:write(table.concat(fields, ","), "\n")
+end
+
+-- High-water mark of the traffic rollup, or nil when the rollup tables are missing
+local function rollup_mark(db)
+    local tables, mark = 0, nil
+    for row in db:nrows("SELECT COUNT(*) AS count FROM sqlite_master WHERE type = 'table' AND name IN ('rollup_state', 'traffic_daily')") do
+        tables = tonumber(row.count) or 0
+    end
+    if tables ~= 2 then return nil end
+    for row in db:nrows("SELECT last_id FROM rollup_state WHERE name = 'traffic'") do
+        mark = tonumber(row.last_id)
+    end
+    return mark
+end
+
+-- Arguments for the ROLLUP_* statements, or nil to fall back to the raw table
+local function rollup_bounds(db, start_date, end_date)
+    local mark = rollup_mark(db)
+    if not mark then return nil end
+    local s, e
+    for row in db:nrows(string.format(PERIOD_SQL, start_date, end_date)) do
+        s, e = tonumber(row.s), tonumber(row.e)
+    end
+    if not s or not e then return nil end
+    local lo = math.ceil(s / DAY) * DAY
+    local hi = math.floor((e + 1) / DAY) * DAY
+    if hi <= lo then lo, hi = e + 1, e + 1 end
+    return { lo, hi, s, lo, hi, e, mark, lo, hi }
+end
+
+-- Totals for the header, computed by SQLite instead of by walking every row
+local function collect_stats(db, start_date, end_date)
+    local stats = { devices = 0, download = 0, upload = 0, websites = 0 }
+    local totals_sql, websites_sql
+    local bounds = rollup_bounds(db, start_date, end_date)
+    if bounds then
+        totals_sql = string.format(ROLLUP_TOTALS_SQL, unpack(bounds))
+        websites_sql = string.format(ROLLUP_WEBSITES_SQL, unpack(bounds))
+    else
+        totals_sql = string.format("SELECT COALESCE(SUM(bytes_received), 0) AS download, COALESCE(SUM(bytes_sent), 0) AS upload FROM traffic WHERE " .. RANGE, start_date, end_date)
+        websites_sql = string.format("SELECT COUNT(DISTINCT url) AS count FROM traffic WHERE url IS NOT NULL AND url != '' AND " .. RANGE, start_date, end_date)
     end
     
-    -- Get data
-    local devices = {}
-    local traffic = {}
-    local websites = {}
+    for row in db:nrows("SELECT COUNT(*) AS count FROM devices") do
+        stats.devices = tonumber(row.count) or 0
+    end
+    for row in db:nrows(totals_sql) do
+        stats.download = tonumber(row.download) or 0
+        stats.upload = tonumber(row.upload) or 0
+    end
+    for row in db:nrows(websites_sql) do
+        stats.websites = tonumber(row.count) or 0
+    end
     
-    -- Devices
-    for row in db:nrows("SELECT ip, mac, hostname, first_seen, last_seen, is_active FROM devices ORDER BY last_seen DESC") do
-        table.insert(devices, {
+    return stats
+end
+
+-- Call fn once per device, one cursor step at a time
+local function each_device(db, fn)
+    for row in db:nrows(DEVICES_SQL) do
+        fn({
             ip = row.ip,
             mac = row.mac or "",
             hostname = row.hostname or "Unknown Device",
@@ -59,23 +166,13 @@ local function generate_html_report(start_date, end_date, report_type)
             is_active = (tonumber(row.is_active) or 0) == 1
         })
     end
-    
-    -- Traffic data
-    local sql = string.format("SELECT ip, url, timestamp, bytes_sent, bytes_received FROM traffic WHERE timestamp BETWEEN strftime('%%s', '%s') AND strftime('%%s', '%s') ORDER BY timestamp DESC", start_date, end_date)
+end
+
+-- Call fn for the most recent website visits in the period
+local function each_website(db, start_date, end_date, fn)
+    local sql = string.format("SELECT ip, url, timestamp, bytes_sent, bytes_received FROM traffic WHERE url IS NOT NULL AND url != '' AND " .. RANGE .. " ORDER BY timestamp DESC LIMIT %d", start_date, end_date, WEBSITE_LIMIT)
     for row in db:nrows(sql) do
-        table.insert(traffic, {
-            ip = row.ip,
-            url = row.url or "",
-            timestamp = tonumber(row.timestamp) or 0,
-            bytes_sent = tonumber(row.bytes_sent) or 0,
-            bytes_received = tonumber(row.bytes_received) or 0
-        })
-    end
-    
-    -- Website visits
-    local website_sql = string.format("SELECT ip, url, timestamp, bytes_sent, bytes_received FROM traffic WHERE url IS NOT NULL AND url != '' AND timestamp BETWEEN strftime('%%s', '%s') AND strftime('%%s', '%s') ORDER BY timestamp DESC", start_date, end_date)
-    for row in db:nrows(website_sql) do
-        table.insert(websites, {
+        fn({
             ip = row.ip,
             url = row.url,
             timestamp = tonumber(row.timestamp) or 0,
@@ -83,45 +180,11 @@ local function generate_html_report(start_date, end_date, report_type)
             bytes_received = tonumber(row.bytes_received) or 0
         })
     end
-    
-    db:close()
-    
-    -- Calculate statistics
-    local total_download = 0
-    local total_upload = 0
-    local unique_websites = {}
-    
-    for _, record in ipairs(traffic) do
-        total_download = total_download + record.bytes_received
-        total_upload = total_upload + record.bytes_sent
-    end
-    
-    for _, record in ipairs(websites) do
-        unique_websites[record.url] = true
-    end
-    
-    local website_count = 0
-    for _ in pairs(unique_websites) do
-        website_count = website_count + 1
-    end
-    
-    -- Format bytes
-    local function format_bytes(bytes)
-        if bytes == 0 then return "0 B" end
-        local k = 1024
-        local sizes = {"B", "KB", "MB", "GB", "TB"}
-        local i = math.floor(math.log(bytes) / math.log(k)) + 1
-        if i > #sizes then i = #sizes end
-        return string.format("%.2f %s", bytes / math.pow(k, i-1), sizes[i])
-    end
-    
-    -- Format timestamp
-    local function format_datetime(timestamp)
-        return os.date("%Y-%m-%d %H:%M:%S", timestamp)
-    end
-    
-    -- Generate HTML
-    local html = [[
+end
+
+-- Write the HTML report to out
+local function write_html_report(out, db, start_date, end_date, report_type, stats)
+    out:write([[
 <!DOCTYPE html>
 <html>
 <head>
@@ -149,26 +212,26 @@ local function generate_html_report(start_date, end_date, report_type)
     
     <div class="stats">
         <div class="stat-box">
-            <div class="stat-number">]] .. #devices .. [[</div>
+            <div class="stat-number">]] .. stats.devices .. [[</div>
             <div>Total Devices</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number">]] .. format_bytes(total_download) .. [[</div>
+            <div class="stat-number">]] .. format_bytes(stats.download) .. [[</div>
             <div>Total Download</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number">]] .. format_bytes(total_upload) .. [[</div>
+            <div class="stat-number">]] .. format_bytes(stats.upload) .. [[</div>
             <div>Total Upload</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number">]] .. website_count .. [[</div>
+            <div class="stat-number">]] .. stats.websites .. [[</div>
             <div>Unique Websites</div>
         </div>
     </div>
-]]
+]])
 
     if report_type == "detailed" or report_type == "summary" then
-        html = html .. [[
+        out:write([[
     <div class="section-title">Connected Devices</div>
     <table>
         <tr>
@@ -178,9 +241,9 @@ local function generate_html_report(start_date, end_date, report_type)
             <th>Last Seen</th>
             <th>Status</th>
         </tr>
-]]
-        for _, device in ipairs(devices) do
-            html = html .. string.format([[
+]])
+        each_device(db, function(device)
+            out:write(string.format([[
         <tr>
             <td>%s</td>
             <td>%s</td>
@@ -188,13 +251,13 @@ local function generate_html_report(start_date, end_date, report_type)
             <td>%s</td>
             <td>%s</td>
         </tr>
-]], device.hostname, device.ip, device.mac, format_datetime(device.last_seen), device.is_active and "Online" or "Offline")
-        end
-        html = html .. "    </table>\n"
+]], device.hostname, device.ip, device.mac, format_datetime(device.last_seen), device.is_active and "Online" or "Offline"))
+        end)
+        out:write("    </table>\n")
     end
 
     if report_type == "detailed" then
-        html = html .. [[
+        out:write([[
     <div class="section-title">Website Visits</div>
     <table>
         <tr>
@@ -203,58 +266,136 @@ local function generate_html_report(start_date, end_date, report_type)
             <th>Visit Time</th>
             <th>Data Transferred</th>
         </tr>
-]]
-        for i, website in ipairs(websites) do
-            if i <= 100 then -- Limit to first 100 entries
-                html = html .. string.format([[
+]])
+        each_website(db, start_date, end_date, function(website)
+            out:write(string.format([[
         <tr>
             <td>%s</td>
             <td>%s</td>
             <td>%s</td>
             <td>%s</td>
         </tr>
-]], website.url, website.ip, format_datetime(website.timestamp), format_bytes(website.bytes_sent + website.bytes_received))
-            end
-        end
-        html = html .. "    </table>\n"
+]], website.url, website.ip, format_datetime(website.timestamp), format_bytes(website.bytes_sent + website.bytes_received)))
+        end)
+        out:write("    </table>\n")
     end
 
-    html = html .. [[
+    out:write([[
     <div class="footer">
         <p>Generated by Network Monitor v1.0.0</p>
     </div>
 </body>
 </html>
-]]
+]])
+end
+
+-- Write the same report as CSV sections
+local function write_csv_report(out, db, start_date, end_date, report_type, stats)
+    csv_row(out, "Network Monitor Report")
+    csv_row(out, "Period", start_date, end_date)
+    csv_row(out, "Generated", os.date("%Y-%m-%d %H:%M:%S"))
+    csv_row(out, "Total Devices", stats.devices)
+    csv_row(out, "Total Download", format_bytes(stats.download), stats.download)
+    csv_row(out, "Total Upload", format_bytes(stats.upload), stats.upload)
+    csv_row(out, "Unique Websites", stats.websites)
+
+    if report_type == "detailed" or report_type == "summary" then
+        out:write("\n")
+        csv_row(out, "Device Name", "IP Address", "MAC Address", "Last Seen", "Status")
+        each_device(db, function(device)
+            csv_row(out, device.hostname, device.ip, device.mac, format_datetime(device.last_seen), device.is_active and "Online" or "Offline")
+        end)
+    end
+
+    if report_type == "detailed" then
+        out:write("\n")
+        csv_row(out, "Website", "Device IP", "Visit Time", "Data Transferred", "Bytes")
+        each_website(db, start_date, end_date, function(website)
+            local bytes = website.bytes_sent + website.bytes_received
+            csv_row(out, website.url, website.ip, format_datetime(website.timestamp), format_bytes(bytes), bytes)
+        end)
+    end
+end
 
-    return html
+-- Write ,"name":[...] with one element per item passed to each's callback
+local function json_array(out, name, each)
+    local first = true
+    out:write(',"', name, '":[')
+    each(function(item)
+        out:write(first and "" or ",", json.encode(item))
+        first = false
+    end)
+    out:write("]")
+end
+
+-- Write the same report as one JSON document, one array element at a time
+local function write_json_report(out, db, start_date, end_date, report_type, stats)
+    out:write('{"success":true,"period":', json.encode({ start_date = start_date, end_date = end_date }),
+              ',"generated":', json.encode(os.date("%Y-%m-%d %H:%M:%S")),
+              ',"stats":', json.encode({
+                  total_devices = stats.devices,
+                  total_download = stats.download,
+                  total_upload = stats.upload,
+                  unique_websites = stats.websites
+              }))
+
+    if report_type == "detailed" or report_type == "summary" then
+        json_array(out, "devices", function(fn) each_device(db, fn) end)
+    end
+    if report_type == "detailed" then
+        json_array(out, "websites", function(fn) each_website(db, start_date, end_date, fn) end)
+    end
+    out:write("}\n")
+end
+
+local WRITERS = {
+    html = write_html_report,
+    csv = write_csv_report,
+    json = write_json_report
+}
+
+-- Stream a report straight into a file under REPORTS_DIR
+local function generate_report_file(start_date, end_date, report_type, format)
+    local db, err = open_db()
+    if not db then
+        return nil, err
+    end
+
+    local extension = format == "pdf" and "html" or format
+    local filename = string.format("network-report-%s-to-%s", start_date, end_date)
+    local path = REPORTS_DIR .. "/" .. filename .. "." .. extension
+    local out = io.open(path, "w")
+    if not out then
+        db:close()
+        return nil, "Failed to write " .. extension:upper() .. " file"
+    end
+    out:setvbuf("full", COPY_CHUNK)
+
+    local stats = collect_stats(db, start_date, end_date)
+    local ok, write_err = pcall(WRITERS[extension], out, db, start_date, end_date, report_type, stats)
+    out:close()
+    db:close()
+    if not ok then
+        os.remove(path)
+        return nil, tostring(write_err)
+    end
+    return path
 end
 
 -- Convert HTML to PDF using wkhtmltopdf (if available) or return HTML
 local function generate_pdf_report(start_date, end_date, report_type)
-    local html_content = generate_html_report(start_date, end_date, report_type)
-    if not html_content then
-        return nil, "Failed to generate HTML report"
+    local html_file, err = generate_report_file(start_date, end_date, report_type, "pdf")
+    if not html_file then
+        return nil, err or "Failed to generate HTML report"
     end
     
-    local filename = string.format("network-report-%s-to-%s", start_date, end_date)
-    local html_file = REPORTS_DIR .. "/" .. filename .. ".html"
-    local pdf_file = REPORTS_DIR .. "/" .. filename .. ".pdf"
-    
-    -- Write HTML file
-    local file = io.open(html_file, "w")
-    if file then
-        file:write(html_content)
-        file:close()
-    else
-        return nil, "Failed to write HTML file"
-    end
+    local pdf_file = string.gsub(html_file, "%.html$", ".pdf")
     
     -- Try to convert to PDF using wkhtmltopdf
     local pdf_cmd = string.format("wkhtmltopdf --page-size A4 --margin-top 0.75in --margin-right 0.75in --margin-bottom 0.75in --margin-left 0.75in %s %s 2>/dev/null", html_file, pdf_file)
     local success = os.execute(pdf_cmd)
     
-    if success == 0 then
+    if success == 0 or success == true then
         -- PDF generated successfully
         return pdf_file, nil
     else
@@ -263,11 +404,21 @@ local function generate_pdf_report(start_date, end_date, report_type)
     end
 end
 
+-- Copy a file to stdout in fixed-size chunks
+local function stream_file(file)
+    while true do
+        local chunk = file:read(COPY_CHUNK)
+        if not chunk then break end
+        io.write(chunk)
+    end
+end
+
 -- Main handler
 local function handle_request()
     local start_date = params.start_date or ""
     local end_date = params.end_date or ""
     local report_type = params.report_type or "summary"
+    local format = params.format or "pdf"
     
     if start_date == "" or end_date == "" then
         print("Content-Type: application/json\n")
@@ -275,7 +426,18 @@ local function handle_request()
         return
     end
     
-    local report_file, err = generate_pdf_report(start_date, end_date, report_type)
+    if format ~= "pdf" and not WRITERS[format] then
+        print("Content-Type: application/json\n")
+        print(json.encode({ success = false, error = "Unsupported format: " .. tostring(format) }))
+        return
+    end
+    
+    local report_file, err
+    if format == "pdf" then
+        report_file, err = generate_pdf_report(start_date, end_date, report_type)
+    else
+        report_file, err = generate_report_file(start_date, end_date, report_type, format)
+    end
     if not report_file then
         print("Content-Type: application/json\n")
         print(json.encode({ success = false, error = err or "Failed to generate report" }))
@@ -283,29 +445,26 @@ local function handle_request()
     end
     
     -- Determine content type
-    local content_type = "application/pdf"
-    local filename = "network-report.pdf"
-    
-    if string.match(report_file, "%.html$") then
-        content_type = "text/html"
-        filename = "network-report.html"
-    end
+    local extension = string.match(report_file, "%.(%w+)$")
+    local content_type = CONTENT_TYPES[extension]
+    local filename = "network-report." .. extension
     
-    -- Read and serve the file
+    -- Serve the file without loading it into memory
     local file = io.open(report_file, "rb")
     if file then
-        local content = file:read("*all")
-        file:close()
+        local size = file:seek("end")
+        file:seek("set", 0)
         
         print("Content-Type: " .. content_type)
         print("Content-Disposition: attachment; filename=\"" .. filename .. "\"")
-        print("Content-Length: " .. #content)
+        print("Content-Length: " .. size)
         print("")
-        io.write(content)
+        stream_file(file)
+        file:close()
         
         -- Clean up
         os.remove(report_file)
-        if string.match(report_file, "%.pdf$") then
+        if extension == "pdf" then
             os.remove(string.gsub(report_file, "%.pdf$", ".html"))
         end
     else
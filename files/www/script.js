@@ -4,18 +4,24 @@ let devices = [];
 let trafficData = [];
 let websiteHistory = [];
 let trafficChart = null;
+let pushConnected = false;
 
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Network Monitor initialized');
     loadData();
     setupEventListeners();
+    startPush();
 });
 
 // Setup event listeners
 function setupEventListeners() {
-    // Auto-refresh every 30 seconds
-    setInterval(loadData, 30000);
+    // Auto-refresh every 30 seconds, unless the API daemon is pushing updates
+    setInterval(function() {
+        if (!pushConnected) {
+            loadData();
+        }
+    }, 30000);
     
     // Add refresh button event listener
     const refreshBtn = document.getElementById('refreshBtn');
@@ -77,6 +83,41 @@ async function loadDevices() {
     throw new Error('All API endpoints failed');
 }
 
+// Device updates pushed by the API daemon (Server-Sent Events) where it runs
+function startPush() {
+    if (!window.EventSource) return;
+    
+    const source = new EventSource('/api/events');
+    let version = null;
+    source.addEventListener('open', function() { pushConnected = true; });
+    source.addEventListener('error', function() { pushConnected = false; });
+    source.addEventListener('devices', function(event) {
+        const data = JSON.parse(event.data);
+        if (!data.delta) {
+            devices = data.devices || [];
+        } else if (data.since === version) {
+            const removed = new Set(data.removed || []);
+            const updates = new Map();
+            (data.changed || []).concat(data.added || []).forEach(device => updates.set(device.ip, device));
+            devices = devices.filter(device => !removed.has(device.ip)).map(device => {
+                const update = updates.get(device.ip);
+                updates.delete(device.ip);
+                return update || { ...device, last_seen: data.last_seen || device.last_seen };
+            });
+            updates.forEach(device => devices.push(device));
+        } else {
+            // Missed an update; a fresh stream starts with the full list
+            source.close();
+            pushConnected = false;
+            startPush();
+            return;
+        }
+        version = data.version || null;
+        renderDevicesTable();
+        updateDashboardStats();
+    });
+}
+
 // Render devices table
 function renderDevicesTable() {
     const deviceList = document.getElementById('deviceList');
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Fleet Runner
+Tests many routers concurrently and writes one aggregated JSON report
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_probe import probe_endpoints_async, print_probe_results
+
+
+def load_inventory(path, default_port="8080"):
+    """Load routers from a JSON list or a text file of 'host[:port] [name]' lines"""
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+
+    routers = []
+    if content.lstrip().startswith("["):
+        for item in json.loads(content):
+            if isinstance(item, str):
+                item = {"host": item}
+            host = item["host"]
+            routers.append({
+                "name": item.get("name", host),
+                "host": host,
+                "port": str(item.get("port", default_port))
+            })
+        return routers
+
+    for line in content.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        fields = line.split()
+        host, _, port = fields[0].partition(":")
+        routers.append({
+            "name": fields[1] if len(fields) > 1 else host,
+            "host": host,
+            "port": port or default_port
+        })
+    return routers
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout proxy that captures output of worker threads into per-thread buffers"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def capture(self):
+        self.local.buffer = io.StringIO()
+
+    def release(self):
+        buffer = getattr(self.local, "buffer", None)
+        self.local.buffer = None
+        return buffer.getvalue() if buffer else ""
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.fallback).write(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+
+def run_browser_checks(router, output):
+    """Run the Selenium checks for one router in a worker thread"""
+    from selenium_web_tester import NetworkMonitorTester
+
+    output.capture()
+    started = time.perf_counter()
+    tester = NetworkMonitorTester(router["host"], router["port"])
+    working_url = None
+    try:
+        if not tester.setup_driver():
+            return {"status": "error", "error": "WebDriver setup failed", "log": output.release()}
+        try:
+            if tester.test_main_page():
+                working_url = tester.base_url
+            else:
+                working_url = tester.test_alternative_urls()
+            if working_url:
+                tester.test_javascript_functionality(working_url)
+        finally:
+            tester.driver.quit()
+    except Exception as e:
+        tester.test_results.append({"test": "browser", "status": "failed", "error": str(e)})
+
+    failed = not working_url or any(r["status"] == "failed" for r in tester.test_results)
+    return {
+        "status": "failed" if failed else "passed",
+        "working_url": working_url,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "results": tester.test_results,
+        "readiness": tester.readiness.timings if tester.readiness else [],
+        "log": output.release()
+    }
+
+
+async def check_router(router, http_slots, executor, output, browser=True, timeout=10.0):
+    """Run HTTP probes and (optionally) browser checks for one router"""
+    entry = dict(router)
+    entry["started_at"] = time.time()
+    started = time.perf_counter()
+    base_url = f"http://{router['host']}:{router['port']}"
+
+    async def http_checks():
+        async with http_slots:
+            http_started = time.perf_counter()
+            results = await probe_endpoints_async(base_url, timeout=timeout)
+            return {
+                "status": "passed" if any(r["ok"] for r in results) else "failed",
+                "elapsed_ms": round((time.perf_counter() - http_started) * 1000, 2),
+                "results": results
+            }
+
+    tasks = [http_checks()]
+    if browser:
+        loop = asyncio.get_running_loop()
+        tasks.append(loop.run_in_executor(executor, run_browser_checks, router, output))
+
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    for key, outcome in zip(("http", "browser"), outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = {"status": "error", "error": str(outcome) or type(outcome).__name__}
+        entry[key] = outcome
+
+    entry["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    checks = [entry["http"]] + ([entry["browser"]] if browser else [])
+    entry["status"] = "passed" if all(c["status"] == "passed" for c in checks) else "failed"
+    return entry
+
+
+async def run_fleet_async(routers, http_workers=16, browser_workers=2, browser=True, timeout=10.0):
+    """Check every router concurrently through bounded HTTP and browser pools"""
+    http_slots = asyncio.Semaphore(http_workers)
+    output = _ThreadOutput(sys.stdout)
+    previous_stdout = sys.stdout
+    sys.stdout = output
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, browser_workers)) as executor:
+            entries = await asyncio.gather(*(
+                check_router(router, http_slots, executor, output, browser, timeout)
+                for router in routers
+            ))
+    finally:
+        sys.stdout = previous_stdout
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "router_count": len(entries),
+        "passed": sum(1 for e in entries if e["status"] == "passed"),
+        "failed": sum(1 for e in entries if e["status"] != "passed"),
+        "slowest_router_seconds": max((e["elapsed_seconds"] for e in entries), default=0),
+        "routers": entries
+    }
+
+
+def run_fleet(routers, http_workers=16, browser_workers=2, browser=True, timeout=10.0):
+    """Synchronous wrapper around run_fleet_async"""
+    return asyncio.run(run_fleet_async(routers, http_workers, browser_workers, browser, timeout))
+
+
+def print_fleet_summary(report):
+    """Print a short per-router summary"""
+    print("\n" + "=" * 60)
+    print("📊 FLEET SUMMARY")
+    print("=" * 60)
+    for entry in report["routers"]:
+        icon = "✅" if entry["status"] == "passed" else "❌"
+        print(f"{icon} {entry['name']} ({entry['host']}:{entry['port']}) - {entry['elapsed_seconds']:.2f} s")
+        print_probe_results(entry["http"].get("results", []), "      ")
+        if "browser" in entry:
+            browser = entry["browser"]
+            print(f"      🌐 Browser: {browser['status']}"
+                  + (f" ({browser['error']})" if browser.get("error") else ""))
+    print(f"\n🎯 {report['passed']}/{report['router_count']} routers passed in "
+          f"{report['elapsed_seconds']:.2f} s (slowest router: {report['slowest_router_seconds']:.2f} s)")
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Test a fleet of Network Monitor routers")
+    parser.add_argument("inventory", help="JSON list or text file with 'host[:port] [name]' lines")
+    parser.add_argument("--port", default="8080", help="Default port when the inventory omits one")
+    parser.add_argument("--http-workers", type=int, default=16, help="Routers probed over HTTP at once")
+    parser.add_argument("--browser-workers", type=int, default=2, help="Concurrent Chrome sessions")
+    parser.add_argument("--no-browser", action="store_true", help="Only run the HTTP probes")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request HTTP timeout")
+    parser.add_argument("--output", default="fleet_report.json", help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    routers = load_inventory(args.inventory, args.port)
+    if not routers:
+        print(f"❌ No routers found in {args.inventory}")
+        return 1
+
+    print(f"🚀 Testing {len(routers)} routers "
+          f"({args.http_workers} HTTP workers, {0 if args.no_browser else args.browser_workers} browser workers)")
+    report = run_fleet(routers, args.http_workers, args.browser_workers,
+                       not args.no_browser, args.timeout)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_fleet_summary(report)
+    print(f"📄 Report written to {os.path.abspath(args.output)}")
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Frontend Scaling Benchmark
+Serves the dashboard with canned API responses for a chosen device count
+and measures device-list render time, layout cost, long tasks and memory
+through WebDriver
+"""
+
+import json
+import mimetypes
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+from router_emulator import MAX_DEVICES, WWW_ROOT, fixture_devices
+
+TRACKED_DEVICES = 256  # devices[256] in advanced_netmon.c; update_device_stats ignores the rest
+USABLE_FRAME_MS = 100  # a refresh that blocks longer than this feels laggy
+
+# Buffered observer for long tasks, installed before page scripts run
+LONG_TASK_HOOK_JS = """
+(function () {
+    if (window.__netmonLongTasks) { return; }
+    window.__netmonLongTasks = [];
+    try {
+        new PerformanceObserver(function (list) {
+            list.getEntries().forEach(function (e) {
+                window.__netmonLongTasks.push({start_ms: e.startTime, duration_ms: e.duration});
+            });
+        }).observe({type: 'longtask', buffered: true});
+    } catch (e) {}
+})();
+"""
+
+# Stop the 5 s poll so only the measured renders run
+STOP_POLLING_JS = """
+if (typeof refreshInterval !== 'undefined' && refreshInterval) { clearInterval(refreshInterval); }
+return typeof devices !== 'undefined' ? devices.length : null;
+"""
+
+# renderDeviceList() arguments[0] times: script time, forced style+layout, and
+# time until the next frame has been produced
+RENDER_BENCH_JS = """
+var done = arguments[arguments.length - 1];
+var repeats = arguments[0];
+var list = document.getElementById('deviceList');
+var samples = [];
+var mark = performance.now();
+function once(i) {
+    if (i >= repeats) {
+        done({samples: samples, long_tasks: (window.__netmonLongTasks || []).filter(function (t) {
+            return t.start_ms >= mark;
+        })});
+        return;
+    }
+    var t0 = performance.now();
+    renderDeviceList();
+    var t1 = performance.now();
+    void list.offsetHeight;
+    var t2 = performance.now();
+    requestAnimationFrame(function () {
+        setTimeout(function () {
+            samples.push({script_ms: t1 - t0, layout_ms: t2 - t1, frame_ms: performance.now() - t0});
+            once(i + 1);
+        }, 0);
+    });
+}
+once(0);
+"""
+
+# One full refresh: three fetches, JSON parsing, every render function
+LOAD_CYCLE_JS = """
+var done = arguments[arguments.length - 1];
+var t0 = performance.now();
+loadData().then(function () {
+    void document.getElementById('deviceList').offsetHeight;
+    done(performance.now() - t0);
+}, function () { done(null); });
+"""
+
+DEVICE_ITEMS_JS = "return document.querySelectorAll('#deviceList .device-item').length;"
+
+
+def api_devices(count, seed=1):
+    """get_devices payload in the shape advanced-api.sh returns"""
+    devices = fixture_devices(count, seed)
+    for i, device in enumerate(devices):
+        device.update({"is_active": True, "is_blocked": i % 50 == 49,
+                       "speed_limit_kbps": 1024 if i % 20 == 19 else 0})
+    return devices
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Static files from the web root; canned JSON for every cgi-bin call"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path == "/netmon" or path.startswith("/netmon/"):
+            path = path[len("/netmon"):] or "/"
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        if path.startswith("/cgi-bin/"):
+            action = parse_qs(parts.query).get("action", [""])[0]
+            status, content_type, body = 200, "application/json", self.server.fixture.response(action)
+        else:
+            status, content_type, body = self.server.fixture.static(path)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureApiServer:
+    """Local server whose API answers come from memory, so any device count responds instantly"""
+
+    def __init__(self, host="127.0.0.1", port=0, www_root=WWW_ROOT, seed=1):
+        self.host = host
+        self.port = port
+        self.www_root = www_root
+        self.seed = seed
+        self.responses = {}
+        self.server = None
+        self._thread = None
+        self.set_devices(10)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def set_devices(self, count):
+        """Swap the canned get_devices/get_websites/get_speed_history answers"""
+        if not 0 <= count <= MAX_DEVICES:
+            raise ValueError(f"device count must be between 0 and {MAX_DEVICES}")
+        devices = api_devices(count, self.seed)
+        now = int(time.time())
+        websites = [{"device_ip": d["ip"], "domain": f"site{i % 40}.example.com", "timestamp": now - i * 30,
+                     "port": 443, "protocol": "HTTPS"} for i, d in enumerate(devices[:20])]
+        self.responses = {
+            "get_devices": json.dumps({"success": True, "devices": devices}).encode(),
+            "get_websites": json.dumps({"success": True, "websites": websites}).encode(),
+            "get_speed_history": b'{"success":true,"speed_history":{}}',
+        }
+        self.device_count = count
+
+    def response(self, action):
+        return self.responses.get(action, b'{"success":true,"message":"ok"}')
+
+    def static(self, path):
+        relative = os.path.normpath(path.lstrip("/") or "index.html")
+        full = os.path.join(self.www_root, relative)
+        if relative.startswith("..") or not os.path.isfile(full):
+            return 404, "text/plain", b"Not Found"
+        with open(full, "rb") as f:
+            return 200, mimetypes.guess_type(full)[0] or "application/octet-stream", f.read()
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), FixtureHandler)
+        self.server.fixture = self
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def install_long_task_hook(driver):
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": LONG_TASK_HOOK_JS})
+        return True
+    except (AttributeError, WebDriverException):
+        return False
+
+
+def cdp_metrics(driver, collect_garbage=False):
+    try:
+        if collect_garbage:
+            driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+        result = driver.execute_cdp_cmd("Performance.getMetrics", {})
+    except (AttributeError, WebDriverException):
+        return {}
+    return {m["name"]: m["value"] for m in result.get("metrics", [])}
+
+
+def measure_size(driver, readiness, server, count, page="advanced_index.html", repeats=5):
+    """Load the page against `count` canned devices and time its rendering"""
+    server.set_devices(count)
+    readiness.load(f"{server.base_url}/{page}", f"bench:{count}:load")
+    readiness.wait(f"bench:{count}:rendered",
+                   lambda d: d.execute_script(DEVICE_ITEMS_JS) >= min(count, 1) or None, timeout=120)
+    loaded = driver.execute_script(STOP_POLLING_JS)
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+    except (AttributeError, WebDriverException):
+        pass
+
+    driver.set_script_timeout(300)
+    cycle_ms = driver.execute_async_script(LOAD_CYCLE_JS)
+    before = cdp_metrics(driver)
+    bench = driver.execute_async_script(RENDER_BENCH_JS, repeats)
+    after = cdp_metrics(driver)
+    memory = cdp_metrics(driver, collect_garbage=True)
+
+    def median(key):
+        return round(statistics.median(s[key] for s in bench["samples"]), 1)
+
+    def per_render(metric, scale=1000.0):
+        if metric not in before or metric not in after:
+            return None
+        return round((after[metric] - before[metric]) * scale / repeats, 1)
+
+    long_tasks = [t["duration_ms"] for t in bench["long_tasks"]]
+    result = {
+        "devices": count,
+        "rendered": driver.execute_script(DEVICE_ITEMS_JS),
+        "loaded": loaded,
+        "repeats": repeats,
+        "load_cycle_ms": round(cycle_ms, 1) if cycle_ms is not None else None,
+        "script_ms": median("script_ms"),
+        "layout_ms": median("layout_ms"),
+        "frame_ms": median("frame_ms"),
+        "max_frame_ms": round(max(s["frame_ms"] for s in bench["samples"]), 1),
+        "cdp_layout_ms": per_render("LayoutDuration"),
+        "cdp_style_ms": per_render("RecalcStyleDuration"),
+        "cdp_script_ms": per_render("ScriptDuration"),
+        "long_tasks": len(long_tasks),
+        "long_task_ms": round(sum(long_tasks), 1),
+        "max_long_task_ms": round(max(long_tasks), 1) if long_tasks else 0,
+        "heap_mb": round(memory["JSHeapUsedSize"] / 1048576, 1) if "JSHeapUsedSize" in memory else None,
+        "dom_nodes": int(memory["Nodes"]) if "Nodes" in memory else None,
+    }
+    result["usable"] = result["frame_ms"] <= USABLE_FRAME_MS
+    return result
+
+
+def usability_limit(results):
+    """Smallest measured device count whose refresh no longer fits the frame budget"""
+    for result in sorted(results, key=lambda r: r["devices"]):
+        if not result["usable"]:
+            return result["devices"]
+    return None
+
+
+def print_frontend_results(results, indent=""):
+    print(f"{indent}{'devices':>8} {'cycle ms':>9} {'script':>8} {'layout':>8} {'frame':>8} {'max':>8} "
+          f"{'long tasks':>11} {'heap MB':>8} {'nodes':>8}")
+    for r in results:
+        flag = "✅" if r["usable"] else "❌"
+        cycle = f"{r['load_cycle_ms']:,.0f}" if r["load_cycle_ms"] is not None else "n/a"
+        print(f"{indent}{flag}{r['devices']:>6} {cycle:>9} {r['script_ms']:>8,.1f} {r['layout_ms']:>8,.1f} "
+              f"{r['frame_ms']:>8,.1f} {r['max_frame_ms']:>8,.1f} "
+              f"{r['long_tasks']:>3} / {r['max_long_task_ms']:>5,.0f} "
+              f"{r['heap_mb'] if r['heap_mb'] is not None else 'n/a':>8} "
+              f"{r['dom_nodes'] if r['dom_nodes'] is not None else 'n/a':>8}")
+    limit = usability_limit(results)
+    if limit is None:
+        print(f"{indent}✅ Every size refreshes within {USABLE_FRAME_MS} ms")
+    else:
+        print(f"{indent}⚠️ Refresh exceeds {USABLE_FRAME_MS} ms from {limit:,} devices")
+    if any(r["devices"] > TRACKED_DEVICES for r in results):
+        print(f"{indent}ℹ️ The capture daemon tracks at most {TRACKED_DEVICES} devices; larger sizes show what "
+              f"the dashboard would face without that cap")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Synthetic Database Generator
+Fills a netmon.db with seeded, reproducible data at the sizes a busy
+router reaches, for benchmarking the report and API queries
+"""
+
+import argparse
+import bisect
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+from netmon_schema import SCHEMA
+
+# Device profiles: (name, weight, hostname prefix, relative traffic volume)
+PROFILES = [
+    ("phone", 40, "android", 1.0),
+    ("laptop", 25, "laptop", 2.5),
+    ("tv", 10, "smart-tv", 6.0),
+    ("iot", 25, "esp", 0.05),
+]
+
+DOMAINS = [
+    "google.com", "youtube.com", "facebook.com", "instagram.com", "whatsapp.net", "netflix.com",
+    "googlevideo.com", "amazon.com", "apple.com", "icloud.com", "microsoft.com", "windowsupdate.com",
+    "tiktok.com", "twitter.com", "wikipedia.org", "reddit.com", "spotify.com", "github.com",
+    "cloudflare.com", "akamaihd.net", "linkedin.com", "zoom.us", "office.com", "live.com",
+    "yahoo.com", "bing.com", "twitch.tv", "discord.com", "telegram.org", "pinterest.com",
+    "ebay.com", "paypal.com", "dropbox.com", "adobe.com", "steampowered.com", "playstation.net",
+    "xboxlive.com", "roku.com", "openwrt.org", "debian.org", "ubuntu.com", "npmjs.org",
+    "pypi.org", "stackoverflow.com", "bbc.co.uk", "cnn.com", "nytimes.com", "imdb.com",
+    "doubleclick.net", "googlesyndication.com", "gstatic.com", "fbcdn.net", "cdninstagram.com",
+    "ntp.org", "tuya.com", "amazonaws.com", "azureedge.net", "fastly.net", "speedtest.net", "local",
+]
+
+# Relative activity per hour of day (UTC offset ignored: shape matters, not phase)
+HOURLY_ACTIVITY = [2, 1, 1, 1, 1, 2, 4, 6, 7, 7, 6, 6, 7, 7, 6, 6, 7, 8, 10, 12, 12, 11, 8, 4]
+
+PROTOCOLS = [("TCP", 443, 70), ("TCP", 80, 15), ("UDP", 443, 10), ("UDP", 53, 5)]
+
+
+def device_ip(index):
+    """Same addressing scheme as the router emulator fixtures"""
+    return f"192.168.{1 + index // 250}.{2 + index % 250}"
+
+
+def make_devices(rng, count, start, end):
+    """Device rows with a traffic profile each"""
+    names, weights = [p[0] for p in PROFILES], [p[1] for p in PROFILES]
+    profiles = {p[0]: p for p in PROFILES}
+    devices = []
+    for i in range(count):
+        profile = profiles[rng.choices(names, weights)[0]]
+        first_seen = start + int(rng.random() ** 3 * (end - start))  # most devices are long-lived
+        devices.append({
+            "ip": device_ip(i),
+            "mac": "02:" + ":".join(f"{rng.randrange(256):02x}" for _ in range(5)),
+            "hostname": f"{profile[2]}-{i + 1}",
+            "profile": profile[0],
+            "volume": profile[3] * rng.lognormvariate(0, 0.75),
+            "first_seen": first_seen,
+            "last_seen": end - int(rng.expovariate(1 / 3600.0)) if rng.random() < 0.6
+            else first_seen + int(rng.random() * (end - first_seen)),
+        })
+    return devices
+
+
+def hour_bins(start, end, total):
+    """Split `total` rows over the hours in [start, end) following the daily activity curve"""
+    hours = max(1, (end - start) // 3600)
+    weights = [HOURLY_ACTIVITY[((start // 3600) + h) % 24] for h in range(hours)]
+    scale = total / float(sum(weights))
+    counts, carried = [], 0.0
+    for weight in weights:
+        # Carry the fractional part so the counts add up to exactly `total`
+        carried += weight * scale
+        count = int(carried)
+        carried -= count
+        counts.append(count)
+    counts[-1] += total - sum(counts)
+    return [(start + h * 3600, count) for h, count in enumerate(counts)]
+
+
+def timed_rows(rng, start, end, total):
+    """Yield `total` ascending timestamps with a diurnal shape"""
+    for hour_start, count in hour_bins(start, end, total):
+        for offset in sorted(rng.randrange(3600) for _ in range(count)):
+            yield hour_start + offset
+
+
+def weighted_picker(rng, items, weights):
+    """Fast repeated weighted choice via a cumulative table"""
+    cumulative, total = [], 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return lambda: items[min(bisect.bisect_left(cumulative, rng.random() * total), len(items) - 1)]
+
+
+def traffic_rows(rng, devices, start, end, total):
+    """(ip, url, timestamp, bytes_sent, bytes_received) in insertion (time) order"""
+    pick_device = weighted_picker(rng, devices, [d["volume"] for d in devices])
+    # Zipf-like popularity so a handful of domains dominate, as on a real LAN
+    pick_domain = weighted_picker(rng, DOMAINS, [1.0 / (rank + 1) for rank in range(len(DOMAINS))])
+    for timestamp in timed_rows(rng, start, end, total):
+        device = pick_device()
+        roll = rng.random()
+        url = None if roll < 0.2 else "" if roll < 0.3 else pick_domain()
+        received = int(rng.lognormvariate(8.5, 2.0))
+        sent = int(received * rng.uniform(0.02, 0.3))
+        yield (device["ip"], url, timestamp, sent, received)
+
+
+def visit_rows(rng, devices, start, end, total):
+    pick_device = weighted_picker(rng, devices, [d["volume"] for d in devices])
+    pick_domain = weighted_picker(rng, DOMAINS, [1.0 / (rank + 1) for rank in range(len(DOMAINS))])
+    pick_protocol = weighted_picker(rng, PROTOCOLS, [p[2] for p in PROTOCOLS])
+    for timestamp in timed_rows(rng, start, end, total):
+        domain = pick_domain()
+        protocol, port, _ = pick_protocol()
+        yield (pick_device()["ip"], f"https://{domain}/", domain, timestamp, port, protocol,
+               int(rng.lognormvariate(10, 1.8)))
+
+
+def speed_rows(rng, devices, start, end, interval):
+    """One sample per device per interval while the device was around, in time order"""
+    for timestamp in range(start - start % interval + interval, end, interval):
+        activity = HOURLY_ACTIVITY[(timestamp // 3600) % 24] / 12.0
+        for device in devices:
+            if not device["first_seen"] <= timestamp <= device["last_seen"]:
+                continue
+            speed_in = round(rng.expovariate(1.0) * 8 * device["volume"] * activity, 2)
+            speed_out = round(speed_in * rng.uniform(0.05, 0.4), 2)
+            yield (device["ip"], timestamp, speed_in, speed_out,
+                   int(speed_in * 125000 * interval), int(speed_out * 125000 * interval))
+
+
+def insert_batched(db, sql, rows, batch_size, progress=None):
+    """executemany in fixed-size transactions; returns the row count"""
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.executemany(sql, batch)
+            db.commit()
+            count += len(batch)
+            batch.clear()
+            if progress:
+                progress(count)
+    if batch:
+        db.executemany(sql, batch)
+        db.commit()
+        count += len(batch)
+    return count
+
+
+def parse_day(text):
+    return int(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+def generate(path, devices=2000, days=90, traffic=1_000_000, visits=200_000, speed_interval=3600,
+             seed=1, end=None, batch_size=50_000, verbose=True):
+    """Build the database at `path` (replacing it); returns per-table row counts"""
+    rng = random.Random(seed)
+    if end is None:
+        end = int(time.time()) // 86400 * 86400
+    start = end - days * 86400
+
+    if os.path.exists(path):
+        os.remove(path)
+    db = sqlite3.connect(path)
+    # Bench database only: trade durability for load speed
+    db.execute("PRAGMA journal_mode=OFF")
+    db.execute("PRAGMA synchronous=OFF")
+    db.execute("PRAGMA cache_size=-65536")
+    tables = [s for s in SCHEMA if not s.lstrip().upper().startswith("CREATE INDEX")]
+    indexes = [s for s in SCHEMA if s.lstrip().upper().startswith("CREATE INDEX")]
+    for statement in tables:
+        db.execute(statement)
+
+    def report(table):
+        def progress(count):
+            if verbose:
+                print(f"\r   {table}: {count:,} rows", end="", flush=True)
+        return progress
+
+    def done(table, count, started):
+        if verbose:
+            elapsed = time.perf_counter() - started
+            print(f"\r   ✅ {table}: {count:,} rows in {elapsed:.1f} s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    counts = {}
+    device_list = make_devices(rng, devices, start, end)
+
+    started = time.perf_counter()
+    counts["devices"] = insert_batched(
+        db, "INSERT INTO devices (ip, mac, hostname, first_seen, last_seen, is_active) VALUES (?, ?, ?, ?, ?, ?)",
+        ((d["ip"], d["mac"], d["hostname"], d["first_seen"], d["last_seen"], int(end - d["last_seen"] < 86400))
+         for d in device_list), batch_size)
+    done("devices", counts["devices"], started)
+
+    started = time.perf_counter()
+    counts["advanced_devices"] = insert_batched(
+        db, "INSERT INTO advanced_devices (ip, mac, hostname, bytes_in, bytes_out, packets_in, packets_out, "
+            "speed_in_mbps, speed_out_mbps, last_seen, is_blocked, speed_limit_kbps, is_active) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((d["ip"], d["mac"], d["hostname"], int(d["volume"] * 2e9), int(d["volume"] * 3e8),
+          int(d["volume"] * 1.5e6), int(d["volume"] * 4e5), round(d["volume"] * 4, 2), round(d["volume"], 2),
+          d["last_seen"], int(rng.random() < 0.02), rng.choice([0] * 19 + [1024]), int(end - d["last_seen"] < 86400))
+         for d in device_list), batch_size)
+    done("advanced_devices", counts["advanced_devices"], started)
+
+    started = time.perf_counter()
+    counts["traffic"] = insert_batched(
+        db, "INSERT INTO traffic (ip, url, timestamp, bytes_sent, bytes_received) VALUES (?, ?, ?, ?, ?)",
+        traffic_rows(rng, device_list, start, end, traffic), batch_size, report("traffic"))
+    done("traffic", counts["traffic"], started)
+
+    started = time.perf_counter()
+    counts["website_visits"] = insert_batched(
+        db, "INSERT INTO website_visits (device_ip, website, domain, timestamp, port, protocol, bytes_transferred) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        visit_rows(rng, device_list, start, end, visits), batch_size, report("website_visits"))
+    done("website_visits", counts["website_visits"], started)
+
+    started = time.perf_counter()
+    counts["speed_history"] = insert_batched(
+        db, "INSERT INTO speed_history (device_ip, timestamp, speed_in_mbps, speed_out_mbps, bytes_in, bytes_out) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+        speed_rows(rng, device_list, start, end, speed_interval), batch_size, report("speed_history"))
+    done("speed_history", counts["speed_history"], started)
+
+    # Indexes after the load: one sort per index instead of a B-tree update per row
+    started = time.perf_counter()
+    for statement in indexes:
+        db.execute(statement)
+    db.commit()
+    if verbose:
+        print(f"   ✅ {len(indexes)} indexes built in {time.perf_counter() - started:.1f} s")
+    db.execute("ANALYZE")
+    db.commit()
+    db.close()
+    return counts
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic netmon.db for benchmarking")
+    parser.add_argument("--output", default="netmon-bench.db", help="Database file to (re)create")
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=90, help="History length ending at --end")
+    parser.add_argument("--traffic", type=int, default=1_000_000, help="Rows in traffic")
+    parser.add_argument("--visits", type=int, default=200_000, help="Rows in website_visits")
+    parser.add_argument("--speed-interval", type=int, default=3600,
+                        help="Seconds between speed_history samples per device")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--end", help="Last day (YYYY-MM-DD, UTC); defaults to today. Fix it for identical output")
+    parser.add_argument("--batch", type=int, default=50_000, help="Rows per transaction")
+    parser.add_argument("--arp", metavar="FILE", help="Also write the devices as a /proc/net/arp fixture")
+    args = parser.parse_args()
+
+    end = parse_day(args.end) if args.end else None
+    print(f"🏗️ Generating {args.output}: {args.devices:,} devices, {args.days} days, "
+          f"{args.traffic:,} traffic rows (seed {args.seed})")
+    started = time.perf_counter()
+    counts = generate(args.output, args.devices, args.days, args.traffic, args.visits,
+                      args.speed_interval, args.seed, end, args.batch)
+    elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(args.output) / 1048576
+    print(f"🏁 {sum(counts.values()):,} rows, {size_mb:,.1f} MB in {elapsed:.1f} s")
+
+    if args.arp:
+        from router_emulator import write_arp_fixture
+        rng = random.Random(args.seed)
+        end = end if end is not None else int(time.time()) // 86400 * 86400
+        write_arp_fixture(args.arp, make_devices(rng, args.devices, end - args.days * 86400, end))
+        print(f"📄 ARP fixture written to {args.arp}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Hostname Cache
+Reverse DNS cache with positive/negative TTLs, LRU eviction, DHCP lease
+seeding and background refresh, shared by the API daemon and the reports
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+DHCP_LEASES = "/tmp/dhcp.leases"
+HOSTS_CACHE = "/tmp/netmon-hosts"
+UNRESOLVED = "*"  # same marker dnsmasq uses for a lease without a hostname
+
+
+def reverse_lookup(ip):
+    """PTR lookup; returns None when the address has no name"""
+    try:
+        name = socket.gethostbyaddr(ip)[0]
+    except (OSError, UnicodeError):
+        return None
+    return name.rstrip(".") or None
+
+
+def read_dhcp_leases(path=DHCP_LEASES):
+    """Parse dnsmasq leases: "<expiry> <mac> <ip> <hostname> <client-id>" """
+    leases = {}
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 4 and fields[3] != UNRESOLVED:
+                    leases[fields[2]] = fields[3]
+    except OSError:
+        pass
+    return leases
+
+
+class HostnameCache:
+    """Thread-safe IP -> hostname cache that never blocks the caller on DNS"""
+
+    def __init__(self, max_entries=1024, ttl=3600, negative_ttl=300, workers=4,
+                 resolver=reverse_lookup, leases_path=DHCP_LEASES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.resolver = resolver
+        self.leases_path = leases_path
+        self._entries = OrderedDict()  # ip -> (hostname or None, expires_at)
+        self._pending = set()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hostname")
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "lookups": 0, "evictions": 0}
+
+    def _store(self, ip, hostname, ttl):
+        with self._lock:
+            self._entries[ip] = (hostname, time.monotonic() + ttl)
+            self._entries.move_to_end(ip)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _lookup(self, ip):
+        try:
+            hostname = self.resolver(ip)
+        except Exception:
+            hostname = None
+        self._store(ip, hostname, self.ttl if hostname else self.negative_ttl)
+        with self._lock:
+            self._pending.discard(ip)
+        return hostname
+
+    def _schedule(self, ip):
+        """Queue a background lookup unless one is already running; caller holds the lock.
+        After close() nothing is queued, so lookups just return what is cached"""
+        if ip in self._pending or self._closed:
+            return
+        self._pending.add(ip)
+        self.stats["lookups"] += 1
+        self._executor.submit(self._lookup, ip)
+
+    def get(self, ip, default=None):
+        """Cached name for ip, or default; expired and unknown entries refresh in the background"""
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                self.stats["misses"] += 1
+                self._schedule(ip)
+                return default
+            self._entries.move_to_end(ip)
+            hostname, expires_at = entry
+            if expires_at <= time.monotonic():
+                # Serve the stale name while the refresh runs
+                self.stats["stale"] += 1
+                self._schedule(ip)
+            else:
+                self.stats["hits"] += 1
+        return hostname or default
+
+    def resolve(self, ip, timeout=2.0, default=None):
+        """Like get(), but wait up to `timeout` seconds for a missing name"""
+        with self._lock:
+            entry = self._entries.get(ip)
+        if entry is not None and entry[1] > time.monotonic():
+            return self.get(ip, default)
+        with self._lock:
+            self._schedule(ip)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if ip not in self._pending:
+                    break
+            time.sleep(0.01)
+        return self.get(ip, default)
+
+    def wait(self, timeout):
+        """Wait until no lookups are outstanding; returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def prefetch(self, ips):
+        """Start lookups for every ip that is missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            for ip in ips:
+                entry = self._entries.get(ip)
+                if entry is None or entry[1] <= now:
+                    self._schedule(ip)
+
+    def seed_from_leases(self, path=None):
+        """Load DHCP lease hostnames; returns how many were added"""
+        leases = read_dhcp_leases(path or self.leases_path)
+        for ip, hostname in leases.items():
+            self._store(ip, hostname, self.ttl)
+        return len(leases)
+
+    def snapshot(self):
+        """{ip: hostname or None} for every entry, including expired ones"""
+        with self._lock:
+            return {ip: hostname for ip, (hostname, _) in self._entries.items()}
+
+    def save(self, path=HOSTS_CACHE):
+        """Write "<ip> <hostname>" lines for the CGI scripts; "*" marks a known miss"""
+        lines = [f"{ip} {hostname or UNRESOLVED}\n" for ip, hostname in self.snapshot().items()]
+        temp = f"{path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        # Atomic replace so a CGI never reads a half-written file
+        os.replace(temp, path)
+        return len(lines)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Resolve LAN hostnames once and share them with the CGI scripts")
+    parser.add_argument("--arp", default="/proc/net/arp", help="ARP table with the addresses to resolve")
+    parser.add_argument("--leases", default=DHCP_LEASES, help="dnsmasq lease file used as a seed")
+    parser.add_argument("--output", default=HOSTS_CACHE, help="Hosts cache file read by the CGI scripts")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Total time to wait for PTR lookups (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    from netmon_daemon import read_arp_table
+
+    cache = HostnameCache(workers=args.workers, leases_path=args.leases)
+    seeded = cache.seed_from_leases()
+    ips = [entry["ip"] for entry in read_arp_table(args.arp)]
+    cache.prefetch(ips)
+
+    started = time.monotonic()
+    cache.wait(args.timeout)
+
+    written = cache.save(args.output)
+    resolved = sum(1 for ip in ips if cache.get(ip))
+    print(f"🏷️ {resolved}/{len(ips)} devices named ({seeded} from DHCP leases) "
+          f"in {time.monotonic() - started:.1f} s; {written} entries written to {args.output}")
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""
+Network Monitor API Daemon
+Long-lived asyncio service answering the advanced-api.sh actions from an
+in-memory snapshot that is refreshed in the background (and as soon as the
+neighbour table changes), and pushing what changed to dashboards over
+Server-Sent Events
+"""
+
+import argparse
+import asyncio
+import json
+import hashlib
+import mimetypes
+import os
+import signal
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+from arp_watch import NeighbourTable, delta_size
+from hostname_cache import DHCP_LEASES, HOSTS_CACHE, HostnameCache
+from netmon_retention import UCI_CONFIG, read_uci_policy, run_retention
+from netmon_rollup import DEFAULT_HISTORY_HOURS, MAX_HISTORY_HOURS, history_hours, run_rollup, speed_history
+from netmon_schema import DB_PATH
+
+ARP_PATH = "/proc/net/arp"
+WWW_ROOT = "/www/netmon"
+API_PATHS = ("/cgi-bin/advanced-api.sh", "/api")
+EVENTS_PATH = "/api/events"
+REFRESH_INTERVAL = 5  # matches setInterval(loadData, 5000) in advanced_script.js
+CGI_TIMEOUT = 60
+ROLLUP_INTERVAL = 300
+RETENTION_INTERVAL = 3600
+ARP_INTERVAL = 1  # neighbour table rescans between snapshot refreshes
+DEVICE_HISTORY = 24  # device list versions kept for get_devices&since= deltas (2 minutes at 5 s)
+EVENT_BACKLOG = 256  # pushed events kept for Last-Event-ID resume
+SUBSCRIBER_QUEUE = 64  # events a slow push client may fall behind before it is dropped
+HEARTBEAT_INTERVAL = 15
+RETRY_MS = 3000  # EventSource reconnect delay
+
+CORS_HEADERS = [
+    ("Access-Control-Allow-Origin", "*"),
+    ("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
+    ("Access-Control-Allow-Headers", "Content-Type"),
+]
+REASONS = {200: "OK", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+           403: "Forbidden", 404: "Not Found", 500: "Internal Server Error", 502: "Bad Gateway",
+           504: "Gateway Timeout"}
+
+
+def read_arp_table(path=ARP_PATH):
+    """Parse /proc/net/arp, skipping incomplete entries, like the CGI scripts do"""
+    entries = []
+    try:
+        with open(path, encoding="ascii", errors="replace") as f:
+            next(f, None)  # header
+            for line in f:
+                fields = line.split()
+                if len(fields) < 6 or fields[3] == "00:00:00:00:00:00":
+                    continue
+                entries.append({"ip": fields[0], "hw_type": fields[1], "flags": fields[2],
+                                "mac": fields[3], "mask": fields[4], "device": fields[5]})
+    except OSError:
+        pass
+    return entries
+
+
+def query_rows(db_path, sql, params=()):
+    """Run one read query; a missing database or table yields no rows"""
+    if not os.path.exists(db_path):
+        return []
+    try:
+        db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+    except sqlite3.Error:
+        return []
+    try:
+        db.row_factory = sqlite3.Row
+        return db.execute(sql, params).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        db.close()
+
+
+def read_speed_history(db_path=DB_PATH, hours=DEFAULT_HISTORY_HOURS, now=None):
+    """Speed history from the rollup level that matches `hours`; empty when unreadable"""
+    if not os.path.exists(db_path):
+        return {}
+    try:
+        db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+    except sqlite3.Error:
+        return {}
+    try:
+        return speed_history(db, hours, now)
+    except sqlite3.Error:
+        return {}
+    finally:
+        db.close()
+
+
+def build_snapshot(arp_path=ARP_PATH, db_path=DB_PATH, hostnames=None, neighbours=None):
+    """Collect everything the dashboard polls for in one pass
+
+    hostnames is an optional HostnameCache; unknown names resolve in the
+    background and show up in a later snapshot. neighbours is an optional
+    NeighbourTable watching arp_path, which adds first-seen times.
+    """
+    now = int(time.time())
+    if neighbours is not None:
+        neighbours.scan()
+        arp = neighbours.entries()
+    else:
+        arp = read_arp_table(arp_path)
+
+    # One query for every device instead of one sqlite3 process per ARP entry
+    stats = {row["ip"]: row for row in query_rows(db_path,
+             "SELECT ip, hostname, bytes_in, bytes_out, speed_in_mbps, speed_out_mbps, "
+             "is_blocked, speed_limit_kbps FROM advanced_devices")}
+
+    devices = []
+    for entry in arp:
+        ip = entry["ip"]
+        row = stats.get(ip)
+        hostname = hostnames.get(ip) if hostnames else None
+        device = {
+            "ip": ip,
+            "mac": entry["mac"],
+            "hostname": hostname or (row["hostname"] if row else None) or f"Device-{ip.rsplit('.', 1)[-1]}",
+            "last_seen": now,
+            "is_active": True,
+            "bytes_in": (row["bytes_in"] or 0) if row else 0,
+            "bytes_out": (row["bytes_out"] or 0) if row else 0,
+            "speed_in_mbps": (row["speed_in_mbps"] or 0) if row else 0,
+            "speed_out_mbps": (row["speed_out_mbps"] or 0) if row else 0,
+            "is_blocked": bool(row and row["is_blocked"] == 1),
+            "speed_limit_kbps": (row["speed_limit_kbps"] or 0) if row else 0,
+        }
+        if entry.get("first_seen"):
+            device["first_seen"] = int(entry["first_seen"])
+        devices.append(device)
+
+    websites = [dict(row) for row in query_rows(db_path,
+                "SELECT device_ip, domain, timestamp, port, protocol FROM website_visits "
+                "ORDER BY timestamp DESC LIMIT 20")]
+
+    return {"built_at": now, "devices": devices, "websites": websites,
+            "speed_history": read_speed_history(db_path, now=now)}
+
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request; returns None when the client closed the connection"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError("malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    body = await reader.readexactly(length) if length else b""
+    parts = urlsplit(target)
+    return {"method": method.upper(), "target": target, "path": parts.path, "query": parts.query,
+            "version": version, "headers": headers, "body": body}
+
+
+def keep_alive_requested(request):
+    connection = request["headers"].get("connection", "").lower()
+    if request["version"] == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+async def write_response(writer, status, headers, body, keep_alive=True, head_only=False):
+    """Write a complete response with Content-Length"""
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}"]
+    lines += [f"{name}: {value}" for name, value in headers]
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    if not head_only:
+        writer.write(body)
+    await writer.drain()
+
+
+def json_body(data):
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def body_etag(body):
+    return '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header lists etag (weak comparison, as for GET)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip_weak = lambda tag: tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+    return strip_weak(etag) in {strip_weak(tag) for tag in if_none_match.split(",")}
+
+
+def sse_frame(event_id, event, data):
+    """One text/event-stream message; data is single-line JSON"""
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event.encode(), data)
+
+
+def device_state(device):
+    """A device without last_seen, which build_snapshot sets to the snapshot time on every pass"""
+    return {key: value for key, value in device.items() if key != "last_seen"}
+
+
+def device_delta(old, new):
+    """Devices added and changed, and IPs removed, between two {ip: device_state} maps"""
+    added = [state for ip, state in new.items() if ip not in old]
+    changed = [state for ip, state in new.items() if ip in old and old[ip] != state]
+    removed = [ip for ip in old if ip not in new]
+    return added, changed, removed
+
+
+class NetmonDaemon:
+    """Serves the dashboard API from memory and the rest of the web root as uhttpd would"""
+
+    def __init__(self, host="0.0.0.0", port=8080, arp_path=ARP_PATH, db_path=DB_PATH,
+                 www_root=WWW_ROOT, interval=REFRESH_INTERVAL, apply_rules=True,
+                 hostnames=None, hosts_file=None, rollup_interval=ROLLUP_INTERVAL,
+                 retention_interval=RETENTION_INTERVAL, config_path=UCI_CONFIG, arp_interval=ARP_INTERVAL):
+        self.host = host
+        self.port = port
+        self.arp_path = arp_path
+        self.db_path = db_path
+        self.www_root = www_root
+        self.interval = interval
+        self.apply_rules = apply_rules
+        self.hostnames = hostnames
+        self.hosts_file = hosts_file
+        self.rollup_interval = rollup_interval
+        self.retention_interval = retention_interval
+        self.config_path = config_path
+        self.arp_interval = arp_interval
+        self.neighbours = NeighbourTable(arp_path)
+        self.snapshot = None
+        self.responses = {}
+        self.etags = {}
+        # get_devices only gets a new version (and body) when a device changed
+        self.device_epoch = format(int(time.time()), "x")
+        self.device_seq = 0
+        self.device_version = None
+        self.device_history = OrderedDict()  # version -> {ip: device_state}
+        self.device_version_pushed = None
+        self._delta_bodies = {}
+        # Push channel: one queue per connected EventSource, plus recent events for resuming
+        self.subscribers = set()
+        self.events = deque(maxlen=EVENT_BACKLOG)  # (seq, frame)
+        self.event_seq = 0
+        self.server = None
+        self._refresh_task = None
+        self._rollup_task = None
+        self._retention_task = None
+        self._arp_task = None
+        self._refresh_lock = asyncio.Lock()
+
+    def history_limit_hours(self):
+        """Longest speed history worth querying: what the daily rollups keep under the UCI policy"""
+        days = read_uci_policy(self.config_path)["data_retention"]
+        return min(days * 24, MAX_HISTORY_HOURS) if days > 0 else MAX_HISTORY_HOURS
+
+    # -- snapshot ---------------------------------------------------------
+
+    async def refresh(self):
+        """Rebuild the snapshot off the event loop and swap it in"""
+        async with self._refresh_lock:
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(None, build_snapshot, self.arp_path, self.db_path,
+                                                  self.hostnames, self.neighbours)
+            if self.hostnames and self.hosts_file:
+                # Let advanced-api.sh and advanced-report.sh skip nslookup too
+                try:
+                    await loop.run_in_executor(None, self.hostnames.save, self.hosts_file)
+                except OSError as e:
+                    print(f"⚠️ Could not write {self.hosts_file}: {e}", file=sys.stderr)
+            self.snapshot = snapshot
+            responses = {
+                "get_websites": json_body({"success": True, "websites": snapshot["websites"]}),
+                "get_speed_history": json_body({"success": True, "speed_history": snapshot["speed_history"]}),
+            }
+            etags = {action: body_etag(body) for action, body in responses.items()}
+
+            states = {device["ip"]: device_state(device) for device in snapshot["devices"]}
+            if self.device_version is None or states != self.device_history[self.device_version]:
+                self.device_seq += 1
+                self.device_version = f"{self.device_epoch}.{self.device_seq}"
+                self.device_history[self.device_version] = states
+                while len(self.device_history) > DEVICE_HISTORY:
+                    self.device_history.popitem(last=False)
+                responses["get_devices"] = json_body({"success": True, "version": self.device_version,
+                                                      "devices": snapshot["devices"]})
+            else:
+                # Unchanged devices keep the earlier body, so its ETag keeps matching; its
+                # last_seen stays at the last change, deltas carry the current one
+                responses["get_devices"] = self.responses["get_devices"]
+            etags["get_devices"] = f'"{self.device_version}"'
+            previous_version, previous_etags = self.device_version_pushed, self.etags
+            self.responses = responses
+            self.etags = etags
+            self._delta_bodies = {}
+
+            if previous_version and previous_version != self.device_version:
+                self.publish("devices", self.device_delta_body(previous_version))
+            for action in ("get_websites", "get_speed_history"):
+                if previous_etags and previous_etags[action] != etags[action]:
+                    self.publish(action[len("get_"):], responses[action])
+            self.device_version_pushed = self.device_version
+
+    def device_delta_body(self, since):
+        """get_devices&since= answer: what changed between version `since` and the current one"""
+        body = self._delta_bodies.get(since)
+        if body is None:
+            added, changed, removed = device_delta(self.device_history[since],
+                                                   self.device_history[self.device_version])
+            last_seen = self.snapshot["built_at"]
+            body = json_body({
+                "success": True, "delta": True, "since": since, "version": self.device_version,
+                "last_seen": last_seen,
+                "added": [dict(state, last_seen=last_seen) for state in added],
+                "changed": [dict(state, last_seen=last_seen) for state in changed],
+                "removed": removed,
+            })
+            self._delta_bodies[since] = body
+        return body
+
+    # -- push -------------------------------------------------------------
+
+    def event_id(self, seq):
+        return f"{self.device_epoch}-{seq}"
+
+    def publish(self, event, data):
+        """Queue an event for every subscriber and keep it for Last-Event-ID resumes"""
+        self.event_seq += 1
+        frame = sse_frame(self.event_id(self.event_seq), event, data)
+        self.events.append((self.event_seq, frame))
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # A client this far behind reconnects and resumes from Last-Event-ID instead
+                self.subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def resume_frames(self, last_event_id):
+        """Events after last_event_id, or None when they are no longer (or never were) kept"""
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch != self.device_epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = self.events[0][0] if self.events else self.event_seq + 1
+        if seq > self.event_seq or seq < oldest - 1:
+            return None
+        return [frame for event_seq, frame in self.events if event_seq > seq]
+
+    def snapshot_frames(self):
+        """The full current state, tagged with the latest event id so a reconnect resumes from here"""
+        event_id = self.event_id(self.event_seq)
+        return [sse_frame(event_id, "devices", self.responses["get_devices"]),
+                sse_frame(event_id, "websites", self.responses["get_websites"]),
+                sse_frame(event_id, "speed_history", self.responses["get_speed_history"])]
+
+    async def handle_events(self, request, writer):
+        """Stream device, website and speed history updates until the client goes away"""
+        last_event_id = request["headers"].get("last-event-id") or \
+            parse_qs(request["query"]).get("lastEventId", [None])[0]
+        # Subscribing and picking the first frames happen without yielding, so no event falls in between
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        self.subscribers.add(queue)
+        frames = self.resume_frames(last_event_id)
+        if frames is None:
+            frames = self.snapshot_frames()
+        head = ["HTTP/1.1 200 OK", "Content-Type: text/event-stream", "Cache-Control: no-cache",
+                "Connection: keep-alive", "X-Accel-Buffering: no"]
+        head += [f"{name}: {value}" for name, value in CORS_HEADERS]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        writer.write(b"retry: %d\n\n" % RETRY_MS + b"".join(frames))
+        try:
+            await writer.drain()
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    frame = b": heartbeat\n\n"
+                if frame is None:
+                    break
+                writer.write(frame)
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️ Snapshot refresh failed: {e}", file=sys.stderr)
+
+    async def _arp_loop(self):
+        """Rescan the neighbour table often; refresh as soon as a device comes, goes or changes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.arp_interval)
+            try:
+                delta = await loop.run_in_executor(None, self.neighbours.scan)
+                if delta_size(delta):
+                    await self.refresh()
+            except Exception as e:
+                print(f"⚠️ Neighbour scan failed: {e}", file=sys.stderr)
+
+    async def _rollup_loop(self):
+        """Fold new traffic and speed rows into the hourly/daily tables"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, run_rollup, self.db_path)
+            except Exception as e:
+                print(f"⚠️ Rollup failed: {e}", file=sys.stderr)
+            await asyncio.sleep(self.rollup_interval)
+
+    async def _retention_loop(self):
+        """Apply the UCI retention policy; re-read each pass so LuCI changes apply"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.retention_interval)
+            try:
+                policy = read_uci_policy(self.config_path)
+                await loop.run_in_executor(None, run_retention, self.db_path, policy)
+            except Exception as e:
+                print(f"⚠️ Retention failed: {e}", file=sys.stderr)
+
+    # -- actions ----------------------------------------------------------
+
+    async def run_command(self, *argv):
+        """Run tc/iptables the way advanced-api.sh does, ignoring failures"""
+        if not self.apply_rules:
+            return
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            await process.wait()
+        except OSError:
+            pass
+
+    def write_device(self, ip, column, value):
+        """INSERT OR REPLACE one column, exactly like the shell API"""
+        db = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            db.execute(f"INSERT OR REPLACE INTO advanced_devices (ip, {column}, last_seen) VALUES (?, ?, ?)",
+                       (ip, value, int(time.time())))
+            db.commit()
+        except sqlite3.Error:
+            pass
+        finally:
+            db.close()
+
+    async def set_speed_limit(self, params):
+        ip, limit = params.get("device_ip"), params.get("speed_limit_kbps")
+        if not ip or not isinstance(limit, int):
+            return {"success": False, "error": "Missing device IP or speed limit"}
+        if limit > 0:
+            for argv in (
+                ("tc", "qdisc", "add", "dev", "br-lan", "root", "handle", "1:", "htb", "default", "30"),
+                ("tc", "class", "add", "dev", "br-lan", "parent", "1:", "classid", "1:1", "htb", "rate", "100mbit"),
+                ("tc", "class", "add", "dev", "br-lan", "parent", "1:1", "classid", "1:10", "htb",
+                 "rate", f"{limit}kbit", "ceil", f"{limit}kbit"),
+                ("tc", "filter", "add", "dev", "br-lan", "protocol", "ip", "parent", "1:0", "prio", "1",
+                 "u32", "match", "ip", "dst", ip, "flowid", "1:10"),
+                ("tc", "filter", "add", "dev", "br-lan", "protocol", "ip", "parent", "1:0", "prio", "1",
+                 "u32", "match", "ip", "src", ip, "flowid", "1:10"),
+            ):
+                await self.run_command(*argv)
+            message = f"Speed limit of {limit} Kbps applied to {ip}"
+        else:
+            await self.run_command("tc", "qdisc", "del", "dev", "br-lan", "root")
+            message = f"Speed limit removed from {ip}"
+        await asyncio.get_running_loop().run_in_executor(None, self.write_device, ip, "speed_limit_kbps", limit)
+        return {"success": True, "message": message}
+
+    async def block_device(self, params):
+        ip, block = params.get("device_ip"), params.get("block")
+        if not ip or not isinstance(block, bool):
+            return {"success": False, "error": "Missing device IP or block action"}
+        flag = "-I" if block else "-D"
+        await self.run_command("iptables", flag, "FORWARD", "-s", ip, "-j", "DROP")
+        await self.run_command("iptables", flag, "FORWARD", "-d", ip, "-j", "DROP")
+        await asyncio.get_running_loop().run_in_executor(None, self.write_device, ip, "is_blocked", int(block))
+        state = "blocked" if block else "unblocked"
+        return {"success": True, "message": f"Device {ip} has been {state}"}
+
+    async def handle_api(self, request):
+        """Answer one advanced-api.sh request; returns (status, headers, body)"""
+        headers = [("Content-Type", "application/json")] + CORS_HEADERS
+        if request["method"] == "OPTIONS":
+            return 200, headers, b""
+
+        if request["method"] == "POST":
+            # advanced-api.sh takes the action from the POST body when there is one
+            try:
+                params = json.loads(request["body"] or b"{}")
+            except ValueError:
+                params = {}
+            if not isinstance(params, dict):
+                params = {}
+            action = params.get("action")
+        else:
+            query = parse_qs(request["query"])
+            params = {key: values[0] for key, values in query.items()}
+            action = params.get("action")
+
+        if action == "get_speed_history" and "hours" in params:
+            hours = history_hours(params["hours"], self.history_limit_hours())
+            if hours != DEFAULT_HISTORY_HOURS:
+                history = await asyncio.get_running_loop().run_in_executor(
+                    None, read_speed_history, self.db_path, hours)
+                return 200, headers, json_body({"success": True, "speed_history": history})
+        if action == "get_devices" and params.get("since") in self.device_history:
+            return 200, headers + [("Cache-Control", "no-store")], self.device_delta_body(params["since"])
+        if action in self.responses:
+            # no-cache: browsers keep the body but revalidate it with If-None-Match on every poll
+            headers = headers + [("ETag", self.etags[action]), ("Cache-Control", "no-cache")]
+            if etag_matches(request["headers"].get("if-none-match"), self.etags[action]):
+                return 304, headers, b""
+            return 200, headers, self.responses[action]
+        if action == "set_speed_limit":
+            result = await self.set_speed_limit(params)
+        elif action == "block_device":
+            result = await self.block_device(params)
+        else:
+            return 200, headers, json_body({"success": False, "error": "Unknown action"})
+
+        if result["success"]:
+            await self.refresh()
+        return 200, headers, json_body(result)
+
+    # -- everything else --------------------------------------------------
+
+    async def handle_cgi(self, request):
+        """Run any other /cgi-bin/ script like uhttpd would"""
+        name = request["path"][len("/cgi-bin/"):]
+        path = os.path.join(self.www_root, "cgi-bin", name)
+        if "/" in name or not os.path.isfile(path):
+            return 404, [("Content-Type", "text/plain")], b"Not Found"
+
+        env = dict(os.environ, GATEWAY_INTERFACE="CGI/1.1", REQUEST_METHOD=request["method"],
+                   QUERY_STRING=request["query"], CONTENT_LENGTH=str(len(request["body"])),
+                   CONTENT_TYPE=request["headers"].get("content-type", ""),
+                   SCRIPT_NAME=request["path"], SERVER_PORT=str(self.port))
+        try:
+            process = await asyncio.create_subprocess_exec(
+                path, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL, env=env)
+            output, _ = await asyncio.wait_for(process.communicate(request["body"]), CGI_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            return 504, [("Content-Type", "text/plain")], b"Script timed out"
+        except OSError:
+            return 403, [("Content-Type", "text/plain")], b"Forbidden"
+
+        head, separator, body = output.partition(b"\r\n\r\n")
+        if not separator:
+            head, separator, body = output.partition(b"\n\n")
+        status, headers = 200, []
+        for line in head.decode("latin-1").splitlines():
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "status":
+                code = value.split()[0] if value.split() else ""
+                if not code.isdigit() or not 100 <= int(code) <= 599:
+                    return 502, [("Content-Type", "text/plain")], b"Bad Gateway: malformed CGI Status header"
+                status = int(code)
+            elif name.strip() and name.strip().lower() != "content-length":
+                headers.append((name.strip(), value.strip()))
+        return status, headers, body
+
+    def handle_static(self, request):
+        """Serve a file from the web root"""
+        relative = os.path.normpath(request["path"].lstrip("/")) if request["path"].strip("/") else "index.html"
+        if relative.startswith(".."):
+            return 403, [("Content-Type", "text/plain")], b"Forbidden"
+        full = os.path.join(self.www_root, relative)
+        if os.path.isdir(full):
+            full = os.path.join(full, "index.html")
+        if not os.path.isfile(full):
+            return 404, [("Content-Type", "text/plain")], b"Not Found"
+        with open(full, "rb") as f:
+            body = f.read()
+        return 200, [("Content-Type", mimetypes.guess_type(full)[0] or "application/octet-stream")], body
+
+    async def dispatch(self, request):
+        if request["path"] in API_PATHS:
+            return await self.handle_api(request)
+        if request["path"].startswith("/cgi-bin/"):
+            return await self.handle_cgi(request)
+        return self.handle_static(request)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    await write_response(writer, 400, [("Content-Type", "text/plain")], b"Bad Request", False)
+                    break
+                if request is None:
+                    break
+                if request["path"] == EVENTS_PATH:
+                    await self.handle_events(request, writer)
+                    break
+                keep_alive = keep_alive_requested(request)
+                try:
+                    status, headers, body = await self.dispatch(request)
+                except Exception as e:
+                    # One bad request must not take the connection down without an answer
+                    print(f"⚠️ {request['method']} {request['target']} failed: {type(e).__name__}: {e}",
+                          file=sys.stderr)
+                    status, headers, body = 500, [("Content-Type", "text/plain")], b"Internal Server Error"
+                await write_response(writer, status, headers, body, keep_alive, request["method"] == "HEAD")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    # -- lifecycle --------------------------------------------------------
+
+    async def start(self):
+        if self.hostnames:
+            self.hostnames.seed_from_leases()
+        await self.refresh()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        if self.arp_interval:
+            self._arp_task = asyncio.create_task(self._arp_loop())
+        if self.rollup_interval:
+            self._rollup_task = asyncio.create_task(self._rollup_loop())
+        if self.retention_interval:
+            self._retention_task = asyncio.create_task(self._retention_loop())
+        return self
+
+    async def stop(self):
+        for task in (self._refresh_task, self._arp_task, self._rollup_task, self._retention_task):
+            if task:
+                task.cancel()
+        for queue in list(self.subscribers):
+            # End each event stream so wait_closed() is not held up by open connections
+            self.subscribers.discard(queue)
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.hostnames:
+            self.hostnames.close()
+
+
+async def serve(args):
+    hostnames = None
+    if not args.no_resolve:
+        hostnames = HostnameCache(ttl=args.hostname_ttl, negative_ttl=args.negative_ttl, leases_path=args.leases)
+    daemon = NetmonDaemon(args.host, args.port, args.arp, args.db, args.www, args.interval,
+                          apply_rules=not args.no_rules, hostnames=hostnames, hosts_file=args.hosts_file,
+                          rollup_interval=args.rollup_interval, retention_interval=args.retention_interval,
+                          config_path=args.config, arp_interval=args.arp_interval)
+    await daemon.start()
+    print(f"🚀 Network Monitor API daemon listening on {args.host}:{daemon.port}")
+    print(f"🔄 Snapshot refresh every {args.interval} s ({len(daemon.snapshot['devices'])} devices)")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await daemon.stop()
+    print("🏁 Daemon stopped")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Persistent Network Monitor JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--www", default=WWW_ROOT, help="Web root served next to the API")
+    parser.add_argument("--arp", default=ARP_PATH, help="ARP table to read")
+    parser.add_argument("--db", default=DB_PATH, help="netmon.db path")
+    parser.add_argument("--interval", type=float, default=REFRESH_INTERVAL, help="Snapshot refresh interval (s)")
+    parser.add_argument("--arp-interval", type=float, default=ARP_INTERVAL,
+                        help="Seconds between neighbour table scans that refresh early on changes (0 disables)")
+    parser.add_argument("--no-rules", action="store_true", help="Do not run tc/iptables for POST actions")
+    parser.add_argument("--no-resolve", action="store_true", help="Skip reverse DNS for device names")
+    parser.add_argument("--leases", default=DHCP_LEASES, help="dnsmasq leases used to seed names")
+    parser.add_argument("--hostname-ttl", type=float, default=3600, help="Seconds to keep a resolved name")
+    parser.add_argument("--negative-ttl", type=float, default=300, help="Seconds to remember a failed lookup")
+    parser.add_argument("--hosts-file", default=HOSTS_CACHE, help="Hosts cache shared with the CGI scripts")
+    parser.add_argument("--rollup-interval", type=float, default=ROLLUP_INTERVAL,
+                        help="Seconds between traffic/speed rollup passes (0 disables)")
+    parser.add_argument("--retention-interval", type=float, default=RETENTION_INTERVAL,
+                        help="Seconds between retention passes (0 disables)")
+    parser.add_argument("--config", default=UCI_CONFIG, help="UCI file holding the retention policy")
+    args = parser.parse_args()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Retention
+Keeps netmon.db within its storage budget: raw per-packet rows are rolled
+up and then deleted in bounded batches, old rollups expire, and freed pages
+go back to the filesystem through incremental vacuum
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from netmon_rollup import DAY, HOUR, high_water_mark, run_rollup
+from netmon_schema import DB_PATH
+
+UCI_CONFIG = "/etc/config/netmon"
+
+# Defaults for the options in files/netmon.config; 0 keeps data forever / disables the cap
+DEFAULT_POLICY = {
+    "raw_retention_hours": 24,
+    "hourly_retention_days": 7,
+    "data_retention": 30,
+    "max_db_size_mb": 64,
+    "retention_batch": 5000,
+    "vacuum_pages": 1024,
+}
+
+# (table, age column, policy option, seconds per unit, rollup guarding the delete)
+# Raw rows are only deleted once the rollup's high-water mark has passed them
+RETENTION_TABLES = [
+    ("traffic", "timestamp", "raw_retention_hours", HOUR, "traffic"),
+    ("speed_history", "timestamp", "raw_retention_hours", HOUR, "speed_history"),
+    ("website_visits", "timestamp", "data_retention", DAY, None),
+    ("traffic_hourly", "bucket", "hourly_retention_days", DAY, None),
+    ("speed_hourly", "bucket", "hourly_retention_days", DAY, None),
+    ("traffic_daily", "bucket", "data_retention", DAY, None),
+    ("speed_daily", "bucket", "data_retention", DAY, None),
+]
+
+# Trimmed oldest-first, beyond policy, while the database is over max_db_size_mb:
+# raw rows before summaries, hourly before daily; (table, age column, guard, step)
+CAP_TABLES = [
+    ("traffic", "timestamp", "traffic", HOUR),
+    ("speed_history", "timestamp", "speed_history", HOUR),
+    ("website_visits", "timestamp", None, HOUR),
+    ("traffic_hourly", "bucket", None, DAY),
+    ("speed_hourly", "bucket", None, DAY),
+    ("traffic_daily", "bucket", None, DAY),
+    ("speed_daily", "bucket", None, DAY),
+]
+MAX_BATCHES = 1000  # per table per run, so one pass never runs unbounded
+
+
+def read_uci_policy(path=UCI_CONFIG):
+    """Retention options from the netmon UCI file, falling back to DEFAULT_POLICY"""
+    policy = dict(DEFAULT_POLICY)
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split(None, 2)
+                if len(fields) == 3 and fields[0] == "option" and fields[1] in policy:
+                    value = fields[2].strip().strip("'\"")
+                    try:
+                        policy[fields[1]] = int(value)
+                    except ValueError:
+                        pass
+    except OSError:
+        pass
+    return policy
+
+
+def existing_tables(db):
+    return {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def used_bytes(db):
+    """Bytes held by live pages, i.e. what the file shrinks to after a full vacuum"""
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+    freelist = db.execute("PRAGMA freelist_count").fetchone()[0]
+    return (page_count - freelist) * page_size
+
+
+def delete_batches(db, table, column, cutoff, guard_id=None, batch=DEFAULT_POLICY["retention_batch"],
+                   max_batches=MAX_BATCHES, pause=0):
+    """Delete rows with column < cutoff, `batch` rows per transaction; returns rows deleted
+
+    Short transactions keep the capture daemon's inserts from waiting behind
+    one long delete.
+    """
+    guard = " AND id <= ?" if guard_id is not None else ""
+    sql = f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {column} < ?{guard} LIMIT ?)"
+    params = (cutoff, guard_id, batch) if guard_id is not None else (cutoff, batch)
+    deleted = 0
+    for _ in range(max_batches):
+        with db:
+            count = db.execute(sql, params).rowcount
+        deleted += count
+        if count < batch:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def oldest(db, table, column):
+    return db.execute(f"SELECT MIN({column}) FROM {table}").fetchone()[0]
+
+
+def enforce_cap(db, limit_bytes, tables, batch, pause=0):
+    """Trim the oldest raw rows until live data fits in limit_bytes; returns rows deleted per table"""
+    trimmed = {}
+    for table, column, guard, step in CAP_TABLES:
+        if table not in tables:
+            continue
+        guard_id = high_water_mark(db, guard) if guard else None
+        for _ in range(MAX_BATCHES):
+            if used_bytes(db) <= limit_bytes:
+                return trimmed
+            start = oldest(db, table, column)
+            if start is None:
+                break
+            count = delete_batches(db, table, column, start + step, guard_id, batch, pause=pause)
+            if not count:
+                break
+            trimmed[table] = trimmed.get(table, 0) + count
+    return trimmed
+
+
+def incremental_vacuum(db, pages):
+    """Release free pages `pages` at a time; returns pages released"""
+    mode = db.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        return 0
+    released = 0
+    while True:
+        free = db.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            break
+        db.execute(f"PRAGMA incremental_vacuum({min(free, pages)})").fetchall()
+        after = db.execute("PRAGMA freelist_count").fetchone()[0]
+        if after >= free:
+            break
+        released += free - after
+    return released
+
+
+def convert_to_incremental(db):
+    """One-off: switch an existing database to auto_vacuum=INCREMENTAL (rewrites the file)"""
+    db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    db.execute("VACUUM")
+
+
+def run_retention(db_path=DB_PATH, policy=None, now=None, convert=False, pause=0):
+    """Roll up, apply the age policies and the size cap, then vacuum; returns a report"""
+    policy = dict(DEFAULT_POLICY, **(policy or {}))
+    now = int(now if now is not None else time.time())
+    started = time.perf_counter()
+    size_before = os.path.getsize(db_path)
+
+    # Compact first, so every raw row about to expire is already in the summaries
+    rollup = run_rollup(db_path)
+
+    db = sqlite3.connect(db_path, timeout=30)
+    try:
+        if convert and db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            convert_to_incremental(db)
+        tables = existing_tables(db)
+        batch = policy["retention_batch"]
+
+        deleted = {}
+        for table, column, option, unit, guard in RETENTION_TABLES:
+            keep = policy[option]
+            if table not in tables or keep <= 0:
+                continue
+            guard_id = high_water_mark(db, guard) if guard else None
+            count = delete_batches(db, table, column, now - keep * unit, guard_id, batch, pause=pause)
+            if count:
+                deleted[table] = count
+
+        trimmed = {}
+        if policy["max_db_size_mb"] > 0:
+            trimmed = enforce_cap(db, policy["max_db_size_mb"] * 1024 * 1024, tables, batch, pause)
+
+        free_before = db.execute("PRAGMA freelist_count").fetchone()[0]
+        released = incremental_vacuum(db, policy["vacuum_pages"])
+        auto_vacuum = db.execute("PRAGMA auto_vacuum").fetchone()[0]
+        live = used_bytes(db)
+    finally:
+        db.close()
+
+    size_after = os.path.getsize(db_path)
+    return {
+        "rolled_up": rollup["ids"],
+        "deleted": deleted,
+        "trimmed": trimmed,
+        "free_pages": free_before,
+        "released_pages": released,
+        "incremental_vacuum": auto_vacuum == 2,
+        "size_before": size_before,
+        "size_after": size_after,
+        "reclaimed_bytes": size_before - size_after,
+        "live_bytes": live,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def print_report(report):
+    print(f"📦 Rolled up {report['rolled_up']['traffic']:,} traffic and "
+          f"{report['rolled_up']['speed_history']:,} speed_history ids")
+    for table, count in report["deleted"].items():
+        print(f"   🗑️ {table}: {count:,} rows past retention")
+    for table, count in report["trimmed"].items():
+        print(f"   ✂️ {table}: {count:,} rows trimmed to fit the size cap")
+    if not report["deleted"] and not report["trimmed"]:
+        print("   ✅ Nothing past retention")
+    if report["incremental_vacuum"]:
+        print(f"🧹 Incremental vacuum released {report['released_pages']:,} of {report['free_pages']:,} free pages")
+    else:
+        print(f"⚠️ auto_vacuum is off: {report['free_pages']:,} free pages stay in the file "
+              f"(run once with --convert to switch to incremental vacuum)")
+    print(f"💾 {report['size_before'] / 1048576:,.1f} MB -> {report['size_after'] / 1048576:,.1f} MB "
+          f"(reclaimed {report['reclaimed_bytes'] / 1048576:,.1f} MB, live data {report['live_bytes'] / 1048576:,.1f} MB) "
+          f"in {report['seconds']} s")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Apply Network Monitor retention policies to netmon.db")
+    parser.add_argument("--db", default=DB_PATH, help="netmon.db path")
+    parser.add_argument("--config", default=UCI_CONFIG, help="UCI file holding the retention options")
+    for option, default in DEFAULT_POLICY.items():
+        parser.add_argument(f"--{option.replace('_', '-')}", type=int, dest=option,
+                            help=f"Override the UCI option (default {default})")
+    parser.add_argument("--convert", action="store_true",
+                        help="Switch an existing database to incremental vacuum (one full VACUUM)")
+    parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between delete batches")
+    parser.add_argument("--loop", type=float, metavar="SECONDS", help="Keep running, one pass every SECONDS")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ {args.db} not found")
+        return 1
+
+    policy = read_uci_policy(args.config)
+    policy.update({k: v for k, v in vars(args).items() if k in DEFAULT_POLICY and v is not None})
+    print(f"📋 Policy: raw {policy['raw_retention_hours']} h, hourly {policy['hourly_retention_days']} d, "
+          f"daily {policy['data_retention']} d, cap {policy['max_db_size_mb']} MB")
+
+    while True:
+        print_report(run_retention(args.db, policy, convert=args.convert, pause=args.pause))
+        if not args.loop:
+            return 0
+        args.convert = False
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
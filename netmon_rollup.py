@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Rollups
+Incrementally folds new traffic and speed_history rows into hourly and
+daily per-device aggregates, tracked by a high-water mark on the row id
+"""
+
+import argparse
+import math
+import sqlite3
+import sys
+import time
+
+from netmon_schema import DB_PATH
+
+HOUR = 3600
+DAY = 86400
+LEVELS = {"hourly": HOUR, "daily": DAY}
+BATCH_ROWS = 100_000
+
+# Raw speed samples for short ranges, hourly buckets up to a week, daily beyond
+RAW_MAX_HOURS = 2
+HOURLY_MAX_HOURS = 7 * 24
+DEFAULT_HISTORY_HOURS = 24
+MAX_HISTORY_HOURS = 366 * 24  # daily rollups kept "forever" (data_retention 0) still get a bound
+
+ROLLUP_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0,
+        updated_at INTEGER
+    )""",
+] + [
+    f"""CREATE TABLE IF NOT EXISTS traffic_{level} (
+        bucket INTEGER NOT NULL,
+        ip TEXT NOT NULL,
+        domain TEXT NOT NULL,
+        bytes_sent INTEGER NOT NULL DEFAULT 0,
+        bytes_received INTEGER NOT NULL DEFAULT 0,
+        packets INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, ip, domain)
+    )""" for level in LEVELS
+] + [
+    f"""CREATE TABLE IF NOT EXISTS speed_{level} (
+        bucket INTEGER NOT NULL,
+        device_ip TEXT NOT NULL,
+        samples INTEGER NOT NULL DEFAULT 0,
+        sum_in_mbps REAL NOT NULL DEFAULT 0,
+        sum_out_mbps REAL NOT NULL DEFAULT 0,
+        peak_in_mbps REAL NOT NULL DEFAULT 0,
+        peak_out_mbps REAL NOT NULL DEFAULT 0,
+        bytes_in INTEGER NOT NULL DEFAULT 0,
+        bytes_out INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, device_ip)
+    )""" for level in LEVELS
+]
+
+# One statement per (source, level); ? = (bucket size, low id, high id)
+TRAFFIC_ROLLUP_SQL = """
+INSERT INTO traffic_{level} (bucket, ip, domain, bytes_sent, bytes_received, packets)
+SELECT timestamp - timestamp % ?, ip, COALESCE(url, ''),
+       COALESCE(SUM(bytes_sent), 0), COALESCE(SUM(bytes_received), 0), COUNT(*)
+FROM traffic WHERE id > ? AND id <= ? AND timestamp IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT (bucket, ip, domain) DO UPDATE SET
+    bytes_sent = bytes_sent + excluded.bytes_sent,
+    bytes_received = bytes_received + excluded.bytes_received,
+    packets = packets + excluded.packets
+"""
+
+SPEED_ROLLUP_SQL = """
+INSERT INTO speed_{level} (bucket, device_ip, samples, sum_in_mbps, sum_out_mbps,
+                           peak_in_mbps, peak_out_mbps, bytes_in, bytes_out)
+SELECT timestamp - timestamp % ?, device_ip, COUNT(*),
+       TOTAL(speed_in_mbps), TOTAL(speed_out_mbps),
+       COALESCE(MAX(speed_in_mbps), 0), COALESCE(MAX(speed_out_mbps), 0),
+       COALESCE(SUM(bytes_in), 0), COALESCE(SUM(bytes_out), 0)
+FROM speed_history WHERE id > ? AND id <= ? AND timestamp IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (bucket, device_ip) DO UPDATE SET
+    samples = samples + excluded.samples,
+    sum_in_mbps = sum_in_mbps + excluded.sum_in_mbps,
+    sum_out_mbps = sum_out_mbps + excluded.sum_out_mbps,
+    peak_in_mbps = MAX(peak_in_mbps, excluded.peak_in_mbps),
+    peak_out_mbps = MAX(peak_out_mbps, excluded.peak_out_mbps),
+    bytes_in = bytes_in + excluded.bytes_in,
+    bytes_out = bytes_out + excluded.bytes_out
+"""
+
+SOURCES = {"traffic": TRAFFIC_ROLLUP_SQL, "speed_history": SPEED_ROLLUP_SQL}
+
+# Whole days come from traffic_daily; the partial days at either end and rows
+# past the high-water mark come from traffic. The unary + keeps that last part
+# on the rowid range rather than the timestamp index. Mirrored in netmon-report.lua.
+TOTALS_SQL = (
+    "SELECT COALESCE(SUM(bytes_received), 0), COALESCE(SUM(bytes_sent), 0) FROM ("
+    "SELECT bytes_received, bytes_sent FROM traffic_daily WHERE bucket >= ? AND bucket < ? "
+    "UNION ALL SELECT bytes_received, bytes_sent FROM traffic WHERE timestamp >= ? AND timestamp < ? "
+    "UNION ALL SELECT bytes_received, bytes_sent FROM traffic WHERE timestamp >= ? AND timestamp <= ? "
+    "UNION ALL SELECT bytes_received, bytes_sent FROM traffic WHERE id > ? AND +timestamp >= ? AND +timestamp < ?)"
+)
+
+WEBSITES_SQL = (
+    "SELECT COUNT(DISTINCT domain) FROM ("
+    "SELECT domain FROM traffic_daily WHERE bucket >= ? AND bucket < ? AND domain != '' "
+    "UNION ALL SELECT url FROM traffic WHERE timestamp >= ? AND timestamp < ? AND url IS NOT NULL AND url != '' "
+    "UNION ALL SELECT url FROM traffic WHERE timestamp >= ? AND timestamp <= ? AND url IS NOT NULL AND url != '' "
+    "UNION ALL SELECT url FROM traffic WHERE id > ? AND +timestamp >= ? AND +timestamp < ? AND url IS NOT NULL AND url != '')"
+)
+
+
+def create_rollup_schema(db):
+    for statement in ROLLUP_SCHEMA:
+        db.execute(statement)
+    db.commit()
+
+
+def has_rollups(db):
+    names = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return {"rollup_state", "traffic_daily", "speed_hourly"} <= names
+
+
+def high_water_mark(db, source):
+    row = db.execute("SELECT last_id FROM rollup_state WHERE name = ?", (source,)).fetchone()
+    return row[0] if row else 0
+
+
+def roll_up_source(db, source, batch_rows=BATCH_ROWS):
+    """Fold rows past the high-water mark into every level; returns the new mark"""
+    sql = SOURCES[source]
+    last_id = high_water_mark(db, source)
+    max_id = db.execute(f"SELECT MAX(id) FROM {source}").fetchone()[0] or 0
+    while last_id < max_id:
+        # IMMEDIATE takes the write lock before the mark is re-read, so an overlapping
+        # pass (the rollup and retention loops both run one) waits and then carries on
+        # from where this one stopped instead of folding the same ids again
+        db.execute("BEGIN IMMEDIATE")
+        # Aggregates and the new mark commit together, so a crash never double counts
+        with db:
+            last_id = high_water_mark(db, source)
+            if last_id >= max_id:
+                break
+            upper = min(last_id + batch_rows, max_id)
+            for level, size in LEVELS.items():
+                db.execute(sql.format(level=level), (size, last_id, upper))
+            db.execute("INSERT INTO rollup_state (name, last_id, updated_at) VALUES (?, ?, ?) "
+                       "ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at",
+                       (source, upper, int(time.time())))
+        last_id = upper
+    return last_id
+
+
+def run_rollup(db_path=DB_PATH, batch_rows=BATCH_ROWS):
+    """One incremental pass over traffic and speed_history; returns a summary"""
+    started = time.perf_counter()
+    db = sqlite3.connect(db_path, timeout=30)
+    try:
+        create_rollup_schema(db)
+        before = {source: high_water_mark(db, source) for source in SOURCES}
+        after = {source: roll_up_source(db, source, batch_rows) for source in SOURCES}
+    finally:
+        db.close()
+    return {
+        "ids": {source: after[source] - before[source] for source in SOURCES},
+        "high_water_mark": after,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def full_buckets(start, end, size=DAY):
+    """[lo, hi) covering the whole buckets inside the inclusive range [start, end]"""
+    lo = -(-start // size) * size
+    hi = (end + 1) // size * size
+    if hi <= lo:
+        # No whole bucket fits; the raw edges then cover the range on their own
+        return end + 1, end + 1
+    return lo, hi
+
+
+def traffic_totals(db, start, end):
+    """(download, upload, unique domains) for [start, end], exact even before the rollup catches up"""
+    lo, hi = full_buckets(start, end)
+    params = (lo, hi, start, lo, hi, end, high_water_mark(db, "traffic"), lo, hi)
+    download, upload = db.execute(TOTALS_SQL, params).fetchone()
+    websites = db.execute(WEBSITES_SQL, params).fetchone()[0]
+    return download, upload, websites
+
+
+def history_level(hours):
+    """Which table answers a speed history request covering `hours`"""
+    if hours <= RAW_MAX_HOURS:
+        return "raw"
+    return "hourly" if hours <= HOURLY_MAX_HOURS else "daily"
+
+
+def history_hours(hours, max_hours=MAX_HISTORY_HOURS):
+    """`hours` as a range a history query can answer: NaN, infinite or non-positive
+    values get the default, anything longer than max_hours is cut to it"""
+    try:
+        hours = float(hours)
+    except (TypeError, ValueError):
+        return DEFAULT_HISTORY_HOURS
+    if not math.isfinite(hours) or hours <= 0:
+        return DEFAULT_HISTORY_HOURS
+    return min(hours, max_hours)
+
+
+def speed_history(db, hours=DEFAULT_HISTORY_HOURS, now=None):
+    """{device_ip: [samples]} for the last `hours`, read from the matching level"""
+    hours = history_hours(hours)
+    since = int(now if now is not None else time.time()) - int(hours * HOUR)
+    level = history_level(hours)
+    if level == "raw" or not has_rollups(db):
+        sql = ("SELECT device_ip, timestamp, speed_in_mbps, speed_out_mbps, speed_in_mbps, speed_out_mbps "
+               "FROM speed_history WHERE timestamp >= ? ORDER BY device_ip, timestamp")
+    else:
+        sql = (f"SELECT device_ip, bucket, ROUND(sum_in_mbps / samples, 2), ROUND(sum_out_mbps / samples, 2), "
+               f"peak_in_mbps, peak_out_mbps FROM speed_{level} WHERE bucket >= ? ORDER BY device_ip, bucket")
+    history = {}
+    for ip, timestamp, speed_in, speed_out, peak_in, peak_out in db.execute(sql, (since,)):
+        history.setdefault(ip, []).append({
+            "timestamp": timestamp,
+            "speed_in_mbps": speed_in,
+            "speed_out_mbps": speed_out,
+            "peak_in_mbps": peak_in,
+            "peak_out_mbps": peak_out,
+        })
+    return history
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Incrementally roll up traffic and speed history")
+    parser.add_argument("--db", default=DB_PATH, help="netmon.db path")
+    parser.add_argument("--batch", type=int, default=BATCH_ROWS, help="Source rows per transaction")
+    parser.add_argument("--loop", type=float, metavar="SECONDS", help="Keep running, one pass every SECONDS")
+    args = parser.parse_args()
+
+    while True:
+        summary = run_rollup(args.db, args.batch)
+        print(f"📦 Rolled up {summary['ids']['traffic']:,} traffic and "
+              f"{summary['ids']['speed_history']:,} speed_history ids in {summary['seconds']} s "
+              f"(high-water marks: {summary['high_water_mark']})")
+        if not args.loop:
+            return 0
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
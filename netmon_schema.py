@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Database Schema
+Mirror of the tables created by init_database (db_manager.c) and
+init_advanced_monitoring (advanced_netmon.c), for the Python tools
+"""
+
+import sqlite3
+
+DB_PATH = "/var/lib/netmon/netmon.db"
+
+# db_manager.c: init_database()
+CORE_SCHEMA = [
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    """CREATE TABLE IF NOT EXISTS devices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ip TEXT UNIQUE NOT NULL,
+        mac TEXT,
+        hostname TEXT,
+        first_seen INTEGER,
+        last_seen INTEGER,
+        is_active INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS traffic (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ip TEXT NOT NULL,
+        url TEXT,
+        timestamp INTEGER,
+        bytes_sent INTEGER,
+        bytes_received INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_devices_ip ON devices(ip)",
+    "CREATE INDEX IF NOT EXISTS idx_traffic_ip ON traffic(ip)",
+    "CREATE INDEX IF NOT EXISTS idx_traffic_timestamp ON traffic(timestamp)",
+]
+
+# advanced_netmon.c: init_advanced_monitoring()
+ADVANCED_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS advanced_devices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ip TEXT UNIQUE NOT NULL,
+        mac TEXT,
+        hostname TEXT,
+        bytes_in INTEGER DEFAULT 0,
+        bytes_out INTEGER DEFAULT 0,
+        packets_in INTEGER DEFAULT 0,
+        packets_out INTEGER DEFAULT 0,
+        speed_in_mbps REAL DEFAULT 0,
+        speed_out_mbps REAL DEFAULT 0,
+        last_seen INTEGER,
+        is_blocked INTEGER DEFAULT 0,
+        speed_limit_kbps INTEGER DEFAULT 0,
+        is_active INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS website_visits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        device_ip TEXT NOT NULL,
+        website TEXT,
+        domain TEXT,
+        timestamp INTEGER,
+        port INTEGER,
+        protocol TEXT,
+        bytes_transferred INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS speed_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        device_ip TEXT NOT NULL,
+        timestamp INTEGER,
+        speed_in_mbps REAL,
+        speed_out_mbps REAL,
+        bytes_in INTEGER,
+        bytes_out INTEGER
+    )""",
+]
+
+SCHEMA = CORE_SCHEMA + ADVANCED_SCHEMA
+
+
+def create_schema(db):
+    """Create every Network Monitor table on an open sqlite3 connection"""
+    for statement in SCHEMA:
+        db.execute(statement)
+    db.commit()
+
+
+def open_database(path=DB_PATH, create=True):
+    """Open the database, creating the schema if requested"""
+    db = sqlite3.connect(path)
+    if create:
+        create_schema(db)
+    return db
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Dashboard Network Budget
+Reads Chrome's performance log (DevTools Network events) while a dashboard
+tab polls the router and turns it into per-endpoint requests, bytes,
+duplicates, fallbacks, cache hits and the bytes 304s and deltas saved per
+poll cycle
+"""
+
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+POLL_INTERVAL = 5  # setInterval(loadData, 5000) in advanced_script.js
+FALLBACK_API = "/cgi-bin/netmon-api.sh"
+
+# What one poll cycle should cost: the three loadData() fetches and nothing else
+EXPECTED_PER_CYCLE = {
+    "advanced-api.sh?action=get_devices": 1,
+    "advanced-api.sh?action=get_websites": 1,
+    "advanced-api.sh?action=get_speed_history": 1,
+}
+
+
+def enable_performance_logging(chrome_options):
+    """Ask ChromeDriver to record DevTools Network events in the "performance" log"""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def endpoint_key(url):
+    """Script name plus action for API calls, the path for everything else"""
+    parts = urlsplit(url)
+    name = parts.path.rsplit("/", 1)[-1] or parts.path
+    action = parse_qs(parts.query).get("action", [None])[0]
+    if parts.path.startswith("/cgi-bin/"):
+        return f"{name}?action={action}" if action else name
+    return parts.path or url
+
+
+class NetworkLog:
+    """Accumulates requests from the driver's performance log, keyed by DevTools requestId"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.requests = {}
+
+    def drain(self):
+        """Pull pending log entries into self.requests; returns how many were read"""
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException:
+            return 0
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            self.handle(message.get("method", ""), message.get("params", {}))
+        return len(entries)
+
+    def handle(self, method, params):
+        request_id = params.get("requestId")
+        if not method.startswith("Network.") or not request_id:
+            return
+        if method == "Network.requestWillBeSent":
+            request = params.get("request", {})
+            # A redirect reuses the requestId; count the new hop separately
+            if request_id in self.requests and params.get("redirectResponse"):
+                self.requests[f"{request_id}:{params['timestamp']}"] = self.requests.pop(request_id)
+            self.requests[request_id] = {
+                "url": request.get("url", ""),
+                "method": request.get("method", "GET"),
+                "type": params.get("type"),
+                "started": params.get("timestamp"),
+                "status": None,
+                "bytes": 0,
+                "cached": False,
+                "failed": None,
+                "finished": None,
+            }
+            return
+        record = self.requests.get(request_id)
+        if record is None:
+            return
+        if method == "Network.responseReceived":
+            response = params.get("response", {})
+            record["status"] = response.get("status")
+            if response.get("fromDiskCache") or response.get("fromServiceWorker") or response.get("status") == 304:
+                record["cached"] = True
+        elif method == "Network.requestServedFromCache":
+            record["cached"] = True
+        elif method == "Network.loadingFinished":
+            record["bytes"] = int(params.get("encodedDataLength") or 0)
+            record["finished"] = params.get("timestamp")
+        elif method == "Network.loadingFailed":
+            record["failed"] = params.get("errorText") or "failed"
+            record["finished"] = params.get("timestamp")
+
+    def records(self):
+        """Requests in start order"""
+        return sorted((r for r in self.requests.values() if r["started"] is not None), key=lambda r: r["started"])
+
+
+def is_delta(url):
+    """get_devices&since=<version>: only the devices changed since that version"""
+    return "since" in parse_qs(urlsplit(url).query)
+
+
+def full_sizes(records):
+    """Bytes of the latest complete 200 answer per endpoint, the yardstick for 304s and deltas"""
+    sizes = {}
+    for record in records:
+        if record["status"] == 200 and not record["cached"] and not is_delta(record["url"]) and record["bytes"]:
+            sizes[endpoint_key(record["url"])] = record["bytes"]
+    return sizes
+
+
+def split_cycles(records, interval=POLL_INTERVAL):
+    """Group API requests into poll cycles: a new cycle starts when a request
+    begins more than half an interval after the current cycle's first one"""
+    cycles = []
+    for record in records:
+        if not urlsplit(record["url"]).path.startswith("/cgi-bin/"):
+            continue
+        if not cycles or record["started"] - cycles[-1][0]["started"] > interval / 2:
+            cycles.append([])
+        cycles[-1].append(record)
+    return cycles
+
+
+def analyze_network(records, window_s, interval=POLL_INTERVAL, baseline=None):
+    """Per-endpoint traffic budget over the capture window
+
+    baseline maps endpoints to the size of a full answer seen earlier (e.g.
+    during page load), for endpoints only ever answered 304 or as deltas here.
+    """
+    cycles = split_cycles(records, interval)
+    cycle_count = max(len(cycles), 1)
+    full = dict(baseline or {}, **full_sizes(records))
+
+    endpoints = {}
+    for record in records:
+        key = endpoint_key(record["url"])
+        stats = endpoints.setdefault(key, {
+            "requests": 0, "bytes": 0, "cache_hits": 0, "failures": 0,
+            "duplicates": 0, "fallbacks": 0, "not_modified": 0, "deltas": 0, "saved_bytes": 0, "statuses": {},
+        })
+        stats["requests"] += 1
+        stats["bytes"] += record["bytes"]
+        stats["cache_hits"] += int(record["cached"])
+        stats["failures"] += int(bool(record["failed"]) or (record["status"] or 0) >= 400)
+        status = str(record["status"] if record["status"] is not None else record["failed"] or "pending")
+        stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+        if urlsplit(record["url"]).path == FALLBACK_API:
+            stats["fallbacks"] += 1
+        if record["status"] == 304 or (record["status"] == 200 and is_delta(record["url"])):
+            stats["not_modified" if record["status"] == 304 else "deltas"] += 1
+            stats["saved_bytes"] += max(full.get(key, 0) - record["bytes"], 0)
+
+    # Same endpoint fetched twice inside one poll cycle
+    for cycle in cycles:
+        seen = set()
+        for record in cycle:
+            key = endpoint_key(record["url"])
+            if key in seen:
+                endpoints[key]["duplicates"] += 1
+            seen.add(key)
+
+    hours = window_s / 3600.0
+    for key, stats in endpoints.items():
+        stats["per_cycle"] = round(stats["requests"] / cycle_count, 2)
+        stats["bytes_per_cycle"] = round(stats["bytes"] / cycle_count)
+        stats["avg_bytes"] = round(stats["bytes"] / stats["requests"]) if stats["requests"] else 0
+        stats["bytes_per_hour"] = round(stats["bytes"] / hours) if hours else None
+        expected = EXPECTED_PER_CYCLE.get(key)
+        stats["over_budget"] = bool(stats["duplicates"] or stats["fallbacks"]
+                                    or (expected is not None and stats["per_cycle"] > expected + 0.5))
+
+    total_requests = sum(s["requests"] for s in endpoints.values())
+    total_bytes = sum(s["bytes"] for s in endpoints.values())
+    saved_bytes = sum(s["saved_bytes"] for s in endpoints.values())
+    return {
+        "window_s": round(window_s, 1),
+        "cycles": len(cycles),
+        "requests": total_requests,
+        "bytes": total_bytes,
+        "requests_per_cycle": round(total_requests / cycle_count, 2),
+        "bytes_per_cycle": round(total_bytes / cycle_count),
+        "requests_per_hour": round(total_requests / hours) if hours else None,
+        "bytes_per_hour": round(total_bytes / hours) if hours else None,
+        "duplicates": sum(s["duplicates"] for s in endpoints.values()),
+        "fallbacks": sum(s["fallbacks"] for s in endpoints.values()),
+        "cache_hits": sum(s["cache_hits"] for s in endpoints.values()),
+        "not_modified": sum(s["not_modified"] for s in endpoints.values()),
+        "deltas": sum(s["deltas"] for s in endpoints.values()),
+        "saved_bytes_per_cycle": round(saved_bytes / cycle_count),
+        "saving": round(saved_bytes / (total_bytes + saved_bytes), 3) if total_bytes + saved_bytes else 0,
+        "over_budget": sorted(k for k, s in endpoints.items() if s["over_budget"]),
+        "endpoints": dict(sorted(endpoints.items(), key=lambda item: -item[1]["bytes"])),
+    }
+
+
+def capture_network(driver, window_s, interval=POLL_INTERVAL):
+    """Record everything the open tab fetches for window_s seconds"""
+    log = NetworkLog(driver)
+    log.drain()
+    baseline = full_sizes(log.records())
+    log.requests.clear()  # page load traffic is not part of the steady-state budget
+    started = time.monotonic()
+    deadline = started + window_s
+    while time.monotonic() < deadline:
+        # Drain as we go so ChromeDriver's log buffer never overflows
+        time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+        log.drain()
+    return analyze_network(log.records(), time.monotonic() - started, interval, baseline)
+
+
+def print_network_budget(report, indent=""):
+    """Print the per-endpoint table and the per-tab totals"""
+    print(f"{indent}   {'endpoint':<40} {'req':>5} {'/cycle':>7} {'bytes/cycle':>12} {'avg B':>8} "
+          f"{'dup':>4} {'fallb':>5} {'cache':>5} {'fail':>4}")
+    for key, s in report["endpoints"].items():
+        flag = "❌" if s["over_budget"] else "✅"
+        print(f"{indent}{flag} {key[:40]:<40} {s['requests']:>5} {s['per_cycle']:>7} {s['bytes_per_cycle']:>12,} "
+              f"{s['avg_bytes']:>8,} {s['duplicates']:>4} {s['fallbacks']:>5} {s['cache_hits']:>5} {s['failures']:>4}")
+    print(f"{indent}📶 {report['cycles']} poll cycles in {report['window_s']} s: "
+          f"{report['requests_per_cycle']} requests and {report['bytes_per_cycle']:,} bytes per cycle")
+    if report["not_modified"] or report["deltas"]:
+        print(f"{indent}♻️ {report['not_modified']} answered 304 and {report['deltas']} as deltas: "
+              f"{report['saved_bytes_per_cycle']:,} bytes per cycle saved ({report['saving']:.0%} of full answers)")
+    if report["bytes_per_hour"] is not None:
+        print(f"{indent}⏳ One open tab costs the router {report['requests_per_hour']:,} requests and "
+              f"{report['bytes_per_hour'] / 1048576:.1f} MB per hour")
+    if report["over_budget"]:
+        print(f"{indent}⚠️ Over budget: {', '.join(report['over_budget'])} "
+              f"({report['duplicates']} duplicate, {report['fallbacks']} fallback fetches)")
+    else:
+        print(f"{indent}✅ Within budget: {sum(EXPECTED_PER_CYCLE.values())} API calls per cycle, "
+              f"no duplicates or fallbacks")
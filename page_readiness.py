@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Page Readiness Helpers
+Event-driven waits for the Selenium testers, with per-step timing
+"""
+
+import time
+from contextlib import nullcontext
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Count finished API fetches recorded by the Resource Timing API
+API_FETCHES_JS = """
+return performance.getEntriesByType('resource').filter(function (e) {
+    return e.name.indexOf('/cgi-bin/') !== -1 && e.responseEnd > 0;
+}).length;
+"""
+
+# Resolves once more fetches than arguments[0] finished and the button is enabled again
+REFRESH_DONE_JS = """
+var done = performance.getEntriesByType('resource').filter(function (e) {
+    return e.name.indexOf('/cgi-bin/') !== -1 && e.responseEnd > 0;
+}).length;
+var button = document.getElementById(arguments[1]);
+return (done > arguments[0] && (!button || !button.disabled)) ? done : null;
+"""
+
+DEVICE_COUNT_JS = """
+var el = document.getElementById(arguments[0]);
+return el ? el.textContent.trim() : null;
+"""
+
+
+class PageReadiness:
+    """Waits on real page signals instead of fixed sleeps and records how long each took"""
+
+    def __init__(self, driver, timeout=10.0, poll_frequency=0.05, tracer=None):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.tracer = tracer
+        self.timings = []
+
+    def _span(self, name, category, **attrs):
+        return self.tracer.span(name, category, **attrs) if self.tracer else nullcontext()
+
+    def wait(self, step, condition, timeout=None):
+        """Wait until condition(driver) is truthy; returns its value or None on timeout"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        value = None
+        with self._span(step, "wait", timeout=timeout) as span:
+            try:
+                value = WebDriverWait(
+                    self.driver, timeout, poll_frequency=self.poll_frequency,
+                    ignored_exceptions=(WebDriverException,)
+                ).until(condition)
+            except TimeoutException:
+                pass
+            if span:
+                span.set(ok=value is not None)
+        elapsed = time.perf_counter() - started
+        self.timings.append({
+            "step": step,
+            "seconds": round(elapsed, 3),
+            "ok": value is not None,
+            "timeout": timeout
+        })
+        return value
+
+    def document_ready(self, step="document_ready", timeout=None):
+        """Wait for document.readyState == 'complete'"""
+        return self.wait(step, lambda d: d.execute_script(
+            "return document.readyState === 'complete' || null;"
+        ), timeout)
+
+    def load(self, url, step=None, timeout=None):
+        """Navigate to url and wait for the document to finish loading"""
+        with self._span("load", "navigation", url=url):
+            self.driver.get(url)
+            return self.document_ready(step or f"load:{url}", timeout)
+
+    def api_fetch_count(self):
+        """Number of completed /cgi-bin/ fetches on the current page"""
+        return self.driver.execute_script(API_FETCHES_JS)
+
+    def first_api_fetch(self, step="first_api_fetch", timeout=None):
+        """Wait for the dashboard's first API fetch to settle"""
+        return self.wait(step, lambda d: d.execute_script(API_FETCHES_JS) or None, timeout)
+
+    def device_count_ready(self, element_id="deviceCount", step="device_count", timeout=None):
+        """Wait for the device counter to leave its '-' placeholder"""
+        def has_count(d):
+            text = d.execute_script(DEVICE_COUNT_JS, element_id)
+            return text if text not in (None, "", "-") else None
+        return self.wait(step, has_count, timeout)
+
+    def click_and_wait_refresh(self, button_id="refreshBtn", step="refresh", timeout=None):
+        """Click the refresh button and wait for its fetches to settle and the button to re-enable"""
+        self.driver.execute_script("performance.setResourceTimingBufferSize(1000);")
+        before = self.api_fetch_count()
+        button = self.driver.find_element("id", button_id)
+        button.click()
+
+        return self.wait(step, lambda d: d.execute_script(REFRESH_DONE_JS, before, button_id), timeout)
+
+    def total_wait(self):
+        """Total seconds spent waiting"""
+        return round(sum(t["seconds"] for t in self.timings), 3)
+
+    def print_timings(self, indent=""):
+        """Print one line per recorded wait"""
+        for t in self.timings:
+            icon = "✅" if t["ok"] else "⏰"
+            print(f"{indent}{icon} {t['step']}: {t['seconds'] * 1000:.0f} ms")
+        print(f"{indent}⏱️ Total wait: {self.total_wait():.3f} s")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Page Timing Capture
+Collects Navigation Timing, Resource Timing and per-fetch durations from
+the dashboard pages through WebDriver
+"""
+
+from selenium.common.exceptions import WebDriverException
+
+# Wraps window.fetch so every call records its method, status, time to
+# headers and time until the body was fully read
+FETCH_HOOK_JS = """
+(function () {
+    if (window.__netmonFetches) { return; }
+    window.__netmonFetches = [];
+    if (performance.setResourceTimingBufferSize) { performance.setResourceTimingBufferSize(1000); }
+    var originalFetch = window.fetch;
+    if (!originalFetch) { return; }
+    window.fetch = function (input, init) {
+        var entry = {
+            url: typeof input === 'string' ? input : (input && input.url) || String(input),
+            method: (init && init.method) || 'GET',
+            start_ms: performance.now(),
+            status: null,
+            headers_ms: null,
+            duration_ms: null,
+            error: null
+        };
+        window.__netmonFetches.push(entry);
+        return originalFetch.apply(this, arguments).then(function (response) {
+            entry.status = response.status;
+            entry.headers_ms = performance.now() - entry.start_ms;
+            response.clone().arrayBuffer().then(function () {
+                entry.duration_ms = performance.now() - entry.start_ms;
+            }, function () {
+                entry.duration_ms = performance.now() - entry.start_ms;
+            });
+            return response;
+        }, function (error) {
+            entry.error = String(error);
+            entry.duration_ms = performance.now() - entry.start_ms;
+            throw error;
+        });
+    };
+})();
+"""
+
+# Navigation Timing (Level 2 entry when available, performance.timing otherwise)
+NAVIGATION_TIMING_JS = """
+var nav = performance.getEntriesByType && performance.getEntriesByType('navigation')[0];
+if (nav) {
+    return {
+        ttfb_ms: nav.responseStart - nav.requestStart,
+        response_end_ms: nav.responseEnd,
+        dom_interactive_ms: nav.domInteractive,
+        dom_content_loaded_ms: nav.domContentLoadedEventEnd,
+        load_ms: nav.loadEventEnd,
+        transfer_bytes: nav.transferSize
+    };
+}
+var t = performance.timing;
+return {
+    ttfb_ms: t.responseStart - t.requestStart,
+    response_end_ms: t.responseEnd - t.navigationStart,
+    dom_interactive_ms: t.domInteractive - t.navigationStart,
+    dom_content_loaded_ms: t.domContentLoadedEventEnd - t.navigationStart,
+    load_ms: t.loadEventEnd > 0 ? t.loadEventEnd - t.navigationStart : 0,
+    transfer_bytes: null
+};
+"""
+
+RESOURCE_TIMING_JS = """
+return performance.getEntriesByType('resource').map(function (e) {
+    return {
+        url: e.name,
+        initiator: e.initiatorType,
+        start_ms: e.startTime,
+        duration_ms: e.duration,
+        ttfb_ms: e.requestStart > 0 ? e.responseStart - e.requestStart : null,
+        transfer_bytes: e.transferSize || null
+    };
+});
+"""
+
+FETCHES_JS = "return window.__netmonFetches || [];"
+
+
+def install_fetch_hook(driver):
+    """Install the fetch wrapper before page scripts run; returns True when it is in place for the next load"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": FETCH_HOOK_JS})
+        return True
+    except (AttributeError, WebDriverException):
+        return False
+
+
+def collect_page_timing(driver):
+    """Navigation, resource and fetch timings of the current page"""
+    # Without the CDP hook only fetches issued from now on are wrapped
+    driver.execute_script(FETCH_HOOK_JS)
+    navigation = driver.execute_script(NAVIGATION_TIMING_JS)
+    resources = driver.execute_script(RESOURCE_TIMING_JS)
+    fetches = driver.execute_script(FETCHES_JS)
+
+    api = []
+    for entry in resources:
+        if "/cgi-bin/" in entry["url"]:
+            api.append({
+                "url": entry["url"].split("/cgi-bin/", 1)[1],
+                "duration_ms": round(entry["duration_ms"], 1),
+                "ttfb_ms": round(entry["ttfb_ms"], 1) if entry["ttfb_ms"] is not None else None,
+                "transfer_bytes": entry["transfer_bytes"],
+            })
+
+    return {
+        "url": driver.current_url,
+        "navigation": {name: round(value, 1) if isinstance(value, (int, float)) else value
+                       for name, value in navigation.items()},
+        "resource_count": len(resources),
+        "api": api,
+        "fetches": [{
+            "url": f["url"],
+            "method": f["method"],
+            "status": f["status"],
+            "headers_ms": round(f["headers_ms"], 1) if f["headers_ms"] is not None else None,
+            "duration_ms": round(f["duration_ms"], 1) if f["duration_ms"] is not None else None,
+            "error": f["error"],
+        } for f in fetches],
+    }
+
+
+def print_page_timing(timing, indent=""):
+    """Print the headline numbers and one line per API call"""
+    nav = timing["navigation"]
+    print(f"{indent}📄 {timing['url']}")
+    print(f"{indent}   TTFB {nav['ttfb_ms']} ms | DOMContentLoaded {nav['dom_content_loaded_ms']} ms | "
+          f"load {nav['load_ms']} ms | {timing['resource_count']} resources")
+    for entry in timing["api"]:
+        print(f"{indent}   🔌 {entry['url']}: {entry['duration_ms']} ms (TTFB {entry['ttfb_ms']} ms)")
+    for entry in timing["fetches"]:
+        status = entry["status"] or entry["error"] or "pending"
+        print(f"{indent}   📡 fetch {entry['method']} {entry['url']} [{status}]: "
+              f"headers {entry['headers_ms']} ms, body {entry['duration_ms']} ms")
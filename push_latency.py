@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Push Latency
+Runs the API daemon on a fixture ARP table and netmon.db, renames a device
+and measures how long the change takes to reach a Server-Sent Events client
+and a client polling every 5 s, over HTTP or in the dashboard itself
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from api_probe import DEVICES_PATH, ConnectionPool, ProbeError
+from cgi_benchmark import percentile
+from netmon_daemon import EVENTS_PATH, REFRESH_INTERVAL, NetmonDaemon
+from router_emulator import WWW_ROOT, fixture_devices, write_arp_fixture, write_db_fixture
+
+POLL_INTERVAL = 5  # setInterval(loadData, 5000) in advanced_script.js
+CHANGE_TIMEOUT = 30
+DEVICE_ITEMS_JS = "return document.querySelectorAll('#deviceList .device-item').length;"
+PUSH_STATE_JS = "return typeof pushSource !== 'undefined' && pushSource ? pushSource.readyState : null;"
+
+# Installed before page scripts for the poll run: without EventSource the
+# dashboard takes its polling fallback
+NO_EVENTSOURCE_JS = "delete window.EventSource; window.EventSource = undefined;"
+
+# Resolves with the wall-clock time the marker first shows in the device list
+WAIT_FOR_MARKER_JS = """
+var marker = arguments[0];
+var done = arguments[arguments.length - 1];
+function seen() {
+    var list = document.getElementById('deviceList');
+    return list && list.textContent.indexOf(marker) !== -1;
+}
+if (seen()) { done(Date.now()); return; }
+var observer = new MutationObserver(function () {
+    if (seen()) {
+        observer.disconnect();
+        done(Date.now());
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+"""
+
+
+class DaemonFixture:
+    """netmon_daemon serving files/www from fixture data, on an event loop thread of its own"""
+
+    def __init__(self, devices=50, interval=REFRESH_INTERVAL, host="127.0.0.1", port=0, www_root=WWW_ROOT):
+        self.device_count = devices
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.www_root = www_root
+        self.workdir = None
+        self.devices = []
+        self.changes = 0
+        self.daemon = None
+        self.loop = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def db_path(self):
+        return os.path.join(self.workdir, "netmon.db")
+
+    def start(self):
+        self.workdir = tempfile.mkdtemp(prefix="netmon-push-")
+        self.devices = fixture_devices(self.device_count)
+        arp_path = os.path.join(self.workdir, "arp")
+        write_arp_fixture(arp_path, self.devices)
+        write_db_fixture(self.db_path, self.devices)
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+        async def start_daemon():
+            daemon = NetmonDaemon(self.host, self.port, arp_path, self.db_path, self.www_root, self.interval,
+                                  apply_rules=False, rollup_interval=0, retention_interval=0)
+            return await daemon.start()
+
+        self.daemon = asyncio.run_coroutine_threadsafe(start_daemon(), self.loop).result(30)
+        self.port = self.daemon.port
+        return self
+
+    def stop(self):
+        if self.daemon:
+            asyncio.run_coroutine_threadsafe(self.daemon.stop(), self.loop).result(30)
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(5)
+            self.loop.close()
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def change(self):
+        """Rename the next device to a unique marker; returns (marker, wall-clock time of the write)"""
+        self.changes += 1
+        marker = f"push-probe-{self.changes}"
+        device = self.devices[self.changes % len(self.devices)]
+        db = sqlite3.connect(self.db_path)
+        try:
+            db.execute("UPDATE advanced_devices SET hostname = ? WHERE ip = ?", (marker, device["ip"]))
+            db.commit()
+        finally:
+            db.close()
+        return marker, time.time()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def summarize_latency(latencies, missed):
+    return {
+        "changes": len(latencies) + missed,
+        "missed": missed,
+        "median_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+        "max_ms": round(max(latencies), 1) if latencies else None,
+        "latencies_ms": [round(v, 1) for v in latencies],
+    }
+
+
+async def measure_protocol_async(fixture, changes=5, poll_interval=POLL_INTERVAL, timeout=CHANGE_TIMEOUT, seed=1):
+    """One SSE subscriber and one poller side by side; each change is timed until both have seen it"""
+    seen = {}
+    pending = set()
+
+    def observe(transport, payload, now):
+        for marker in pending:
+            if marker.encode() in payload:
+                seen[marker].setdefault(transport, now)
+
+    async def push_client():
+        reader, writer = await asyncio.open_connection(fixture.host, fixture.port)
+        try:
+            writer.write(f"GET {EVENTS_PATH} HTTP/1.1\r\nHost: {fixture.host}\r\n"
+                         f"Accept: text/event-stream\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            data = []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.startswith(b"data:"):
+                    data.append(line[5:])
+                elif line in (b"\r\n", b"\n"):
+                    observe("push", b"".join(data), time.time())
+                    data = []
+        finally:
+            writer.close()
+
+    async def poll_client():
+        pool = ConnectionPool(fixture.host, fixture.port, size=1)
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    response = await pool.request("GET", DEVICES_PATH)
+                    observe("poll", response["body"], time.time())
+                except (ProbeError, OSError, asyncio.TimeoutError):
+                    pass
+                await asyncio.sleep(max(poll_interval - (time.monotonic() - started), 0))
+        finally:
+            await pool.close()
+
+    clients = [asyncio.create_task(push_client()), asyncio.create_task(poll_client())]
+    rng = random.Random(seed)
+    try:
+        await asyncio.sleep(rng.uniform(0.5, poll_interval))
+        for _ in range(changes):
+            marker, changed = fixture.change()
+            seen[marker] = {"changed": changed}
+            pending.add(marker)
+            deadline = changed + timeout
+            while time.time() < deadline and not {"push", "poll"} <= seen[marker].keys():
+                await asyncio.sleep(0.02)
+            pending.discard(marker)
+            # Random gaps so changes land at different points of the refresh and poll cycles
+            await asyncio.sleep(rng.uniform(0.5, 2.0))
+    finally:
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+
+    results = []
+    for transport in ("push", "poll"):
+        latencies = [(s[transport] - s["changed"]) * 1000 for s in seen.values() if transport in s]
+        results.append(dict(summarize_latency(latencies, len(seen) - len(latencies)), transport=transport,
+                            client="http"))
+    return results
+
+
+def measure_protocol(fixture, changes=5, poll_interval=POLL_INTERVAL, timeout=CHANGE_TIMEOUT, seed=1):
+    """Synchronous wrapper around measure_protocol_async"""
+    return asyncio.run(measure_protocol_async(fixture, changes, poll_interval, timeout, seed))
+
+
+def measure_browser(driver, readiness, fixture, transport, changes=5, timeout=CHANGE_TIMEOUT,
+                    page="advanced_index.html", seed=1):
+    """Open the dashboard pushed to (transport "push") or polling ("poll") and time each change on screen"""
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+
+    script_id = None
+    if transport == "poll":
+        script_id = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                                           {"source": NO_EVENTSOURCE_JS})["identifier"]
+    try:
+        readiness.load(f"{fixture.base_url}/{page}", f"push:{transport}:load")
+        readiness.wait(f"push:{transport}:first_row", lambda d: d.execute_script(DEVICE_ITEMS_JS) or None, timeout=60)
+        if transport == "push":
+            # readyState 1 = OPEN; otherwise the page fell back to polling
+            readiness.wait("push:connected", lambda d: d.execute_script(PUSH_STATE_JS) == 1, timeout=15)
+        connected = driver.execute_script(PUSH_STATE_JS) == 1
+
+        driver.set_script_timeout(timeout)
+        rng = random.Random(seed)
+        latencies, missed = [], 0
+        for _ in range(changes):
+            time.sleep(rng.uniform(0.5, 2.0))
+            marker, changed = fixture.change()
+            try:
+                shown = driver.execute_async_script(WAIT_FOR_MARKER_JS, marker)
+                latencies.append(shown - changed * 1000)
+            except TimeoutException:
+                missed += 1
+    finally:
+        if script_id:
+            try:
+                driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script_id})
+            except WebDriverException:
+                pass
+    return dict(summarize_latency(latencies, missed), transport=transport, client="browser", pushed=connected)
+
+
+def print_push_results(results, indent=""):
+    print(f"{indent}   {'client':<8} {'transport':<10} {'changes':>7} {'median ms':>10} {'p95 ms':>9} "
+          f"{'max ms':>9} {'missed':>6}")
+    fmt = lambda v: f"{v:,.0f}" if v is not None else "n/a"
+    for r in results:
+        flag = "✅" if not r["missed"] else "❌"
+        print(f"{indent}{flag} {r['client']:<8} {r['transport']:<10} {r['changes']:>7} {fmt(r['median_ms']):>10} "
+              f"{fmt(r['p95_ms']):>9} {fmt(r['max_ms']):>9} {r['missed']:>6}")
+    for client in ("http", "browser"):
+        by_transport = {r["transport"]: r for r in results if r["client"] == client}
+        push, poll = by_transport.get("push"), by_transport.get("poll")
+        if push and poll and push["median_ms"] and poll["median_ms"]:
+            print(f"{indent}⚡ {client}: push shows a change {poll['median_ms'] / push['median_ms']:.1f}x sooner "
+                  f"than polling (median {push['median_ms']:,.0f} vs {poll['median_ms']:,.0f} ms)")
+    if any(r["client"] == "browser" and r["transport"] == "push" and not r.get("pushed") for r in results):
+        print(f"{indent}⚠️ The dashboard did not keep its event stream open; the push run fell back to polling")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Measure Network Monitor update latency, push vs poll")
+    parser.add_argument("--devices", type=int, default=50, help="Fixture device count")
+    parser.add_argument("--changes", type=int, default=5, help="Device renames to time")
+    parser.add_argument("--interval", type=float, default=REFRESH_INTERVAL,
+                        help="Daemon snapshot refresh interval (s); push latency is bounded by it")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Poller interval (s)")
+    parser.add_argument("--json", metavar="FILE", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    print(f"⚡ Push vs poll: {args.changes} changes, {args.devices} devices, daemon refresh every {args.interval:g} s")
+    with DaemonFixture(args.devices, args.interval) as fixture:
+        results = measure_protocol(fixture, args.changes, args.poll_interval)
+    print_push_results(results, "   ")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"interval_s": args.interval, "poll_interval_s": args.poll_interval, "results": results},
+                      f, indent=2)
+        print(f"📄 Results written to {args.json}")
+    return 0 if all(not r["missed"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
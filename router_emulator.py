@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Router Emulator
+Local stand-in for uhttpd that serves files/www and runs the CGI scripts
+against a fixture ARP table and a fixture netmon.db
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import random
+import resource
+import shutil
+import signal
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from netmon_schema import create_schema
+
+WWW_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "files", "www")
+MIN_DEVICES = 1
+MAX_DEVICES = 5000
+SCRIPT_TIMEOUT = 60  # uhttpd 'script_timeout' from the netmon uhttpd section
+
+INTERPRETERS = {
+    ".sh": "sh",
+    ".lua": "lua",
+}
+
+# CGI scripts that only exist on routers after running the fix scripts
+EXTRA_CGI = {
+    "test.sh": """#!/bin/sh
+echo "Content-Type: text/plain"
+echo ""
+echo "CGI is working!"
+echo "Date: $(date)"
+echo "Query: $QUERY_STRING"
+""",
+    "netmon-api.sh": """#!/bin/sh
+echo "Content-Type: application/json"
+echo "Access-Control-Allow-Origin: *"
+echo ""
+
+echo -n '{"success":true,"devices":['
+first=1
+if [ -f /proc/net/arp ]; then
+    while IFS=' ' read -r ip hw_type flags mac mask device; do
+        if [ "$ip" != "IP" ] && [ "$mac" != "00:00:00:00:00:00" ] && [ -n "$mac" ]; then
+            if [ $first -eq 0 ]; then echo -n ','; fi
+            first=0
+            hostname="Device-${ip##*.}"
+            echo -n "{\\"ip\\":\\"$ip\\",\\"mac\\":\\"$mac\\",\\"hostname\\":\\"$hostname\\",\\"last_seen\\":$(date +%s),\\"is_active\\":true}"
+        fi
+    done < /proc/net/arp
+fi
+echo ']}'
+""",
+}
+
+# Router-only binaries replaced by harmless stubs so nothing touches the host
+STUB_COMMANDS = {
+    "tc": "#!/bin/sh\nexit 0\n",
+    "iptables": "#!/bin/sh\nexit 0\n",
+    "uci": "#!/bin/sh\necho 127.0.0.1\n",
+    "nslookup": "#!/bin/sh\nexit 1\n",
+}
+
+# Binaries wrapped with exec-logging shims in instrumented mode
+INSTRUMENTED_COMMANDS = [
+    "nslookup", "sqlite3", "cut", "od", "awk", "tr", "date", "head", "grep", "sed",
+    "mkdir", "dirname", "cat", "rm", "cp", "tc", "iptables", "uci", "pandoc", "wkhtmltopdf",
+]
+EXEC_SHIM = """#!/bin/sh
+[ -n "$NETMON_EXEC_LOG" ] && echo "{name}" >> "$NETMON_EXEC_LOG"
+exec {target} "$@"
+"""
+LAST_PID_PATH = "/proc/sys/kernel/ns_last_pid"
+
+RESOLVING_NSLOOKUP = """#!/bin/sh
+echo "Server:		127.0.0.1"
+echo ""
+echo "$1.in-addr.arpa	name = host-$(echo "$1" | tr . -).lan."
+"""
+
+
+def fixture_devices(count, seed=1):
+    """Deterministic list of fixture devices"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    devices = []
+    for i in range(count):
+        ip = f"192.168.{1 + i // 250}.{2 + i % 250}"
+        mac = "02:" + ":".join(f"{rng.randrange(256):02x}" for _ in range(5))
+        devices.append({
+            "ip": ip,
+            "mac": mac,
+            "hostname": f"device-{i + 1}",
+            "first_seen": now - rng.randrange(86400 * 30),
+            "last_seen": now - rng.randrange(300),
+            "bytes_in": rng.randrange(50_000_000, 1_050_000_000),
+            "bytes_out": rng.randrange(10_000_000, 510_000_000),
+            "speed_in_mbps": round(rng.random() * 20, 1),
+            "speed_out_mbps": round(rng.random() * 10, 1),
+        })
+    return devices
+
+
+def write_arp_fixture(path, devices, interface="br-lan"):
+    """Write devices in /proc/net/arp format"""
+    with open(path, "w", encoding="ascii") as f:
+        f.write("IP address       HW type     Flags       HW address            Mask     Device\n")
+        for device in devices:
+            f.write(f"{device['ip']:<16} 0x1         0x2         {device['mac']}     *        {interface}\n")
+
+
+def write_db_fixture(path, devices):
+    """Create netmon.db with the fixture devices in devices and advanced_devices"""
+    db = sqlite3.connect(path)
+    try:
+        create_schema(db)
+        db.executemany(
+            "INSERT OR REPLACE INTO devices (ip, mac, hostname, first_seen, last_seen, is_active) "
+            "VALUES (:ip, :mac, :hostname, :first_seen, :last_seen, 1)", devices)
+        db.executemany(
+            "INSERT OR REPLACE INTO advanced_devices (ip, mac, hostname, bytes_in, bytes_out, "
+            "speed_in_mbps, speed_out_mbps, last_seen, is_active) VALUES (:ip, :mac, :hostname, "
+            ":bytes_in, :bytes_out, :speed_in_mbps, :speed_out_mbps, :last_seen, 1)", devices)
+        db.commit()
+    finally:
+        db.close()
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    """uhttpd-like request handler: static files plus /cgi-bin/ scripts"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "uhttpd-emulator"
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def do_HEAD(self):
+        self.handle_request()
+
+    def do_OPTIONS(self):
+        self.handle_request()
+
+    def log_message(self, format, *args):
+        if not self.server.emulator.quiet:
+            super().log_message(format, *args)
+
+    def handle_request(self):
+        emulator = self.server.emulator
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path == "/netmon" or path.startswith("/netmon/"):
+            path = path[len("/netmon"):] or "/"
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if path.startswith("/cgi-bin/"):
+            status, headers, payload = emulator.run_cgi(
+                path[len("/cgi-bin/"):], self.command, parts.query, body, self.headers,
+                self.client_address[0])
+        else:
+            status, headers, payload = emulator.serve_static(path)
+
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+
+class RouterEmulator:
+    """Stages files/www with fixture data and serves it like uhttpd would"""
+
+    def __init__(self, devices=10, host="127.0.0.1", port=0, workdir=None,
+                 www_root=WWW_ROOT, resolve_hostnames=False, quiet=True, seed=1,
+                 instrument=False):
+        if not MIN_DEVICES <= devices <= MAX_DEVICES:
+            raise ValueError(f"devices must be between {MIN_DEVICES} and {MAX_DEVICES}")
+        self.device_count = devices
+        self.host = host
+        self.port = port
+        self.www_root = www_root
+        self.resolve_hostnames = resolve_hostnames
+        self.quiet = quiet
+        self.seed = seed
+        self.instrument = instrument
+        self.cost_log = []
+        self._cost_lock = threading.Lock()
+        self.cgi_pids = set()  # CGI processes currently running, for samplers
+        self._own_workdir = workdir is None
+        self.workdir = workdir or tempfile.mkdtemp(prefix="netmon-emulator-")
+        self.server = None
+        self._thread = None
+
+        self.www_dir = os.path.join(self.workdir, "www")
+        self.cgi_dir = os.path.join(self.www_dir, "cgi-bin")
+        self.bin_dir = os.path.join(self.workdir, "bin")
+        self.shim_dir = os.path.join(self.workdir, "shims")
+        self.arp_path = os.path.join(self.workdir, "arp")
+        self.db_path = os.path.join(self.workdir, "netmon.db")
+        self.reports_dir = os.path.join(self.workdir, "reports")
+        self.hosts_path = os.path.join(self.workdir, "netmon-hosts")
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def stage(self):
+        """Copy the web root, rewrite router paths to the fixtures and build the fixtures"""
+        if os.path.exists(self.www_dir):
+            shutil.rmtree(self.www_dir)
+        shutil.copytree(self.www_root, self.www_dir)
+        os.makedirs(self.cgi_dir, exist_ok=True)
+        os.makedirs(self.bin_dir, exist_ok=True)
+        os.makedirs(self.reports_dir, exist_ok=True)
+
+        for name, content in EXTRA_CGI.items():
+            path = os.path.join(self.cgi_dir, name)
+            if not os.path.exists(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+
+        replacements = {
+            "/proc/net/arp": self.arp_path,
+            "/var/lib/netmon/netmon.db": self.db_path,
+            "/tmp/netmon-reports": self.reports_dir,
+            "/tmp/netmon-hosts": self.hosts_path,
+        }
+        for name in os.listdir(self.cgi_dir):
+            path = os.path.join(self.cgi_dir, name)
+            with open(path, encoding="utf-8") as f:
+                script = f.read()
+            for router_path, fixture_path in replacements.items():
+                script = script.replace(router_path, fixture_path)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(script)
+            os.chmod(path, 0o755)
+
+        stubs = dict(STUB_COMMANDS)
+        if self.resolve_hostnames:
+            stubs["nslookup"] = RESOLVING_NSLOOKUP
+        for name, content in stubs.items():
+            path = os.path.join(self.bin_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.chmod(path, 0o755)
+
+        if self.instrument:
+            self.stage_shims()
+
+        self.devices = fixture_devices(self.device_count, self.seed)
+        write_arp_fixture(self.arp_path, self.devices)
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        write_db_fixture(self.db_path, self.devices)
+
+    def stage_shims(self):
+        """Wrap every instrumented binary in a shim that logs the exec before running it"""
+        os.makedirs(self.shim_dir, exist_ok=True)
+        search_path = self.bin_dir + os.pathsep + os.environ.get("PATH", "/usr/bin:/bin")
+        for name in INSTRUMENTED_COMMANDS:
+            target = shutil.which(name, path=search_path)
+            if not target:
+                continue
+            path = os.path.join(self.shim_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(EXEC_SHIM.format(name=name, target=target))
+            os.chmod(path, 0o755)
+
+    def cgi_environment(self, script, method, query, body, headers, remote_addr):
+        """Build the uhttpd CGI environment for one request"""
+        env = {
+            "PATH": (self.shim_dir + os.pathsep if self.instrument else "") +
+                    self.bin_dir + os.pathsep + os.environ.get("PATH", "/usr/bin:/bin"),
+            "GATEWAY_INTERFACE": "CGI/1.1",
+            "SERVER_SOFTWARE": EmulatorHandler.server_version,
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SCRIPT_NAME": f"/cgi-bin/{script}",
+            "SCRIPT_FILENAME": os.path.join(self.cgi_dir, script),
+            "DOCUMENT_ROOT": self.www_dir,
+            "REQUEST_METHOD": method,
+            "QUERY_STRING": query,
+            "CONTENT_LENGTH": str(len(body)),
+            "CONTENT_TYPE": headers.get("Content-Type", "") if headers else "",
+            "REMOTE_ADDR": remote_addr,
+        }
+        for name, value in (headers.items() if headers else []):
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key not in ("HTTP_CONTENT_LENGTH", "HTTP_CONTENT_TYPE"):
+                env[key] = value
+        return env
+
+    def run_cgi(self, script, method="GET", query="", body=b"", headers=None, remote_addr="127.0.0.1"):
+        """Execute one CGI script and return (status, headers, body)"""
+        path = os.path.join(self.cgi_dir, script)
+        if "/" in script or not os.path.isfile(path):
+            return 404, [("Content-Type", "text/plain")], b"Not Found"
+
+        interpreter = INTERPRETERS.get(os.path.splitext(script)[1])
+        if not interpreter or not shutil.which(interpreter):
+            return 500, [("Content-Type", "text/plain")], \
+                f"No interpreter available for {script}".encode()
+
+        env = self.cgi_environment(script, method, query, body, headers, remote_addr)
+        if self.instrument:
+            return self._run_instrumented(script, [interpreter, path], env, query, body)
+        try:
+            stdout = self._spawn([interpreter, path], env, body)
+        except subprocess.TimeoutExpired:
+            return 504, [("Content-Type", "text/plain")], b"Script timed out"
+
+        return parse_cgi_output(stdout)
+
+    def _spawn(self, command, env, body):
+        """Run one CGI process to completion and return its stdout, listing it in cgi_pids meanwhile"""
+        with subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              env=env, cwd=self.cgi_dir) as process:
+            self.cgi_pids.add(process.pid)
+            try:
+                stdout, _ = process.communicate(body, timeout=SCRIPT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+            finally:
+                self.cgi_pids.discard(process.pid)
+        return stdout
+
+    def _run_instrumented(self, script, command, env, query, body):
+        """Run one CGI request serially and attribute processes, execs and CPU time to it"""
+        # RUSAGE_CHILDREN and the last-PID counter are process/system wide, so
+        # instrumented requests are serialized to keep the numbers per request
+        with self._cost_lock:
+            exec_log = os.path.join(self.workdir, "exec.log")
+            open(exec_log, "w").close()
+            env["NETMON_EXEC_LOG"] = exec_log
+
+            usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            pid_before = read_last_pid()
+            started = time.perf_counter()
+            try:
+                stdout = self._spawn(command, env, body)
+                timed_out = False
+            except subprocess.TimeoutExpired:
+                timed_out = True
+            wall_ms = (time.perf_counter() - started) * 1000
+            pid_after = read_last_pid()
+            usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+            with open(exec_log, encoding="utf-8") as f:
+                execs = Counter(line.strip() for line in f if line.strip())
+
+        cost = {
+            "script": script,
+            "action": request_action(query, body),
+            "devices": self.device_count,
+            "wall_ms": round(wall_ms, 3),
+            "cpu_user_ms": round((usage_after.ru_utime - usage_before.ru_utime) * 1000, 3),
+            "cpu_sys_ms": round((usage_after.ru_stime - usage_before.ru_stime) * 1000, 3),
+            # Every fork, including subshells for $(...) that never exec anything
+            "processes": (pid_after - pid_before) if pid_before is not None and pid_after is not None else None,
+            "execs": dict(execs),
+        }
+        self.cost_log.append(cost)
+
+        if timed_out:
+            return 504, [("Content-Type", "text/plain")], b"Script timed out"
+        status, headers, payload = parse_cgi_output(stdout)
+        headers += [
+            ("X-Netmon-Wall-Ms", f"{cost['wall_ms']:.1f}"),
+            ("X-Netmon-Cpu-Ms", f"{cost['cpu_user_ms'] + cost['cpu_sys_ms']:.1f}"),
+            ("X-Netmon-Processes", str(cost["processes"])),
+            ("X-Netmon-Execs", str(sum(execs.values()))),
+        ]
+        return status, headers, payload
+
+    def serve_static(self, path):
+        """Serve a file from the staged web root"""
+        relative = os.path.normpath(path.lstrip("/")) if path.strip("/") else "index.html"
+        if relative.startswith(".."):
+            return 403, [("Content-Type", "text/plain")], b"Forbidden"
+        full = os.path.join(self.www_dir, relative)
+        if os.path.isdir(full):
+            full = os.path.join(full, "index.html")
+        if not os.path.isfile(full):
+            return 404, [("Content-Type", "text/plain")], b"Not Found"
+        with open(full, "rb") as f:
+            payload = f.read()
+        content_type = mimetypes.guess_type(full)[0] or "application/octet-stream"
+        return 200, [("Content-Type", content_type)], payload
+
+    def start(self):
+        """Stage the fixtures and start serving in a background thread"""
+        self.stage()
+        self.server = ThreadingHTTPServer((self.host, self.port), EmulatorHandler)
+        self.server.daemon_threads = True
+        self.server.emulator = self
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and remove the temporary work directory"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self._own_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def read_last_pid():
+    """Most recently assigned PID, used to count forks; None where unavailable"""
+    try:
+        with open(LAST_PID_PATH) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def request_action(query, body):
+    """The API action of a request, from the query string or the JSON body"""
+    action = parse_qs(query).get("action", [None])[0]
+    if action is None and body:
+        try:
+            action = json.loads(body).get("action")
+        except (ValueError, AttributeError):
+            pass
+    return action
+
+
+def parse_cgi_output(output):
+    """Split CGI stdout into (status, headers, body) like uhttpd does"""
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        head, found, body = output.partition(separator)
+        if found:
+            break
+    else:
+        return 502, [("Content-Type", "text/plain")], b"Malformed CGI response"
+
+    status = 200
+    headers = []
+    for line in head.decode("latin-1").splitlines():
+        name, _, value = line.partition(":")
+        name, value = name.strip(), value.strip()
+        if not name:
+            continue
+        if name.lower() == "status":
+            status = int(value.split()[0])
+        elif name.lower() != "content-length":
+            headers.append((name, value))
+    return status, headers, body
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Serve files/www and its CGI scripts locally")
+    parser.add_argument("--devices", type=int, default=10,
+                        help=f"Fixture device count ({MIN_DEVICES}-{MAX_DEVICES})")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workdir", help="Keep the staged tree and fixtures in this directory")
+    parser.add_argument("--resolve-hostnames", action="store_true",
+                        help="Make the nslookup stub return a PTR name for every device")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Attribute processes, execs and CPU time to every CGI request (X-Netmon-* headers)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    emulator = RouterEmulator(args.devices, args.host, args.port, args.workdir,
+                              resolve_hostnames=args.resolve_hostnames, quiet=not args.verbose,
+                              instrument=args.instrument)
+    emulator.start()
+    print(f"🚀 Router emulator serving {emulator.base_url} with {args.devices} fixture devices")
+    print(f"📁 Fixtures: {emulator.workdir}")
+    print(f"🧪 Test it: python3 selenium_web_tester.py --router {args.host} --port {emulator.port}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+        print("\n🏁 Emulator stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Run Tracing
+Nested timing spans for the testers' steps (driver startup, URL probes, API
+calls, JavaScript checks, fix-script generation), exported as Chrome
+trace-event JSON for chrome://tracing / Perfetto and as a flat CSV
+"""
+
+import argparse
+import csv
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+CSV_FIELDS = ["id", "parent_id", "depth", "name", "category", "start_ms", "duration_ms", "self_ms",
+              "status", "thread", "attributes"]
+
+
+class Span:
+    """One timed step; attrs end up in the trace event's args and the CSV"""
+
+    def __init__(self, span_id, parent, name, category, start, attrs):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end = None
+        self.status = "ok"
+        self.attrs = dict(attrs)
+        self.concurrent = False
+        self.lane = 0
+        self.depth = parent.depth + 1 if parent else 0
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class RunTracer:
+    """Collects spans for one run; span() nests through a per-thread stack"""
+
+    def __init__(self, run_name, **attrs):
+        self.run_name = run_name
+        self.attrs = dict(attrs, started_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.epoch = time.perf_counter()
+        self.wall_epoch = time.time()  # the same instant on the wall clock, for lining up other sources
+        self.spans = []
+        self.counters = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def _new(self, name, category, start, attrs, parent):
+        with self._lock:
+            span = Span(len(self.spans) + 1, parent, name, category, start, attrs)
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, category="step", **attrs):
+        """Time the with-block as a child of the enclosing span; exceptions mark it failed"""
+        span = self._new(name, category, time.perf_counter(), attrs, self.current())
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs.setdefault("error", str(e) or type(e).__name__)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            stack.pop()
+
+    def add_span(self, name, start, duration, category="step", status="ok", **attrs):
+        """Record a step timed elsewhere (e.g. one of several concurrent API probes)"""
+        span = self._new(name, category, start, attrs, self.current())
+        span.end = start + duration
+        span.status = status
+        span.concurrent = True
+        return span
+
+    def add_counters(self, name, samples, keys):
+        """Attach wall-clock samples (dicts with "t") as counter tracks, e.g. server CPU"""
+        for sample in samples:
+            self.counters.append((name, sample["t"], {key: sample[key] for key in keys if sample.get(key) is not None}))
+
+    def wall_time(self, start_ms):
+        """Wall-clock seconds of a row's start_ms"""
+        return self.wall_epoch + start_ms / 1000
+
+    def _assign_lanes(self):
+        """Chrome's viewer needs the events on one thread to nest, so spans timed
+        concurrently go to separate lanes, reusing a lane once it is free"""
+        lanes = []
+        for span in sorted((s for s in self.spans if s.concurrent), key=lambda s: s.start):
+            for lane, busy_until in enumerate(lanes):
+                if busy_until <= span.start:
+                    lanes[lane] = span.end
+                    span.lane = lane + 1
+                    break
+            else:
+                lanes.append(span.end)
+                span.lane = len(lanes)
+
+    def rows(self):
+        """Flat span records in start order, times in ms relative to the run start"""
+        self._assign_lanes()
+        children = {}
+        for span in self.spans:
+            if span.parent:
+                children.setdefault(span.parent.id, []).append((span.start, span.start + span.duration))
+        # Self time excludes the wall time covered by any child, counted once when children overlap
+        child_time = {}
+        for parent_id, intervals in children.items():
+            covered, reach = 0.0, None
+            for begin, finish in sorted(intervals):
+                if reach is None or begin > reach:
+                    covered += finish - begin
+                    reach = finish
+                elif finish > reach:
+                    covered += finish - reach
+                    reach = finish
+            child_time[parent_id] = covered
+        return [{
+            "id": span.id,
+            "parent_id": span.parent.id if span.parent else None,
+            "depth": span.depth,
+            "name": span.name,
+            "category": span.category,
+            "start_ms": round((span.start - self.epoch) * 1000, 3),
+            "duration_ms": round(span.duration * 1000, 3),
+            "self_ms": round(max(span.duration - child_time.get(span.id, 0), 0) * 1000, 3),
+            "status": span.status,
+            "thread": span.lane,
+            "attributes": span.attrs,
+        } for span in sorted(self.spans, key=lambda s: (s.start, s.id))]
+
+    def to_chrome_trace(self):
+        """Trace Event Format: one complete ("X") event per span"""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.run_name}}]
+        rows = self.rows()
+        for lane in sorted({r["thread"] for r in rows}):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": lane,
+                           "args": {"name": "main" if lane == 0 else f"concurrent {lane}"}})
+        for r in rows:
+            events.append({
+                "name": r["name"],
+                "cat": r["category"],
+                "ph": "X",
+                "ts": round(r["start_ms"] * 1000, 1),
+                "dur": round(r["duration_ms"] * 1000, 1),
+                "pid": pid,
+                "tid": r["thread"],
+                "args": dict(r["attributes"], status=r["status"], span_id=r["id"]),
+            })
+        for name, t, values in self.counters:
+            events.append({"name": name, "ph": "C", "ts": round((t - self.wall_epoch) * 1e6, 1), "pid": pid,
+                           "args": values})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": dict(self.attrs, run=self.run_name)}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, indent=1)
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for r in self.rows():
+                writer.writerow(dict(r, attributes=json.dumps(r["attributes"], sort_keys=True)))
+
+    def total_ms(self):
+        roots = [s for s in self.spans if s.parent is None]
+        if not roots:
+            return 0.0
+        return (max(s.start + s.duration for s in roots) - min(s.start for s in roots)) * 1000
+
+
+def traced(name, category="step"):
+    """Method decorator: time each call as a span on self.tracer"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(name, category) as span:
+                result = method(self, *args, **kwargs)
+                if isinstance(result, (bool, int, float, str)):
+                    span.set(result=result)
+                elif isinstance(result, (list, tuple)):
+                    span.set(result_count=len(result))
+                return result
+        return wrapper
+    return decorate
+
+
+def print_trace_summary(tracer, indent="", slowest=5):
+    """Top-level steps with their share of the run, then the slowest leaf steps"""
+    rows = tracer.rows()
+    total = tracer.total_ms()
+    if not rows or not total:
+        return
+    print(f"{indent}🧭 {tracer.run_name}: {len(rows)} spans over {total / 1000:.2f} s")
+    for r in rows:
+        if r["depth"] > 1:
+            continue
+        icon = "❌" if r["status"] == "error" else "  "
+        print(f"{indent}{icon} {'   ' * r['depth']}{r['name']:<{40 - 3 * r['depth']}} "
+              f"{r['duration_ms']:>9,.1f} ms {r['duration_ms'] / total:>6.1%}")
+    parents = {r["parent_id"] for r in rows}
+    leaves = sorted((r for r in rows if r["id"] not in parents), key=lambda r: -r["duration_ms"])[:slowest]
+    if leaves:
+        print(f"{indent}🐌 Slowest steps: " + ", ".join(f"{r['name']} {r['duration_ms']:,.0f} ms" for r in leaves))
+
+
+def load_trace_totals(path):
+    """Total ms per span name from a Chrome trace or CSV written by RunTracer"""
+    totals = {}
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                totals[row["name"]] = totals.get(row["name"], 0.0) + float(row["duration_ms"])
+        return totals
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    for event in trace.get("traceEvents", []):
+        if event.get("ph") == "X":
+            totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"] / 1000
+    return totals
+
+
+def compare_traces(paths):
+    """Print span totals from several runs side by side, biggest first"""
+    runs = [load_trace_totals(p) for p in paths]
+    names = sorted(set().union(*runs), key=lambda n: -max(run.get(n, 0) for run in runs))
+    labels = [os.path.basename(p)[:14] for p in paths]
+    print(f"   {'span':<40} " + " ".join(f"{label:>14}" for label in labels))
+    for name in names:
+        print(f"   {name[:40]:<40} " + " ".join(
+            f"{run[name]:>11,.1f} ms" if name in run else f"{'-':>14}" for run in runs))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare Network Monitor tester traces side by side")
+    parser.add_argument("traces", nargs="+", help="Chrome trace JSON or CSV files written with --trace/--trace-csv")
+    args = parser.parse_args()
+    try:
+        compare_traces(args.traces)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not read trace: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ Network Monitor Web Interface Selenium Tester
 Automatically tests and fixes web interface issues
 """
 
+import argparse
 import time
 import json
 import os
@@ -16,14 +17,27 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from api_probe import check_conditional, print_conditional_results, probe_endpoints, print_probe_results
+from client_profiles import (PROFILES, apply_profile, install_client_hooks, measure_profile, parse_profiles,
+                             print_client_results)
+from page_readiness import PageReadiness
+from dashboard_soak import SoakSampler, analyze_soak, print_soak_report, print_soak_sample
+from network_budget import capture_network, enable_performance_logging, print_network_budget
+from page_timing import collect_page_timing, install_fetch_hook, print_page_timing
+from run_tracing import RunTracer, print_trace_summary, traced
+
 class NetworkMonitorTester:
-    def __init__(self, router_ip="192.168.1.1", port="8080"):
+    def __init__(self, router_ip="192.168.1.1", port="8080", profile=None):
         self.router_ip = router_ip
         self.port = port
         self.base_url = f"http://{router_ip}:{port}"
+        self.profile = profile
+        self.tracer = RunTracer("selenium_web_tester", base_url=self.base_url)
         self.driver = None
+        self.readiness = None
         self.test_results = []
         
+    @traced("driver_startup", "driver")
     def setup_driver(self):
         """Setup Chrome WebDriver with appropriate options"""
         print("🚀 Setting up Chrome WebDriver...")
@@ -37,6 +51,7 @@ class NetworkMonitorTester:
         chrome_options.add_argument("--disable-web-security")
         chrome_options.add_argument("--allow-running-insecure-content")
         chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+        enable_performance_logging(chrome_options)
         
         # ChromeDriver service
         chromedriver_path = "./chromedriver.exe"
@@ -49,19 +64,25 @@ class NetworkMonitorTester:
         try:
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             self.driver.implicitly_wait(10)
+            self.readiness = PageReadiness(self.driver, tracer=self.tracer)
+            install_fetch_hook(self.driver)
+            if self.profile:
+                settings = apply_profile(self.driver, self.profile)
+                print(f"🐢 Client profile {self.profile}: CPU {settings['cpu_rate']}x slower, "
+                      f"{settings['latency_ms']} ms latency")
             print("✅ Chrome WebDriver setup successful!")
             return True
         except Exception as e:
             print(f"❌ Failed to setup ChromeDriver: {e}")
             return False
     
+    @traced("main_page", "page")
     def test_main_page(self):
         """Test main page loading"""
         print(f"\n🔍 Testing main page: {self.base_url}")
         
         try:
-            self.driver.get(self.base_url)
-            time.sleep(3)
+            self.readiness.load(self.base_url, "main_page")
             
             # Check if page loaded
             title = self.driver.title
@@ -111,6 +132,7 @@ class NetworkMonitorTester:
             })
             return False
     
+    @traced("alternative_urls", "page")
     def test_alternative_urls(self):
         """Test alternative URL paths"""
         print("\n🔗 Testing alternative URLs...")
@@ -125,21 +147,25 @@ class NetworkMonitorTester:
         successful_urls = []
         
         for url in urls_to_test:
-            try:
-                print(f"🔍 Testing: {url}")
-                self.driver.get(url)
-                time.sleep(2)
-                
-                body_text = self.driver.find_element(By.TAG_NAME, "body").text.lower()
-                
-                if "network monitor" in body_text and "not found" not in body_text:
-                    print(f"✅ {url} - Working!")
-                    successful_urls.append(url)
-                else:
-                    print(f"❌ {url} - Failed")
+            with self.tracer.span("url_probe", "page", url=url) as span:
+                try:
+                    print(f"🔍 Testing: {url}")
+                    self.readiness.load(url, f"alternative:{url}")
                     
-            except Exception as e:
-                print(f"❌ {url} - Error: {e}")
+                    body_text = self.driver.find_element(By.TAG_NAME, "body").text.lower()
+                    
+                    if "network monitor" in body_text and "not found" not in body_text:
+                        print(f"✅ {url} - Working!")
+                        successful_urls.append(url)
+                        span.set(working=True)
+                    else:
+                        print(f"❌ {url} - Failed")
+                        span.set(working=False)
+                        
+                except Exception as e:
+                    print(f"❌ {url} - Error: {e}")
+                    span.status = "error"
+                    span.set(error=str(e))
         
         if successful_urls:
             print(f"✅ Found {len(successful_urls)} working URLs:")
@@ -150,52 +176,77 @@ class NetworkMonitorTester:
             print("❌ No working URLs found")
             return None
     
+    @traced("api_endpoints", "api")
     def test_api_endpoints(self):
         """Test API endpoints"""
         print("\n🔌 Testing API endpoints...")
         
-        api_endpoints = [
-            f"{self.base_url}/cgi-bin/netmon-api.sh?action=get_devices",
-            f"{self.base_url}/cgi-bin/netmon-api.lua?action=get_devices",
-            f"{self.base_url}/cgi-bin/test.sh"
-        ]
+        started = time.perf_counter()
+        results = probe_endpoints(self.base_url)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print_probe_results(results)
+        print(f"⏱️ API sweep took {elapsed_ms:.1f} ms")
         
         working_apis = []
-        
-        for endpoint in api_endpoints:
-            try:
-                print(f"🔍 Testing API: {endpoint}")
-                self.driver.get(endpoint)
-                time.sleep(2)
-                
-                body_text = self.driver.find_element(By.TAG_NAME, "body").text
-                
-                if "forbidden" in body_text.lower():
-                    print(f"❌ {endpoint} - 403 Forbidden")
-                elif "not found" in body_text.lower():
-                    print(f"❌ {endpoint} - 404 Not Found")
-                elif "success" in body_text.lower() or "cgi is working" in body_text.lower():
-                    print(f"✅ {endpoint} - Working!")
-                    working_apis.append(endpoint)
-                else:
-                    print(f"⚠️ {endpoint} - Unexpected response")
-                    
-            except Exception as e:
-                print(f"❌ {endpoint} - Error: {e}")
+        for entry in results:
+            if "offset_ms" in entry:
+                # Probes run concurrently, so each becomes its own span on a separate lane
+                self.tracer.add_span(
+                    f"api:{entry['path']}", started + entry["offset_ms"] / 1000, entry["elapsed_ms"] / 1000,
+                    "api", "ok" if entry["ok"] else "error", url=entry["url"], http_status=entry.get("status"),
+                    latency_ms=entry.get("latency_ms"), ttfb_ms=entry.get("ttfb_ms"),
+                    connection_reused=entry.get("connection_reused"), error=entry.get("error"))
+            result = {
+                "test": f"api:{entry['path']}",
+                "status": "passed" if entry["ok"] else "failed",
+                "http_status": entry.get("status"),
+                "latency_ms": entry.get("latency_ms")
+            }
+            if entry.get("error"):
+                result["error"] = entry["error"]
+            self.test_results.append(result)
+            if entry["ok"]:
+                working_apis.append(entry["url"])
         
         return working_apis
     
+    @traced("conditional_polling", "api")
+    def test_conditional_polling(self):
+        """Check get_devices answers If-None-Match with 304 and since=<version> with a delta"""
+        print("\n♻️ Testing conditional device polling...")
+        
+        result = check_conditional(self.base_url)
+        print_conditional_results(result, "   ")
+        if result["error"]:
+            status = "failed"
+        elif (result["etag"] and result["not_modified"]) or result["deltas"]:
+            status = "passed"
+        else:
+            status = "warning"
+        self.test_results.append({
+            "test": "conditional_polling",
+            "status": status,
+            "not_modified_rate": result["not_modified_rate"],
+            "conditional_saving": result["conditional_saving"],
+            "delta_saving": result["delta_saving"],
+            "report": result
+        })
+        return result
+    
+    @traced("javascript", "javascript")
     def test_javascript_functionality(self, working_url):
         """Test JavaScript functionality"""
         print("\n📜 Testing JavaScript functionality...")
         
         try:
-            self.driver.get(working_url)
-            time.sleep(5)  # Wait for page to fully load
+            self.readiness.load(working_url, "javascript:load")
+            self.readiness.first_api_fetch("javascript:first_api_fetch")
             
             # Check for JavaScript errors in console
-            logs = self.driver.get_log('browser')
-            js_errors = [log for log in logs if log['level'] == 'SEVERE']
+            with self.tracer.span("console_errors", "javascript") as span:
+                logs = self.driver.get_log('browser')
+                js_errors = [log for log in logs if log['level'] == 'SEVERE']
+                span.set(errors=len(js_errors))
             
             if js_errors:
                 print("❌ JavaScript errors found:")
@@ -214,7 +265,7 @@ class NetworkMonitorTester:
                 device_count_element = WebDriverWait(self.driver, 10).until(
                     EC.presence_of_element_located((By.ID, "deviceCount"))
                 )
-                device_count = device_count_element.text
+                device_count = self.readiness.device_count_ready(step="javascript:device_count") or device_count_element.text
                 print(f"📱 Device Count: {device_count}")
                 
                 if device_count and device_count != "-":
@@ -235,16 +286,232 @@ class NetworkMonitorTester:
                 refresh_btn = self.driver.find_element(By.ID, "refreshBtn")
                 if refresh_btn:
                     print("✅ Refresh button found")
-                    refresh_btn.click()
-                    time.sleep(3)
-                    print("✅ Refresh button clicked successfully")
+                    if self.readiness.click_and_wait_refresh(step="javascript:refresh"):
+                        print("✅ Refresh button clicked successfully")
+                    else:
+                        print("⚠️ Refresh did not complete in time")
                     
             except Exception as e:
                 print(f"❌ Refresh button test failed: {e}")
                 
+            self.capture_page_timing(working_url)
+                
         except Exception as e:
             print(f"❌ JavaScript test failed: {e}")
     
+    @traced("page_timing", "page")
+    def capture_page_timing(self, working_url, pages=("index.html", "advanced_index.html")):
+        """Record TTFB, DOMContentLoaded, load and per-API latency for each dashboard page"""
+        print("\n⏱️ Capturing page timings...")
+        base = working_url.rsplit("/", 1)[0] if working_url.endswith(".html") else working_url.rstrip("/")
+        
+        for page in pages:
+            try:
+                self.readiness.load(f"{base}/{page}", f"timing:{page}")
+                self.readiness.first_api_fetch(f"timing:{page}:first_api_fetch")
+                timing = collect_page_timing(self.driver)
+                print_page_timing(timing, "   ")
+                self.test_results.append({
+                    "test": f"timing:{page}",
+                    "status": "passed" if timing["api"] else "warning",
+                    "timing": timing
+                })
+            except Exception as e:
+                print(f"❌ Timing capture failed for {page}: {e}")
+                self.test_results.append({
+                    "test": f"timing:{page}",
+                    "status": "failed",
+                    "error": str(e)
+                })
+    
+    @traced("soak", "run")
+    def run_soak(self, duration_minutes, interval_seconds=60, page="advanced_index.html"):
+        """Keep the dashboard open, sample memory/DOM/listeners/poll latency and report a leak verdict"""
+        print(f"🧪 Soak test: {page} for {duration_minutes} min, sampling every {interval_seconds} s")
+        print("=" * 50)
+        
+        if not self.setup_driver():
+            return None
+        
+        try:
+            url = f"{self.base_url}/{page}"
+            self.readiness.load(url, "soak:load")
+            self.readiness.first_api_fetch("soak:first_api_fetch")
+            
+            sampler = SoakSampler(self.driver)
+            started = time.monotonic()
+            deadline = started + duration_minutes * 60
+            while True:
+                print_soak_sample(sampler.sample(time.monotonic() - started), "   ")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # The page keeps polling on its own while we wait
+                time.sleep(min(interval_seconds, remaining))
+            
+            report = analyze_soak(sampler.samples)
+            print("\n📈 Growth trends:")
+            print_soak_report(report, "   ")
+            self.test_results.append({
+                "test": "soak",
+                "status": {"stable": "passed", "leak": "failed"}.get(report["verdict"], "warning"),
+                "url": url,
+                "duration_minutes": duration_minutes,
+                "report": report,
+                "samples": sampler.samples
+            })
+            return report
+        finally:
+            if self.driver:
+                self.driver.quit()
+                print("\n🏁 Browser closed")
+    
+    @traced("network_budget", "run")
+    def run_network_budget(self, window_seconds, page="advanced_index.html"):
+        """Leave the dashboard polling and report requests/bytes per endpoint and poll cycle"""
+        print(f"📶 Network budget: {page} for {window_seconds} s")
+        print("=" * 50)
+        
+        if not self.setup_driver():
+            return None
+        
+        try:
+            url = f"{self.base_url}/{page}"
+            self.readiness.load(url, "network:load")
+            self.readiness.first_api_fetch("network:first_api_fetch")
+            
+            report = capture_network(self.driver, window_seconds)
+            print()
+            print_network_budget(report, "   ")
+            self.test_results.append({
+                "test": "network_budget",
+                "status": "warning" if report["over_budget"] or not report["cycles"] else "passed",
+                "url": url,
+                "report": report
+            })
+            return report
+        finally:
+            if self.driver:
+                self.driver.quit()
+                print("\n🏁 Browser closed")
+    
+    @traced("client_profiles", "run")
+    def run_client_profiles(self, profiles, window_seconds=30, page="advanced_index.html"):
+        """Load the dashboard cold under each throttling profile and check its refreshes keep up"""
+        print(f"🐢 Client profiles: {page} under {', '.join(profiles)}, {window_seconds} s each")
+        print("=" * 50)
+        
+        if not self.setup_driver():
+            return None
+        
+        try:
+            install_client_hooks(self.driver)
+            url = f"{self.base_url}/{page}"
+            results = []
+            for name in profiles:
+                try:
+                    result = measure_profile(self.driver, self.readiness, url, name, window_seconds)
+                except Exception as e:
+                    print(f"   ❌ {name}: {e}")
+                    continue
+                first_row = f"{result['first_row_ms']:,.0f} ms" if result["first_row_ms"] is not None else "never"
+                print(f"   {'✅' if result['holds'] else '❌'} {name}: first device row {first_row}, "
+                      f"{result['overlaps']} overlapping refreshes")
+                results.append(result)
+            
+            print()
+            print_client_results(results, "   ")
+            self.test_results.append({
+                "test": "client_profiles",
+                "status": "passed" if results and all(r["holds"] for r in results) else "warning",
+                "url": url,
+                "results": results
+            })
+            return results
+        finally:
+            if self.driver:
+                self.driver.quit()
+                print("\n🏁 Browser closed")
+    
+    @traced("frontend_bench", "run")
+    def run_frontend_bench(self, server, sizes, repeats=5, page="advanced_index.html"):
+        """Render the dashboard against canned API answers for each device count"""
+        from frontend_bench import install_long_task_hook, measure_size, print_frontend_results
+        
+        print(f"📐 Frontend scaling: {page} with {', '.join(str(s) for s in sizes)} devices")
+        print("=" * 50)
+        
+        if not self.setup_driver():
+            return None
+        
+        try:
+            install_long_task_hook(self.driver)
+            results = []
+            for size in sizes:
+                try:
+                    result = measure_size(self.driver, self.readiness, server, size, page, repeats)
+                except Exception as e:
+                    print(f"   ❌ {size} devices: {e}")
+                    break
+                print(f"   ✅ {size} devices: frame {result['frame_ms']} ms, "
+                      f"{result['long_tasks']} long tasks")
+                results.append(result)
+            
+            print()
+            print_frontend_results(results, "   ")
+            self.test_results.append({
+                "test": "frontend_bench",
+                "status": "passed" if results and all(r["usable"] for r in results) else "warning",
+                "page": page,
+                "results": results
+            })
+            return results
+        finally:
+            if self.driver:
+                self.driver.quit()
+                print("\n🏁 Browser closed")
+    
+    @traced("push_latency", "run")
+    def run_push_latency(self, fixture, changes=5, page="advanced_index.html"):
+        """Time device changes reaching the dashboard over Server-Sent Events and over polling"""
+        from push_latency import measure_browser, print_push_results
+        
+        print(f"⚡ Push vs poll: {changes} changes on {page}, daemon refresh every {fixture.interval:g} s")
+        print("=" * 50)
+        
+        if not self.setup_driver():
+            return None
+        
+        try:
+            results = []
+            for transport in ("push", "poll"):
+                try:
+                    result = measure_browser(self.driver, self.readiness, fixture, transport, changes, page=page)
+                except Exception as e:
+                    print(f"   ❌ {transport}: {e}")
+                    continue
+                median = f"{result['median_ms']:,.0f} ms" if result["median_ms"] is not None else "n/a"
+                print(f"   {'✅' if not result['missed'] else '❌'} {transport}: median {median}, "
+                      f"{result['missed']} missed")
+                results.append(result)
+            
+            print()
+            print_push_results(results, "   ")
+            pushed = any(r["transport"] == "push" and r["pushed"] for r in results)
+            self.test_results.append({
+                "test": "push_latency",
+                "status": "passed" if len(results) == 2 and pushed and not any(r["missed"] for r in results)
+                else "warning",
+                "page": page,
+                "results": results
+            })
+            return results
+        finally:
+            if self.driver:
+                self.driver.quit()
+                print("\n🏁 Browser closed")
+    
+    @traced("fix_script", "fix")
     def generate_fix_script(self):
         """Generate a fix script based on test results"""
         print("\n🔧 Generating fix script based on test results...")
@@ -405,6 +672,7 @@ echo "Access: http://$(uci get network.lan.ipaddr):8080/"
         
         print("✅ Fix script generated: auto_fix_netmon.sh")
         
+    @traced("run_tests", "run")
     def run_tests(self):
         """Run all tests"""
         print("🎯 Starting Network Monitor Web Interface Tests...")
@@ -427,6 +695,9 @@ echo "Access: http://$(uci get network.lan.ipaddr):8080/"
             # Test API endpoints
             working_apis = self.test_api_endpoints()
             
+            # 304s and deltas instead of the full device list every poll
+            self.test_conditional_polling()
+            
             # Test JavaScript if we have a working URL
             if working_url:
                 self.test_javascript_functionality(working_url)
@@ -445,6 +716,19 @@ echo "Access: http://$(uci get network.lan.ipaddr):8080/"
                 if "error" in result:
                     print(f"   Error: {result['error']}")
             
+            if self.readiness.timings:
+                print("\n⏱️ Wait timings:")
+                self.readiness.print_timings("   ")
+                self.test_results.append({
+                    "test": "readiness",
+                    "status": "passed" if all(t["ok"] for t in self.readiness.timings) else "warning",
+                    "timings": self.readiness.timings,
+                    "total_wait_seconds": self.readiness.total_wait()
+                })
+            
+            print("\n🧭 Where the run spent its time:")
+            print_trace_summary(self.tracer, "   ")
+            
             if working_url:
                 print(f"\n🌐 Working URL: {working_url}")
             
@@ -463,21 +747,169 @@ echo "Access: http://$(uci get network.lan.ipaddr):8080/"
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Network Monitor Selenium Tester")
+    parser.add_argument("--router", help="Router IP (prompted for when omitted)")
+    parser.add_argument("--port", help="Web interface port (prompted for when omitted)")
+    parser.add_argument("--inventory", help="Test every router listed in this inventory file (fleet mode)")
+    parser.add_argument("--emulate", type=int, metavar="DEVICES",
+                        help="Test a local router emulator with this many fixture devices")
+    parser.add_argument("--instrument", action="store_true",
+                        help="With --emulate: report per-request CGI process and CPU cost")
+    parser.add_argument("--server-samples", metavar="FILE",
+                        help="With --emulate: sample the emulator's CPU/RSS/fds/processes during the run and "
+                             "line them up with the client-side steps")
+    parser.add_argument("--soak", type=float, metavar="MINUTES",
+                        help="Keep the dashboard open this long and check for memory/DOM leaks")
+    parser.add_argument("--soak-interval", type=float, default=60, help="Seconds between soak samples")
+    parser.add_argument("--soak-page", default="advanced_index.html", help="Page to keep open during the soak")
+    parser.add_argument("--soak-json", metavar="FILE", help="Write the soak samples and verdict as JSON")
+    parser.add_argument("--network-budget", type=float, metavar="SECONDS",
+                        help="Record the dashboard's polling traffic this long and report a per-endpoint budget")
+    parser.add_argument("--budget-page", default="advanced_index.html", help="Page to keep open for the budget")
+    parser.add_argument("--budget-json", metavar="FILE", help="Write the network budget report as JSON")
+    parser.add_argument("--client-profiles", metavar="NAMES", nargs="?", const="all",
+                        help=f"Load the dashboard under these throttling profiles ({', '.join(PROFILES)}; default all)")
+    parser.add_argument("--profile-window", type=float, default=30, help="Seconds of refreshes watched per profile")
+    parser.add_argument("--profile-json", metavar="FILE", help="Write the client profile results as JSON")
+    parser.add_argument("--throttle", choices=list(PROFILES), help="Run any other mode under this client profile")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write the run's timing spans as Chrome trace-event JSON (chrome://tracing, Perfetto)")
+    parser.add_argument("--trace-csv", metavar="FILE", help="Write the run's timing spans as a flat CSV")
+    parser.add_argument("--frontend-bench", metavar="SIZES", nargs="?", const="10,100,1000,5000",
+                        help="Render the dashboard against canned API answers for these device counts")
+    parser.add_argument("--bench-repeats", type=int, default=5, help="Renders timed per device count")
+    parser.add_argument("--bench-json", metavar="FILE", help="Write the frontend benchmark results as JSON")
+    parser.add_argument("--push-latency", type=int, metavar="CHANGES", nargs="?", const=5,
+                        help="Time device changes reaching the dashboard pushed (SSE) vs polled, "
+                             "against a local API daemon")
+    parser.add_argument("--push-devices", type=int, default=50, help="Fixture devices for --push-latency")
+    parser.add_argument("--push-interval", type=float, default=5, help="Daemon snapshot refresh interval (s)")
+    parser.add_argument("--push-json", metavar="FILE", help="Write the push latency results as JSON")
+    args, fleet_args = parser.parse_known_args()
+    if args.client_profiles:
+        try:
+            args.client_profiles = parse_profiles(args.client_profiles)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.inventory:
+        import fleet_runner
+        extra = ["--port", args.port] if args.port else []
+        sys.exit(fleet_runner.main([args.inventory] + extra + fleet_args))
+    
     print("🚀 Network Monitor Selenium Tester")
     print("=" * 50)
     
+    def write_trace(tester):
+        if args.trace:
+            tester.tracer.write_chrome_trace(args.trace)
+            print(f"🧭 Trace written to {args.trace}")
+        if args.trace_csv:
+            tester.tracer.write_csv(args.trace_csv)
+            print(f"🧭 Trace CSV written to {args.trace_csv}")
+    
+    if args.frontend_bench:
+        from frontend_bench import FixtureApiServer
+        sizes = [int(v) for v in args.frontend_bench.split(",") if v.strip()]
+        with FixtureApiServer() as server:
+            tester = NetworkMonitorTester(server.host, server.port, args.throttle)
+            tester.run_frontend_bench(server, sizes, args.bench_repeats)
+            write_trace(tester)
+        if args.bench_json and tester.test_results:
+            with open(args.bench_json, "w", encoding="utf-8") as f:
+                json.dump(tester.test_results[-1], f, indent=2)
+            print(f"📄 Frontend benchmark written to {args.bench_json}")
+        return
+    
+    if args.push_latency:
+        from push_latency import DaemonFixture
+        with DaemonFixture(args.push_devices, args.push_interval) as fixture:
+            print(f"🧪 API daemon with {args.push_devices} fixture devices at {fixture.base_url}")
+            tester = NetworkMonitorTester(fixture.host, fixture.port, args.throttle)
+            tester.run_push_latency(fixture, args.push_latency)
+            write_trace(tester)
+        if args.push_json and tester.test_results:
+            with open(args.push_json, "w", encoding="utf-8") as f:
+                json.dump(tester.test_results[-1], f, indent=2)
+            print(f"📄 Push latency results written to {args.push_json}")
+        return
+    
+    def run(tester):
+        tester.profile = args.throttle
+        try:
+            run_mode(tester)
+        finally:
+            write_trace(tester)
+    
+    def run_mode(tester):
+        if args.client_profiles:
+            tester.run_client_profiles(args.client_profiles, args.profile_window)
+            output, label = args.profile_json, "Client profile results"
+        elif args.network_budget:
+            tester.run_network_budget(args.network_budget, args.budget_page)
+            output, label = args.budget_json, "Network budget"
+        elif args.soak:
+            tester.run_soak(args.soak, args.soak_interval, args.soak_page)
+            output, label = args.soak_json, "Soak results"
+        else:
+            tester.run_tests()
+            return
+        if output and tester.test_results:
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(tester.test_results[-1], f, indent=2)
+            print(f"📄 {label} written to {output}")
+    
+    def run_sampled(tester, emulator):
+        from server_sampler import ServerSampler, line_up, print_alignment, print_server_summary
+        tester.profile = args.throttle
+        try:
+            with ServerSampler(cgi_roots=lambda: emulator.cgi_pids) as sampler:
+                run_mode(tester)
+            
+            # Client side: every timed API call, page load and wait from the run's trace
+            client = [{"t": tester.tracer.wall_time(r["start_ms"]), "latency_ms": r["duration_ms"],
+                       "action": r["name"]}
+                      for r in tester.tracer.rows() if r["category"] in ("api", "navigation", "wait")]
+            report = line_up(sampler.samples, client)
+            print("\n📈 Emulator server side during the run:")
+            print_server_summary(sampler.samples, "   ")
+            print_alignment(report, "   ")
+            with open(args.server_samples, "w", encoding="utf-8") as f:
+                json.dump({"server": sampler.samples, "alignment": report}, f, indent=2)
+            print(f"📄 Server samples written to {args.server_samples}")
+            
+            tester.tracer.add_counters("CPU %", sampler.samples, ("server_cpu_pct", "cgi_cpu_pct"))
+            tester.tracer.add_counters("CGI processes", sampler.samples, ("cgi_processes",))
+            tester.tracer.add_counters("RSS KB", sampler.samples, ("server_rss_kb", "cgi_rss_kb"))
+        finally:
+            write_trace(tester)
+    
+    if args.emulate:
+        from router_emulator import RouterEmulator
+        with RouterEmulator(devices=args.emulate, instrument=args.instrument) as emulator:
+            print(f"🧪 Router emulator with {args.emulate} devices at {emulator.base_url}")
+            tester = NetworkMonitorTester(emulator.host, emulator.port)
+            if args.server_samples:
+                run_sampled(tester, emulator)
+            else:
+                run(tester)
+        return
+    
     # Get router IP from user or use default
-    router_ip = input("Enter router IP (default: 192.168.1.1): ").strip()
+    router_ip = args.router
+    if router_ip is None:
+        router_ip = input("Enter router IP (default: 192.168.1.1): ").strip()
     if not router_ip:
         router_ip = "192.168.1.1"
     
     # Get port from user or use default
-    port = input("Enter port (default: 8080): ").strip()
+    port = args.port
+    if port is None:
+        port = input("Enter port (default: 8080): ").strip()
     if not port:
         port = "8080"
     
-    tester = NetworkMonitorTester(router_ip, port)
-    tester.run_tests()
+    run(NetworkMonitorTester(router_ip, port))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Network Monitor Server-Side Sampler
+Samples CPU, RSS, open file descriptors and process counts of the web
+server and its CGI children from /proc at a fixed interval, and lines the
+samples up with client-side latencies on one wall-clock timeline
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import sys
+import threading
+import time
+
+from router_emulator import read_last_pid
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_KB = (os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096) // 1024
+DEFAULT_INTERVAL = 0.25
+SPIKE_PERCENTILE = 95
+
+
+def read_stat(pid, task=None):
+    """(ppid, utime+stime, cutime+cstime, threads, rss_kb) from /proc/<pid>/stat, in seconds; None if gone"""
+    path = f"/proc/{pid}/task/{task}/stat" if task else f"/proc/{pid}/stat"
+    try:
+        with open(path) as f:
+            data = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces or parentheses; the fields after the last ')' are fixed
+    fields = data[data.rindex(")") + 2:].split()
+    return (int(fields[1]), (int(fields[11]) + int(fields[12])) / CLK_TCK,
+            (int(fields[13]) + int(fields[14])) / CLK_TCK, int(fields[17]), int(fields[21]) * PAGE_KB)
+
+
+def count_fds(pid):
+    try:
+        return len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return 0
+
+
+def process_tree():
+    """ppid -> [pid] for every process visible in /proc"""
+    children = {}
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            stat = read_stat(int(name))
+            if stat:
+                children.setdefault(stat[0], []).append(int(name))
+    return children
+
+
+def descendants(roots, children):
+    """roots plus everything they spawned"""
+    found, pending = set(), list(roots)
+    while pending:
+        pid = pending.pop()
+        if pid not in found:
+            found.add(pid)
+            pending.extend(children.get(pid, ()))
+    return found
+
+
+class ServerSampler:
+    """Background /proc sampler for one server process and its CGI children
+
+    The server is `pid` (this process when the emulator runs in-process).
+    CGI processes are the trees rooted at cgi_roots(), or every child of the
+    server when no callback is given. Threads in exclude_threads (the client
+    driving the load, and the sampler itself) are left out of the server's CPU.
+
+    CGI CPU per interval is the growth of live CGI processes (their own time
+    plus what they reaped) and of the server's cutime/cstime, minus the part of
+    processes that vanished which was already counted, so short-lived scripts
+    and the binaries they run between two samples are still counted once.
+    Other children of the server (a ChromeDriver started by the tester) are
+    tracked the same way and taken back out when they are reaped. CPU comes
+    in clock ticks, so very short intervals read coarse.
+    """
+
+    def __init__(self, pid=None, cgi_roots=None, interval=DEFAULT_INTERVAL, exclude_threads=None):
+        self.pid = pid or os.getpid()
+        self.cgi_roots = cgi_roots
+        self.interval = interval
+        self.exclude_threads = set(exclude_threads or ())
+        if self.pid == os.getpid() and exclude_threads is None:
+            self.exclude_threads.add(threading.main_thread().native_id)
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous = None
+        self._seen = {}
+        self._others = {}
+        self._carry = 0.0
+
+    def _excluded_cpu(self):
+        total = 0.0
+        for tid in self.exclude_threads:
+            stat = read_stat(self.pid, tid)
+            if stat:
+                total += stat[1]
+        return total
+
+    def snapshot(self):
+        """Raw counters at one instant"""
+        children = process_tree()
+        roots = set(self.cgi_roots()) if self.cgi_roots else set(children.get(self.pid, ()))
+        cgi = {}
+        for pid in descendants(roots, children) - {self.pid}:
+            child = read_stat(pid)
+            if child:
+                # Own CPU plus whatever it already reaped, so a finished grandchild moves
+                # into its parent's total instead of vanishing
+                cgi[pid] = (child[1] + child[2], child[4], count_fds(pid))
+        others = {}
+        if self.cgi_roots:
+            for pid in set(children.get(self.pid, ())) - set(cgi) - set(self._seen):
+                child = read_stat(pid)
+                if child:
+                    others[pid] = child[1] + child[2]
+        # Read after the children, so a script reaped mid-scan lands in cutime of this snapshot
+        stat = read_stat(self.pid)
+        if stat is None:
+            return None
+        return {
+            "t": time.time(),
+            "cpu": stat[1] - self._excluded_cpu(),
+            "reaped_cpu": stat[2],
+            "threads": stat[3],
+            "rss_kb": stat[4],
+            "fds": count_fds(self.pid),
+            "cgi": cgi,
+            "others": others,
+            "last_pid": read_last_pid(),
+        }
+
+    def sample(self):
+        """Take one sample; returns it, or None for the first call (which only sets the baseline)"""
+        now = self.snapshot()
+        previous, self._previous = self._previous, now
+        if now is None or previous is None:
+            return None
+        elapsed = now["t"] - previous["t"]
+
+        live_cpu = sum(cpu - self._seen.get(pid, 0.0) for pid, (cpu, _, _) in now["cgi"].items())
+        vanished = sum(cpu for pid, cpu in self._seen.items() if pid not in now["cgi"])
+        self._seen = {pid: cpu for pid, (cpu, _, _) in now["cgi"].items()}
+        vanished += sum(cpu for pid, cpu in self._others.items() if pid not in now["others"])
+        self._others = now["others"]
+        # A process reaped between two reads can come out negative here and
+        # over-counted in the next interval; carrying the deficit keeps totals exact
+        cgi_cpu = live_cpu + now["reaped_cpu"] - previous["reaped_cpu"] - vanished + self._carry
+        self._carry = min(cgi_cpu, 0.0)
+        cgi_cpu = max(cgi_cpu, 0.0)
+        server_cpu = max(now["cpu"] - previous["cpu"], 0.0)
+        forks = now["last_pid"] - previous["last_pid"] \
+            if now["last_pid"] is not None and previous["last_pid"] is not None else None
+
+        record = {
+            "t": round(now["t"], 4),
+            "interval_s": round(elapsed, 4),
+            "server_cpu_pct": round(server_cpu / elapsed * 100, 1),
+            "server_rss_kb": now["rss_kb"],
+            "server_fds": now["fds"],
+            "server_threads": now["threads"],
+            "cgi_processes": len(now["cgi"]),
+            "cgi_cpu_pct": round(cgi_cpu / elapsed * 100, 1),
+            "cgi_rss_kb": sum(rss for _, rss, _ in now["cgi"].values()),
+            "cgi_fds": sum(fds for _, _, fds in now["cgi"].values()),
+            # System-wide PID counter: every fork on the host, CGI subshells included
+            "forks": forks if forks is None or forks >= 0 else None,
+        }
+        record["total_cpu_pct"] = round(record["server_cpu_pct"] + record["cgi_cpu_pct"], 1)
+        self.samples.append(record)
+        return record
+
+    def _run(self):
+        self.exclude_threads.add(threading.get_native_id())
+        self.sample()
+        next_at = time.monotonic()
+        while True:
+            next_at += self.interval
+            if self._stop.wait(max(next_at - time.monotonic(), 0)):
+                break
+            self.sample()
+        self.sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="server-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.samples
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def server_window(samples, start, end):
+    """Samples whose interval overlaps [start, end] (wall-clock seconds)"""
+    return [s for s in samples if s["t"] - s["interval_s"] <= end and s["t"] >= start]
+
+
+def peak(samples):
+    """Per-metric maximum over a window of samples"""
+    if not samples:
+        return None
+    keys = ("total_cpu_pct", "server_cpu_pct", "cgi_cpu_pct", "cgi_processes", "cgi_rss_kb", "server_rss_kb",
+            "server_fds", "cgi_fds", "forks")
+    return {key: max((s[key] for s in samples if s[key] is not None), default=None) for key in keys}
+
+
+def line_up(server_samples, client_samples, spike_percentile=SPIKE_PERCENTILE):
+    """Attach the server's state to every client request and pick out latency spikes
+
+    client_samples are dicts with "t" (wall-clock start), "latency_ms" and
+    optionally "action", as produced by cgi_benchmark's on_sample.
+    """
+    timeline = []
+    for sample in client_samples:
+        if sample.get("latency_ms") is None:
+            continue
+        end = sample["t"] + sample["latency_ms"] / 1000
+        timeline.append(dict(sample, server=peak(server_window(server_samples, sample["t"], end))))
+
+    baseline = {key: statistics.median(s[key] for s in server_samples)
+                for key in ("total_cpu_pct", "cgi_processes", "cgi_rss_kb", "server_fds")} if server_samples else {}
+
+    spikes = []
+    by_action = {}
+    for entry in timeline:
+        by_action.setdefault(entry.get("action") or "request", []).append(entry)
+    for action, entries in by_action.items():
+        latencies = sorted(e["latency_ms"] for e in entries)
+        threshold = latencies[min(len(latencies) - 1, int(len(latencies) * spike_percentile / 100))]
+        median = statistics.median(latencies)
+        for entry in entries:
+            if entry["latency_ms"] >= threshold and entry["latency_ms"] > median * 1.5:
+                spikes.append(dict(entry, action=action, median_ms=round(median, 2)))
+    spikes.sort(key=lambda e: -e["latency_ms"])
+
+    # Does client latency move with server CPU? One point per server sample
+    pairs = []
+    for sample in server_samples:
+        inside = [e["latency_ms"] for e in timeline if sample["t"] - sample["interval_s"] <= e["t"] < sample["t"]]
+        if inside:
+            pairs.append((statistics.mean(inside), sample["total_cpu_pct"]))
+    correlation = None
+    if len(pairs) >= 3:
+        try:
+            correlation = round(statistics.correlation([p[0] for p in pairs], [p[1] for p in pairs]), 2)
+        except statistics.StatisticsError:
+            pass
+
+    return {
+        "server_samples": len(server_samples),
+        "client_samples": len(timeline),
+        "baseline": baseline,
+        "latency_cpu_correlation": correlation,
+        "spikes": spikes,
+        "timeline": timeline,
+    }
+
+
+def print_server_summary(samples, indent=""):
+    """Peak and median resource use over a run"""
+    if not samples:
+        print(f"{indent}⚠️ No server samples taken")
+        return
+    for key, label, unit in (("total_cpu_pct", "CPU (server + CGI)", "%"), ("cgi_processes", "CGI processes", ""),
+                             ("cgi_rss_kb", "CGI RSS", " KB"), ("server_rss_kb", "Server RSS", " KB"),
+                             ("server_fds", "Server fds", ""), ("server_threads", "Server threads", "")):
+        values = [s[key] for s in samples]
+        print(f"{indent}{label:<20} median {statistics.median(values):>9,.1f}{unit}   peak {max(values):>9,.1f}{unit}")
+
+
+def print_alignment(report, indent="", limit=10):
+    """Latency spikes next to what the server was doing at the time"""
+    correlation = report["latency_cpu_correlation"]
+    if correlation is not None:
+        print(f"{indent}🔗 Latency vs server CPU correlation: {correlation:+.2f} "
+              f"over {report['client_samples']} requests")
+    if not report["spikes"]:
+        print(f"{indent}✅ No latency spikes above p{SPIKE_PERCENTILE}")
+        return
+    baseline = report["baseline"]
+    print(f"{indent}⚡ Latency spikes (p{SPIKE_PERCENTILE}+) and the server at that moment "
+          f"(median CPU {baseline.get('total_cpu_pct', 0):.0f}%, {baseline.get('cgi_processes', 0):.0f} CGI processes):")
+    for spike in report["spikes"][:limit]:
+        server = spike["server"]
+        at = time.strftime("%H:%M:%S", time.localtime(spike["t"])) + f".{int(spike['t'] * 1000) % 1000:03d}"
+        line = f"{indent}   {at} {spike['action']:<18} {spike['latency_ms']:>8,.1f} ms (median {spike['median_ms']:,.1f})"
+        if server:
+            line += (f" | CPU {server['total_cpu_pct']:.0f}% (CGI {server['cgi_cpu_pct']:.0f}%), "
+                     f"{server['cgi_processes']} CGI procs, {server['cgi_rss_kb']:,} KB CGI RSS, "
+                     f"{server['server_fds']} fds")
+            if server["forks"] is not None:
+                line += f", {server['forks']} forks"
+        else:
+            line += " | no server sample in window"
+        print(line)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Sample a web server process and its CGI children from /proc")
+    parser.add_argument("--pid", type=int, required=True, help="Server process (uhttpd, router_emulator.py, ...)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between samples")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: until Ctrl+C)")
+    parser.add_argument("--output", help="Write the samples as JSON")
+    args = parser.parse_args()
+
+    if read_stat(args.pid) is None:
+        print(f"❌ No process {args.pid} in /proc")
+        return 1
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"📈 Sampling pid {args.pid} every {args.interval} s")
+    sampler = ServerSampler(args.pid, interval=args.interval, exclude_threads=()).start()
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    samples = sampler.stop()
+
+    print_server_summary(samples, "   ")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"pid": args.pid, "interval_s": args.interval, "samples": samples}, f, indent=2)
+        print(f"📄 Samples written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Network Monitor SQL Query-Plan Auditor
+Extracts the SQL issued by the daemon, CGI scripts and Python tools, runs
+EXPLAIN QUERY PLAN on a populated database, flags scans, temp B-trees and
+missing indexes, and times every statement at several data sizes
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (path relative to the repository, language)
+DEFAULT_SOURCES = [
+    ("src/db_manager.c", "c"),
+    ("src/advanced_netmon.c", "c"),
+    ("files/www/cgi-bin/advanced-api.sh", "sh"),
+    ("files/www/cgi-bin/advanced-report.sh", "sh"),
+    ("files/www/cgi-bin/netmon-api.lua", "lua"),
+    ("files/www/cgi-bin/netmon-report.lua", "lua"),
+    ("netmon_daemon.py", "py"),
+    ("netmon_rollup.py", "py"),
+    ("netmon_retention.py", "py"),
+]
+
+STRING_LITERAL = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+# Only whitespace (C, Python) or a Lua ".." / Python "+" between pieces of one statement
+CONTINUATION = re.compile(r'^(?:\s|\.\.|\+)*$')
+SHELL_SQLITE = re.compile(r'sqlite3\s+"\$\w+"\s+"((?:[^"\\]|\\.)*)"')
+SQL_START = re.compile(r"^\s*(?:SELECT\s.*\bFROM\b|INSERT\s.*\bINTO\s|UPDATE\s+\w+\s+SET\s|DELETE\s+FROM\s|WITH\s)",
+                       re.IGNORECASE | re.DOTALL)
+TRIPLE_QUOTED = re.compile(r'"""(?:.|\n)*?"""')
+LUA_CONSTANT = re.compile(r'^local\s+([A-Z][A-Z0-9_]*)\s*=\s*"((?:[^"\\\n]|\\.)*)"\s*$', re.MULTILINE)
+INSERT_COLUMNS = re.compile(r"INSERT\s+(?:OR\s+\w+\s+)?INTO\s+\w+\s*\(([^)]*)\)\s*VALUES\s*\(([^)]*)\)", re.IGNORECASE)
+COMPARED_COLUMN = re.compile(r"(\w+)\s*(?:=|==|!=|<>|<=|>=|<|>|LIKE|IN\s*\(|BETWEEN)\s*$", re.IGNORECASE)
+WHERE_COLUMN = re.compile(r"\b(\w+)\s*(?:=|==|<=|>=|<|>|\bIN\b|\bBETWEEN\b|\bIS\b|\bLIKE\b)", re.IGNORECASE)
+LOOKUP_COLUMNS = ("ip", "device_ip")
+# SQLite's own tables (sqlite_master/sqlite_schema, sqlite_sequence, sqlite_stat1, ...) and
+# pragma table functions: scanning them is normal and they cannot be indexed
+CATALOG_TABLE = re.compile(r"^(?:sqlite_|pragma_)\w*$", re.IGNORECASE)
+CATALOG_FROM = re.compile(r"\b(?:FROM|JOIN)\s+(?:sqlite_|pragma_)\w*", re.IGNORECASE)
+
+
+def extract_literals(text):
+    """Yield (line, joined_text) for runs of adjacent string literals"""
+    run, run_line, last_end = [], None, None
+    for match in STRING_LITERAL.finditer(text):
+        if run and CONTINUATION.match(text[last_end:match.start()]):
+            run.append(match.group(1))
+        else:
+            if run:
+                yield run_line, "".join(run)
+            run = [match.group(1)]
+            run_line = text.count("\n", 0, match.start()) + 1
+        last_end = match.end()
+    if run:
+        yield run_line, "".join(run)
+
+
+def normalize(sql, language):
+    """Turn the language's interpolation into ? placeholders; None for dynamic SQL"""
+    sql = sql.replace('\\"', '"').replace("\\n", " ")
+    if language == "lua":
+        sql = sql.replace("%%", "\0")
+        sql = re.sub(r"'%[sd]'|%[sd]", "?", sql)
+        sql = sql.replace("\0", "%")
+    elif language == "sh":
+        if re.search(r"\w\$\{?\w|\bFROM\s+\(\s*\$", sql):
+            return None  # table name or subquery spliced in from a variable
+        sql = re.sub(r"'\$\{?\w+\}?'|\$\([^)]*\)|\$\{?\w+\}?", "?", sql)
+    elif language == "py" and re.search(r"\{\w+\}", sql):
+        return None  # f-string with an identifier spliced in
+    return " ".join(sql.split()).rstrip(";")
+
+
+def extract_statements(sources=DEFAULT_SOURCES, root=REPO_ROOT):
+    """Every DML statement in the given source files"""
+    statements = []
+    for relative, language in sources:
+        path = os.path.join(root, relative)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            continue
+        if language == "py":
+            # Docstrings are prose, not SQL; keep the newlines so line numbers hold
+            text = TRIPLE_QUOTED.sub(lambda m: "\n" * m.group(0).count("\n"), text)
+        if language == "lua":
+            # Inline string constants spliced in with "..", e.g. a shared WHERE clause
+            for name, value in LUA_CONSTANT.findall(text):
+                text = re.sub(rf'\.\.\s*{name}\b(\s*\.\.)?',
+                              lambda m, v=value: f'.. "{v}"' + (" .." if m.group(1) else ""), text)
+        if language == "sh":
+            found = ((text.count("\n", 0, m.start()) + 1, m.group(1)) for m in SHELL_SQLITE.finditer(text))
+        else:
+            found = extract_literals(text)
+        for line, raw in found:
+            if not SQL_START.match(raw):
+                continue
+            sql = normalize(raw, language)
+            statements.append({
+                "id": f"{relative}:{line}",
+                "language": language,
+                "sql": sql,
+                "dynamic": sql is None,
+                "raw": raw,
+            })
+    return statements
+
+
+class SampleValues:
+    """Realistic bind values taken from the database itself"""
+
+    def __init__(self, db):
+        def scalar(sql, default):
+            try:
+                value = db.execute(sql).fetchone()[0]
+            except sqlite3.Error:
+                return default
+            return default if value is None else value
+
+        self.ip = scalar("SELECT ip FROM devices ORDER BY id LIMIT 1", "192.168.1.2")
+        self.timestamp = scalar("SELECT MAX(timestamp) FROM traffic", int(time.time()))
+        # Incremental readers ask for rows past a high-water mark, i.e. the newest few
+        self.last_id = scalar("SELECT MAX(id) FROM traffic", 0)
+        self.end_date = time.strftime("%Y-%m-%d", time.gmtime(self.timestamp))
+        self.start_date = time.strftime("%Y-%m-%d", time.gmtime(self.timestamp - 7 * 86400))
+
+    def for_column(self, column):
+        column = (column or "").lower()
+        if column in LOOKUP_COLUMNS:
+            return self.ip
+        if column in ("timestamp", "last_seen", "first_seen", "bucket"):
+            return self.timestamp
+        if column in ("id", "last_id"):
+            return self.last_id
+        return 0
+
+    def bind(self, sql):
+        """One value per ? based on the column it is compared with or inserted into"""
+        insert = INSERT_COLUMNS.search(sql)
+        insert_columns = {}
+        if insert:
+            columns = [c.strip() for c in insert.group(1).split(",")]
+            values = [v.strip() for v in insert.group(2).split(",")]
+            offset = sql[:insert.start(2)].count("?")
+            position = 0
+            for column, value in zip(columns, values):
+                if value == "?":
+                    insert_columns[offset + position] = column
+                    position += 1
+
+        params, dates = [], 0
+        for index, match in enumerate(re.finditer(r"\?", sql)):
+            before = sql[:match.start()]
+            if before.rstrip().lower().endswith(("strftime('%s',", "strftime('%s' ,")):
+                params.append(self.start_date if dates % 2 == 0 else self.end_date)
+                dates += 1
+            elif before.rstrip().upper().endswith(("LIMIT", "OFFSET")):
+                params.append(100 if before.rstrip().upper().endswith("LIMIT") else 0)
+            elif index in insert_columns:
+                params.append(self.for_column(insert_columns[index]))
+            else:
+                compared = COMPARED_COLUMN.search(before)
+                if not compared:
+                    # "SET a = ?, b = ?" and the like
+                    compared = re.search(r"(\w+)\s*=\s*$", before)
+                params.append(self.for_column(compared.group(1) if compared else None))
+        return params
+
+
+def table_indexes(db):
+    """{table: [[indexed columns...] per index]}, including implicit UNIQUE indexes"""
+    indexes = {}
+    tables = [row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                           "AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        indexes[table] = []
+        for index in db.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = [row[2] for row in db.execute(f"PRAGMA index_info({index[1]})")]
+            indexes[table].append(columns)
+    return indexes
+
+
+def table_columns(db, table):
+    return {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+
+
+def is_leading_indexed(indexes, table, column):
+    return any(cols and cols[0] == column for cols in indexes.get(table, []))
+
+
+def explain(db, sql, params):
+    """EXPLAIN QUERY PLAN detail lines"""
+    return [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def analyze_plan(db, statement, plan, indexes):
+    """Findings for one statement: full_scan, temp_btree and missing_index"""
+    findings = []
+    sql = statement["sql"]
+    if CATALOG_FROM.search(sql):
+        # Schema checks such as "SELECT name FROM sqlite_master WHERE type = 'table'"
+        return findings
+    where = re.split(r"\bWHERE\b", sql, maxsplit=1, flags=re.IGNORECASE)
+    where_text = re.split(r"\b(?:ORDER|GROUP|LIMIT)\b", where[1], flags=re.IGNORECASE)[0] if len(where) > 1 else ""
+    order = re.search(r"\bORDER\s+BY\s+(\w+)", sql, re.IGNORECASE)
+
+    for detail in plan:
+        scan = re.match(r"SCAN (?:TABLE )?(\w+)(.*)", detail)
+        if scan and "INDEX" not in scan.group(2) and not CATALOG_TABLE.match(scan.group(1)):
+            table = scan.group(1)
+            findings.append({"kind": "full_scan", "table": table, "detail": detail})
+            columns = table_columns(db, table)
+            for column in dict.fromkeys(WHERE_COLUMN.findall(where_text)):
+                if column in columns and not is_leading_indexed(indexes, table, column):
+                    findings.append({"kind": "missing_index", "table": table, "column": column,
+                                     "suggestion": f"CREATE INDEX idx_{table}_{column} ON {table}({column})"})
+        if "TEMP B-TREE" in detail:
+            finding = {"kind": "temp_btree", "detail": detail}
+            if order and "ORDER BY" in detail:
+                table = re.search(r"\bFROM\s+(\w+)", sql, re.IGNORECASE)
+                if table and order.group(1) in table_columns(db, table.group(1)):
+                    finding["suggestion"] = (f"CREATE INDEX idx_{table.group(1)}_{order.group(1)} "
+                                             f"ON {table.group(1)}({order.group(1)})")
+            findings.append(finding)
+    return findings
+
+
+def schema_findings(db, indexes):
+    """Device lookup columns with no index on their table"""
+    findings = []
+    for table in indexes:
+        for column in LOOKUP_COLUMNS:
+            if column in table_columns(db, table) and not is_leading_indexed(indexes, table, column):
+                rows = db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                findings.append({"kind": "missing_index", "table": table, "column": column, "rows": rows,
+                                 "suggestion": f"CREATE INDEX idx_{table}_{column} ON {table}({column})"})
+    return findings
+
+
+def time_statement(db, sql, params, repeat=3):
+    """Median wall time in ms; writes run inside a savepoint that is rolled back"""
+    is_read = sql.lstrip().upper().startswith(("SELECT", "WITH"))
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if is_read:
+            db.execute(sql, params).fetchall()
+        else:
+            db.execute("SAVEPOINT audit")
+            db.execute(sql, params)
+        times.append((time.perf_counter() - started) * 1000)
+        if not is_read:
+            db.execute("ROLLBACK TO audit")
+            db.execute("RELEASE audit")
+    return round(statistics.median(times), 3)
+
+
+def audit_database(db_path, statements, repeat=3, with_plans=True):
+    """Plan and time every statement against one database"""
+    db = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        values = SampleValues(db)
+        indexes = table_indexes(db)
+        results = {}
+        for statement in statements:
+            if statement["dynamic"]:
+                continue
+            params = values.bind(statement["sql"])
+            entry = {}
+            try:
+                if with_plans:
+                    entry["plan"] = explain(db, statement["sql"], params)
+                    entry["findings"] = analyze_plan(db, statement, entry["plan"], indexes)
+                entry["ms"] = time_statement(db, statement["sql"], params, repeat)
+            except sqlite3.Error as e:
+                entry["error"] = str(e)
+            results[statement["id"]] = entry
+        return results, (schema_findings(db, indexes) if with_plans else [])
+    finally:
+        db.close()
+
+
+def build_size_databases(sizes, workdir, seed=1):
+    """One generated database per traffic row count"""
+    from generate_netmon_db import generate
+    from netmon_rollup import run_rollup
+    paths = {}
+    for size in sizes:
+        path = os.path.join(workdir, f"netmon-{size}.db")
+        print(f"🏗️ Generating {size:,} traffic rows...")
+        generate(path, devices=500, days=30, traffic=size, visits=max(size // 5, 1),
+                 speed_interval=3600, seed=seed, end=1_700_000_000 // 86400 * 86400, verbose=False)
+        run_rollup(path)  # the report reads whole days from traffic_daily
+        paths[size] = path
+    return paths
+
+
+def growth_label(times, sizes):
+    """Compare how time grows with how data grows between the smallest and largest size"""
+    low, high = times.get(sizes[0]), times.get(sizes[-1])
+    if low is None or high is None or len(sizes) < 2:
+        return "-"
+    data_ratio = sizes[-1] / sizes[0]
+    time_ratio = high / max(low, 0.001)
+    if time_ratio >= data_ratio * 0.5:
+        return f"x{time_ratio:.0f} (linear)"
+    if time_ratio >= 3:
+        return f"x{time_ratio:.0f} (sublinear)"
+    return f"x{time_ratio:.1f} (flat)"
+
+
+def print_report(statements, plans, timings, sizes, schema):
+    """Print plans and findings per statement, then the timing table"""
+    icons = {"full_scan": "❌", "temp_btree": "⚠️", "missing_index": "💡"}
+    for statement in statements:
+        print(f"\n📍 {statement['id']} [{statement['language']}]")
+        if statement["dynamic"]:
+            print(f"   ⏭️ Dynamic SQL, skipped: {statement['raw'][:100]}")
+            continue
+        print(f"   {statement['sql'][:160]}")
+        entry = plans.get(statement["id"], {})
+        if "error" in entry:
+            print(f"   ❌ {entry['error']}")
+            continue
+        for detail in entry.get("plan", []):
+            print(f"   │ {detail}")
+        for finding in entry.get("findings", []):
+            text = finding.get("detail") or f"{finding['table']}.{finding['column']} is not indexed"
+            print(f"   {icons[finding['kind']]} {finding['kind']}: {text}")
+            if finding.get("suggestion"):
+                print(f"      → {finding['suggestion']};")
+
+    if schema:
+        print("\n🗂️ Schema:")
+        for finding in schema:
+            print(f"   💡 {finding['table']}.{finding['column']} has no index ({finding['rows']:,} rows)"
+                  f" → {finding['suggestion']};")
+
+    if timings:
+        print("\n⏱️ Median time per statement (ms) by traffic rows:")
+        header = f"   {'statement':<44}" + "".join(f"{size:>12,}" for size in sizes) + f"  {'growth':<18}"
+        print(header)
+        print("   " + "-" * (len(header) - 3))
+        for statement in statements:
+            if statement["dynamic"]:
+                continue
+            times = {size: timings[size].get(statement["id"], {}).get("ms") for size in sizes}
+            cells = "".join(f"{times[s]:>12.2f}" if times[s] is not None else f"{'err':>12}" for s in sizes)
+            print(f"   {statement['id'][-44:]:<44}{cells}  {growth_label(times, sizes):<18}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Audit the query plans of every SQL statement in the project")
+    parser.add_argument("--db", help="Audit plans (and time) against this database instead of generated ones")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="Traffic row counts for generated databases (plans come from the largest)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per statement (median is reported)")
+    parser.add_argument("--workdir", help="Keep generated databases here (default: temporary directory)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the audit as JSON")
+    parser.add_argument("--fail-on-scan", action="store_true",
+                        help="Exit with status 1 when any statement does a full scan or temp B-tree")
+    args = parser.parse_args()
+
+    statements = extract_statements()
+    print(f"🔎 Found {len(statements)} SQL statements in {len(DEFAULT_SOURCES)} source files")
+
+    if args.db:
+        sizes = ["db"]
+        databases = {"db": args.db}
+    else:
+        sizes = sorted(int(v) for v in args.sizes.split(",") if v.strip())
+        workdir = args.workdir or tempfile.mkdtemp(prefix="netmon-audit-")
+        databases = build_size_databases(sizes, workdir)
+
+    timings, schema = {}, []
+    for size in sizes:
+        timings[size], found = audit_database(databases[size], statements, args.repeat,
+                                              with_plans=size == sizes[-1])
+        schema = found or schema
+    plans = timings[sizes[-1]]
+
+    print_report(statements, plans, timings if args.db is None else {}, sizes, schema)
+    if args.db:
+        print("\n⏱️ Median time per statement (ms):")
+        for statement in statements:
+            entry = plans.get(statement["id"], {})
+            if "ms" in entry:
+                print(f"   {statement['id']:<44} {entry['ms']:>10.2f}")
+
+    findings = [f for entry in plans.values() for f in entry.get("findings", [])]
+    counts = {kind: sum(1 for f in findings if f["kind"] == kind)
+              for kind in ("full_scan", "temp_btree", "missing_index")}
+    print(f"\n📊 {counts['full_scan']} full scans, {counts['temp_btree']} temp B-trees, "
+          f"{counts['missing_index'] + len(schema)} missing indexes")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"statements": statements, "plans": plans, "schema": schema,
+                       "timings": {str(size): timings[size] for size in sizes}}, f, indent=2)
+        print(f"📄 Audit written to {args.json}")
+
+    if args.fail_on_scan and (counts["full_scan"] or counts["temp_btree"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Network Monitor SQLite Write Benchmark
+Replays the capture daemon's per-packet writes (add_traffic_record and
+update_device_stats) against a local database and measures how many packets
+per second each commit strategy, journal mode and synchronous level absorbs
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from netmon_schema import create_schema
+
+TRAFFIC_SQL = ("INSERT INTO traffic (ip, url, timestamp, bytes_sent, bytes_received) "
+               "VALUES (?, ?, ?, ?, ?)")
+DEVICE_SQL = ("INSERT OR REPLACE INTO advanced_devices "
+              "(ip, mac, hostname, bytes_in, bytes_out, packets_in, packets_out, "
+              "speed_in_mbps, speed_out_mbps, last_seen, is_active) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+SPEED_SQL = ("INSERT INTO speed_history (device_ip, timestamp, speed_in_mbps, speed_out_mbps, bytes_in, bytes_out) "
+             "VALUES (?, ?, ?, ?, ?, ?)")
+ROWS_PER_PACKET = 3  # traffic + advanced_devices + speed_history
+
+# How the writes are issued; "current" is what the C daemon does today:
+# add_traffic_record prepares and finalizes per packet on the long-lived
+# handle, update_device_stats opens the database once per statement
+STRATEGIES = {
+    "current": {"reopen": True, "cache": False, "batch": 1},
+    "persistent": {"reopen": False, "cache": False, "batch": 1},
+    "reused": {"reopen": False, "cache": True, "batch": 1},
+    "batch-100": {"reopen": False, "cache": True, "batch": 100},
+    "batch-1000": {"reopen": False, "cache": True, "batch": 1000},
+}
+JOURNAL_MODES = ("delete", "wal")
+SYNC_LEVELS = ("full", "normal", "off")
+BASELINE = ("current", "delete", "full")  # sqlite3_open defaults
+
+
+def device_flushes(path):
+    """Completed flush requests on the block device holding path (Linux 5.5+), else None
+
+    Every fsync/fdatasync that reaches storage shows up here, so the delta
+    over a run is the number of syncs the strategy cost.
+    """
+    st = os.stat(path)
+    try:
+        with open(f"/sys/dev/block/{os.major(st.st_dev)}:{os.minor(st.st_dev)}/stat") as f:
+            fields = f.read().split()
+    except OSError:
+        return None
+    return int(fields[15]) if len(fields) > 15 else None
+
+
+def make_packets(devices, seed=1):
+    """Endless, seeded stream of (ip, url, bytes_sent, bytes_received)"""
+    rng = random.Random(seed)
+    ips = [f"192.168.1.{2 + i % 250}" for i in range(devices)]
+    urls = [f"site{i}.example.com" for i in range(40)] + [None] * 10
+    while True:
+        yield rng.choice(ips), rng.choice(urls), rng.randint(40, 1500), rng.randint(40, 1500)
+
+
+class PacketWriter:
+    """Issues one packet's worth of writes the way a strategy prescribes"""
+
+    def __init__(self, path, strategy, journal, sync):
+        self.path = path
+        self.strategy = STRATEGIES[strategy]
+        self.sync = sync
+        self.devices = {}
+        self.pending = 0
+        self.db = self.connect()
+        self.db.execute(f"PRAGMA journal_mode = {journal}")
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                             cached_statements=128 if self.strategy["cache"] else 0)
+        db.execute(f"PRAGMA synchronous = {self.sync}")
+        return db
+
+    def write(self, ip, url, sent, received, now):
+        device = self.devices.setdefault(ip, [0, 0, 0])
+        device[0] += received
+        device[1] += sent
+        device[2] += 1
+        device_row = (ip, "00:00:00:00:00:00", f"Device-{ip.rsplit('.', 1)[-1]}", device[0], device[1],
+                      device[2], device[2], received * 8 / 1e6, sent * 8 / 1e6, now, 1)
+        speed_row = (ip, now, received * 8 / 1e6, sent * 8 / 1e6, received, sent)
+
+        batched = self.strategy["batch"] > 1 and not self.strategy["reopen"]
+        if batched and not self.pending:
+            # Before the packet's first insert, so all three land in the batch's transaction
+            self.db.execute("BEGIN")
+        self.db.execute(TRAFFIC_SQL, (ip, url, now, sent, received))
+        if self.strategy["reopen"]:
+            for sql, row in ((DEVICE_SQL, device_row), (SPEED_SQL, speed_row)):
+                db = self.connect()
+                db.execute(sql, row)
+                db.close()
+            return
+
+        self.db.execute(DEVICE_SQL, device_row)
+        self.db.execute(SPEED_SQL, speed_row)
+        self.pending += 1
+        if batched and self.pending >= self.strategy["batch"]:
+            self.flush()
+
+    def flush(self):
+        if self.db.in_transaction:
+            self.db.execute("COMMIT")
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+def run_case(workdir, strategy, journal, sync, seconds, max_packets, devices, seed=1):
+    """Write packets for `seconds` (or max_packets) into a fresh database"""
+    path = os.path.join(workdir, f"bench-{strategy}-{journal}-{sync}.db")
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = sqlite3.connect(path)
+    create_schema(db)
+    db.close()
+
+    writer = PacketWriter(path, strategy, journal, sync)
+    packets = make_packets(devices, seed)
+    flushes_before = device_flushes(workdir)
+    started = time.perf_counter()
+    count = 0
+    now = int(time.time())
+    while count < max_packets:
+        ip, url, sent, received = next(packets)
+        writer.write(ip, url, sent, received, now)
+        count += 1
+        if count % 50 == 0 and time.perf_counter() - started >= seconds:
+            break
+    writer.close()
+    elapsed = time.perf_counter() - started
+    flushes_after = device_flushes(workdir)
+
+    flushes = flushes_after - flushes_before if flushes_before is not None and flushes_after is not None else None
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return {
+        "strategy": strategy,
+        "journal": journal,
+        "sync": sync,
+        "packets": count,
+        "seconds": round(elapsed, 3),
+        "packets_per_s": round(count / elapsed, 1),
+        "rows_per_s": round(count * ROWS_PER_PACKET / elapsed, 1),
+        "fsyncs": flushes,
+        "fsyncs_per_s": round(flushes / elapsed, 1) if flushes is not None else None,
+        "fsyncs_per_packet": round(flushes / count, 3) if flushes is not None and count else None,
+    }
+
+
+def print_results(results):
+    baseline = next((r for r in results if (r["strategy"], r["journal"], r["sync"]) == BASELINE), None)
+    print(f"\n   {'strategy':<12} {'journal':<8} {'sync':<7} {'packets/s':>10} {'rows/s':>10} "
+          f"{'fsyncs/s':>9} {'fsync/pkt':>9} {'vs current':>10}")
+    for r in results:
+        speedup = f"x{r['packets_per_s'] / baseline['packets_per_s']:.1f}" if baseline else "-"
+        fsyncs = f"{r['fsyncs_per_s']:,.0f}" if r["fsyncs_per_s"] is not None else "n/a"
+        per_packet = f"{r['fsyncs_per_packet']:.3f}" if r["fsyncs_per_packet"] is not None else "n/a"
+        print(f"   {r['strategy']:<12} {r['journal']:<8} {r['sync']:<7} {r['packets_per_s']:>10,.0f} "
+              f"{r['rows_per_s']:>10,.0f} {fsyncs:>9} {per_packet:>9} {speedup:>10}")
+
+    best = max(results, key=lambda r: r["packets_per_s"])
+    durable = [r for r in results if r["sync"] != "off"]
+    print()
+    if baseline:
+        print(f"📉 Current write path absorbs {baseline['packets_per_s']:,.0f} packets/s")
+    if durable:
+        safe = max(durable, key=lambda r: r["packets_per_s"])
+        print(f"🛡️ Best crash-safe setting: {safe['strategy']} / {safe['journal']} / synchronous={safe['sync']} "
+              f"at {safe['packets_per_s']:,.0f} packets/s")
+    print(f"🚀 Fastest overall: {best['strategy']} / {best['journal']} / synchronous={best['sync']} "
+          f"at {best['packets_per_s']:,.0f} packets/s")
+
+
+def parse_list(value, allowed):
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [v for v in items if v not in allowed]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown value(s) {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return items
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the capture daemon's SQLite write patterns")
+    parser.add_argument("--dir", help="Directory for the bench databases; use the storage netmon.db lives on "
+                                      "(default: a temporary directory under the current one)")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        type=lambda v: parse_list(v, STRATEGIES), help="Comma-separated strategies")
+    parser.add_argument("--journals", default=",".join(JOURNAL_MODES),
+                        type=lambda v: parse_list(v, JOURNAL_MODES), help="Comma-separated journal modes")
+    parser.add_argument("--sync", default=",".join(SYNC_LEVELS),
+                        type=lambda v: parse_list(v, SYNC_LEVELS), help="Comma-separated synchronous levels")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Run time per case")
+    parser.add_argument("--max-packets", type=int, default=1_000_000, help="Stop a case after this many packets")
+    parser.add_argument("--devices", type=int, default=50, help="Distinct device IPs in the packet stream")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    workdir = args.dir or tempfile.mkdtemp(prefix="netmon-write-bench-", dir=os.getcwd())
+    os.makedirs(workdir, exist_ok=True)
+    if device_flushes(workdir) is None:
+        print("⚠️ No block-device flush counter for this directory; fsync columns will read n/a")
+
+    cases = [(s, j, y) for s in args.strategies for j in args.journals for y in args.sync]
+    print(f"🧪 {len(cases)} cases x {args.seconds} s in {workdir}")
+    results = []
+    for strategy, journal, sync in cases:
+        result = run_case(workdir, strategy, journal, sync, args.seconds, args.max_packets, args.devices, args.seed)
+        print(f"   ✅ {strategy} / {journal} / {sync}: {result['packets_per_s']:,.0f} packets/s")
+        results.append(result)
+
+    print_results(results)
+    if not args.dir:
+        os.rmdir(workdir)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
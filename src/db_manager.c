@@ -10,6 +10,9 @@ int init_database(void) {
         return -1;
     }
     
+    // Let the retention job hand freed pages back to flash (new databases only)
+    sqlite3_exec(db, "PRAGMA auto_vacuum = INCREMENTAL;", 0, 0, 0);
+    
     // Create devices table
     const char *create_devices_sql = 
         "CREATE TABLE IF NOT EXISTS devices ("
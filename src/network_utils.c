@@ -200,20 +200,83 @@ int get_connected_devices(device_t **devices, int *count) {
     return 0;
 }
 
+// Hostname cache: each IP is looked up at most once per TTL, failures included
+#define HOSTNAME_CACHE_SIZE 256
+#define HOSTNAME_TTL 3600
+#define HOSTNAME_NEGATIVE_TTL 300
+#define HOSTS_CACHE_FILE "/tmp/netmon-hosts"
+
+typedef struct {
+    char ip[MAX_IP_LEN];
+    char hostname[MAX_HOSTNAME_LEN];  // empty = no PTR record
+    time_t expires;
+    time_t last_used;
+} hostname_entry_t;
+
+static hostname_entry_t hostname_cache[HOSTNAME_CACHE_SIZE];
+
+// Names already resolved by the API daemon ("*" marks a known miss)
+static int lookup_hosts_file(const char *ip, char *hostname) {
+    FILE *f = fopen(HOSTS_CACHE_FILE, "r");
+    char line[MAX_IP_LEN + MAX_HOSTNAME_LEN + 4];
+    char file_ip[MAX_IP_LEN], name[MAX_HOSTNAME_LEN];
+    int found = 0;
+    
+    if (!f) return 0;
+    
+    while (fgets(line, sizeof(line), f)) {
+        if (sscanf(line, "%15s %255s", file_ip, name) == 2 && strcmp(file_ip, ip) == 0) {
+            strcpy(hostname, strcmp(name, "*") == 0 ? "" : name);
+            found = 1;
+            break;
+        }
+    }
+    
+    fclose(f);
+    return found;
+}
+
 char* resolve_hostname(const char *ip) {
     struct sockaddr_in sa;
-    char *hostname = malloc(MAX_HOSTNAME_LEN);
-    
-    if (!hostname) return NULL;
+    hostname_entry_t *entry = NULL;
+    time_t now = time(NULL);
+    char *hostname;
     
-    sa.sin_family = AF_INET;
-    inet_pton(AF_INET, ip, &sa.sin_addr);
+    // Cached entry, or the least recently used slot to replace
+    for (int i = 0; i < HOSTNAME_CACHE_SIZE; i++) {
+        if (strcmp(hostname_cache[i].ip, ip) == 0) {
+            entry = &hostname_cache[i];
+            break;
+        }
+        if (!entry || hostname_cache[i].last_used < entry->last_used) {
+            entry = &hostname_cache[i];
+        }
+    }
     
-    if (getnameinfo((struct sockaddr*)&sa, sizeof(sa), hostname, MAX_HOSTNAME_LEN, NULL, 0, 0) != 0) {
-        free(hostname);
-        return NULL;
+    if (strcmp(entry->ip, ip) != 0 || entry->expires <= now) {
+        strncpy(entry->ip, ip, MAX_IP_LEN - 1);
+        entry->ip[MAX_IP_LEN - 1] = '\0';
+        entry->hostname[0] = '\0';
+        
+        if (!lookup_hosts_file(ip, entry->hostname)) {
+            memset(&sa, 0, sizeof(sa));
+            sa.sin_family = AF_INET;
+            inet_pton(AF_INET, ip, &sa.sin_addr);
+            
+            if (getnameinfo((struct sockaddr*)&sa, sizeof(sa), entry->hostname, MAX_HOSTNAME_LEN,
+                            NULL, 0, NI_NAMEREQD) != 0) {
+                entry->hostname[0] = '\0';
+            }
+        }
+        entry->expires = now + (entry->hostname[0] ? HOSTNAME_TTL : HOSTNAME_NEGATIVE_TTL);
     }
+    entry->last_used = now;
     
+    if (!entry->hostname[0]) return NULL;
+    
+    hostname = malloc(MAX_HOSTNAME_LEN);
+    if (!hostname) return NULL;
+    strcpy(hostname, entry->hostname);
     return hostname;
 }
 
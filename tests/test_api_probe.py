@@ -0,0 +1,109 @@
+"""ConnectionPool: retrying on a keep-alive connection the server has dropped, and malformed replies"""
+
+import asyncio
+import unittest
+
+from api_probe import ConnectionPool, ProbeError
+
+OK = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok"
+REPLIES = {
+    "bad_status": b"HTTP/1.1 abc OK\r\nContent-Length: 0\r\n\r\n",
+    "bad_length": b"HTTP/1.1 200 OK\r\nContent-Length: twelve\r\n\r\n",
+    "bad_chunk": b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n",
+}
+
+
+class ScriptedServer:
+    """Answers the first request on each connection as the next entry of `script` says:
+    "ok" replies and keeps the connection, "close" replies and then hangs up, "drop"
+    hangs up without replying, a REPLIES key sends that malformed reply and hangs up"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.connections = 0
+        self.writers = []
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.append(writer)
+        while self.script:
+            if not await reader.readuntil(b"\r\n\r\n"):
+                break
+            step = self.script.pop(0)
+            if step != "drop":
+                writer.write(REPLIES.get(step, OK))
+                await writer.drain()
+            if step != "ok":
+                break
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class ConnectionPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def run_script(self, script, requests, method="GET"):
+        server = ScriptedServer(script)
+        port = await server.start()
+        pool = ConnectionPool("127.0.0.1", port, size=1, timeout=2)
+        pool.writers = []
+        connect = pool._connect
+
+        async def tracked_connect():
+            conn = await connect()
+            pool.writers.append(conn[1])
+            return conn
+        pool._connect = tracked_connect
+        results = []
+        try:
+            for _ in range(requests):
+                try:
+                    results.append(await pool.request(method, "/", "{}" if method == "POST" else None))
+                except Exception as e:
+                    results.append(e)
+                await asyncio.sleep(0.05)
+        finally:
+            await pool.close()
+            await server.stop()
+        return server, pool, results
+
+    async def test_stale_connection_is_retried_on_a_fresh_one(self):
+        server, pool, results = await self.run_script(["close", "ok"], 2)
+        self.assertEqual(results[1]["status"], 200)
+        self.assertFalse(results[1]["connection_reused"])
+        self.assertEqual(server.connections, 2)
+
+    async def test_failed_retry_raises_probe_error_and_closes_the_connection(self):
+        server, pool, results = await self.run_script(["close", "drop"], 2)
+        self.assertIsInstance(results[1], ProbeError)
+        self.assertEqual(pool.opened, 2)
+        self.assertTrue(pool.writers[1].is_closing())
+        self.assertEqual(pool._idle, [])
+        self.assertEqual(server.connections, 2)
+
+    async def test_fresh_connection_failure_is_not_retried(self):
+        server, pool, results = await self.run_script(["drop", "ok"], 1)
+        self.assertIsInstance(results[0], ProbeError)
+        self.assertEqual(pool.opened, 1)
+
+    async def test_stale_connection_is_not_retried_for_post(self):
+        server, pool, results = await self.run_script(["close", "ok"], 2, method="POST")
+        self.assertIsInstance(results[1], ProbeError)
+        self.assertEqual(pool.opened, 1)
+
+    async def test_malformed_replies_raise_probe_error(self):
+        for reply in REPLIES:
+            with self.subTest(reply=reply):
+                server, pool, results = await self.run_script([reply], 1)
+                self.assertIsInstance(results[0], ProbeError)
+                self.assertTrue(pool.writers[0].is_closing())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Neighbour table diffs: added, removed and changed entries, first/last seen, unchanged scans"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from arp_watch import NeighbourTable, arp_text, delta_size, diff_tables, parse_arp
+
+ROWS = [
+    ("192.168.1.2", "0x2", "02:00:00:00:00:02", "br-lan"),
+    ("192.168.1.3", "0x2", "02:00:00:00:00:03", "br-lan"),
+    ("192.168.1.4", "0x0", "00:00:00:00:00:00", "br-lan"),
+]
+
+
+class DiffTest(unittest.TestCase):
+    def test_parse_keys_by_ip_and_interface(self):
+        table = parse_arp(arp_text(ROWS + [("192.168.1.2", "0x2", "02:00:00:00:00:99", "wlan0")]))
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table[("192.168.1.2", "wlan0")], ("0x1", "0x2", "02:00:00:00:00:99", "wlan0"))
+
+    def test_diff_tables(self):
+        old = parse_arp(arp_text(ROWS))
+        new = parse_arp(arp_text([ROWS[0], (ROWS[1][0], "0x2", "02:00:00:00:00:33", "br-lan"),
+                                  ("192.168.1.5", "0x2", "02:00:00:00:00:05", "br-lan")]))
+        added, changed, removed = diff_tables(old, new)
+        self.assertEqual(added, [("192.168.1.5", "br-lan")])
+        self.assertEqual(changed, [("192.168.1.3", "br-lan")])
+        self.assertEqual(removed, [("192.168.1.4", "br-lan")])
+
+
+class NeighbourTableTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="netmon-test-")
+        self.path = os.path.join(self.workdir, "arp")
+        self.table = NeighbourTable(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def write(self, rows):
+        with open(self.path, "w", encoding="ascii") as f:
+            f.write(arp_text(rows))
+
+    def test_scans_report_only_changes(self):
+        self.write(ROWS)
+        first = self.table.scan(now=100)
+        self.assertEqual(len(first["added"]), 3)
+        self.assertEqual(delta_size(self.table.scan(now=101)), 0)
+
+        self.write([ROWS[0], (ROWS[1][0], "0x2", "02:00:00:00:00:33", "br-lan")])
+        delta = self.table.scan(now=102)
+        self.assertEqual(delta["added"], [])
+        self.assertEqual([(e["ip"], e["previous"]) for e in delta["changed"]],
+                         [("192.168.1.3", {"mac": "02:00:00:00:00:03"})])
+        self.assertEqual(delta["changed"][0]["first_seen"], 100)
+        self.assertEqual([(e["ip"], e["last_seen"]) for e in delta["removed"]], [("192.168.1.4", 101)])
+
+    def test_entries_skip_incomplete_and_keep_first_seen(self):
+        self.write(ROWS)
+        self.table.scan(now=100)
+        self.write(ROWS + [("192.168.1.5", "0x2", "02:00:00:00:00:05", "br-lan")])
+        self.table.scan(now=105)
+        entries = {e["ip"]: e for e in self.table.entries()}
+        self.assertEqual(set(entries), {"192.168.1.2", "192.168.1.3", "192.168.1.5"})
+        self.assertEqual(entries["192.168.1.2"]["first_seen"], 100)
+        self.assertEqual(entries["192.168.1.5"]["first_seen"], 105)
+        self.assertEqual(entries["192.168.1.2"]["last_seen"], 105)
+        self.assertEqual(len(self.table.entries(complete_only=False)), 4)
+
+    def test_unreadable_table_keeps_the_last_snapshot(self):
+        self.write(ROWS)
+        self.table.scan(now=100)
+        os.remove(self.path)
+        self.assertEqual(delta_size(self.table.scan(now=101)), 0)
+        self.assertEqual(len(self.table.table), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
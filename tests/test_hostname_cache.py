@@ -0,0 +1,97 @@
+"""HostnameCache TTLs, LRU eviction, lease seeding and use after close()"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from hostname_cache import HostnameCache
+
+
+class CountingResolver:
+    """Resolver answering from a dict, counting calls; `gate` can hold lookups back"""
+
+    def __init__(self, names):
+        self.names = dict(names)
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, ip):
+        self.gate.wait(5)
+        self.calls.append(ip)
+        return self.names.get(ip)
+
+
+class HostnameCacheTest(unittest.TestCase):
+    def make(self, names, **kwargs):
+        resolver = CountingResolver(names)
+        cache = HostnameCache(resolver=resolver, leases_path="/nonexistent", **kwargs)
+        self.addCleanup(cache.close)
+        return cache, resolver
+
+    def test_miss_returns_default_then_resolves_in_background(self):
+        cache, resolver = self.make({"10.0.0.1": "laptop"})
+        self.assertEqual(cache.get("10.0.0.1", "Device-1"), "Device-1")
+        self.assertTrue(cache.wait(2))
+        self.assertEqual(cache.get("10.0.0.1", "Device-1"), "laptop")
+        self.assertEqual(resolver.calls, ["10.0.0.1"])
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["hits"], 1)
+
+    def test_concurrent_misses_share_one_lookup(self):
+        cache, resolver = self.make({"10.0.0.1": "laptop"})
+        resolver.gate.clear()
+        for _ in range(5):
+            cache.get("10.0.0.1")
+        resolver.gate.set()
+        self.assertTrue(cache.wait(2))
+        self.assertEqual(resolver.calls, ["10.0.0.1"])
+
+    def test_negative_entry_expires_on_its_own_ttl(self):
+        cache, resolver = self.make({}, ttl=60, negative_ttl=0.05)
+        self.assertIsNone(cache.resolve("10.0.0.9"))
+        self.assertIsNone(cache.get("10.0.0.9"))
+        self.assertEqual(len(resolver.calls), 1)
+        resolver.names["10.0.0.9"] = "printer"
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("10.0.0.9"))  # stale: served as is while it refreshes
+        self.assertTrue(cache.wait(2))
+        self.assertEqual(cache.get("10.0.0.9"), "printer")
+        self.assertEqual(cache.stats["stale"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache, _ = self.make({}, max_entries=2)
+        cache._store("10.0.0.1", "a", 60)
+        cache._store("10.0.0.2", "b", 60)
+        cache.get("10.0.0.1")
+        cache._store("10.0.0.3", "c", 60)
+        self.assertEqual(set(cache.snapshot()), {"10.0.0.1", "10.0.0.3"})
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_seed_from_leases_skips_unnamed_clients(self):
+        workdir = tempfile.mkdtemp(prefix="netmon-test-")
+        self.addCleanup(shutil.rmtree, workdir, True)
+        path = os.path.join(workdir, "dhcp.leases")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("1700000000 aa:bb:cc:dd:ee:01 192.168.1.10 phone 01:aa\n"
+                    "1700000000 aa:bb:cc:dd:ee:02 192.168.1.11 * 01:bb\n")
+        cache, resolver = self.make({})
+        self.assertEqual(cache.seed_from_leases(path), 1)
+        self.assertEqual(cache.get("192.168.1.10"), "phone")
+        self.assertEqual(resolver.calls, [])
+
+    def test_get_after_close_returns_the_fallback(self):
+        cache, resolver = self.make({"10.0.0.1": "laptop"})
+        cache._store("10.0.0.2", "tv", 60)
+        cache.close()
+        self.assertEqual(cache.get("10.0.0.1", "Device-1"), "Device-1")
+        self.assertEqual(cache.resolve("10.0.0.1", timeout=0.1, default="Device-1"), "Device-1")
+        self.assertEqual(cache.get("10.0.0.2"), "tv")
+        self.assertEqual(resolver.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
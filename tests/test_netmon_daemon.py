@@ -0,0 +1,133 @@
+"""API daemon: get_devices ETag/304 and since= deltas, CGI Status handling and failed requests"""
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from api_probe import DEVICES_PATH, ConnectionPool
+from netmon_daemon import NetmonDaemon, body_etag, etag_matches
+from router_emulator import fixture_devices, write_arp_fixture, write_db_fixture
+
+CGI_SCRIPTS = {
+    "bad-status.sh": 'printf "Status: \\r\\nContent-Type: text/plain\\r\\n\\r\\nx"',
+    "created.sh": 'printf "Status: 201 Created\\r\\nContent-Type: text/plain\\r\\n\\r\\nx"',
+}
+
+
+class EtagTest(unittest.TestCase):
+    def test_etag_matching(self):
+        etag = body_etag(b"{}")
+        self.assertEqual(etag, body_etag(b"{}"))
+        self.assertNotEqual(etag, body_etag(b"[]"))
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches(None, etag))
+        self.assertFalse(etag_matches('"other"', etag))
+
+
+class DaemonTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="netmon-test-")
+        self.devices = fixture_devices(5)
+        self.arp_path = os.path.join(self.workdir, "arp")
+        self.db_path = os.path.join(self.workdir, "netmon.db")
+        write_arp_fixture(self.arp_path, self.devices)
+        write_db_fixture(self.db_path, self.devices)
+        www = os.path.join(self.workdir, "www")
+        os.makedirs(os.path.join(www, "cgi-bin"))
+        with open(os.path.join(www, "index.html"), "w", encoding="utf-8") as f:
+            f.write("<html></html>")
+        for name, command in CGI_SCRIPTS.items():
+            path = os.path.join(www, "cgi-bin", name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"#!/bin/sh\n{command}\n")
+            os.chmod(path, 0o755)
+
+        self.daemon = NetmonDaemon("127.0.0.1", 0, self.arp_path, self.db_path, www, interval=3600,
+                                   apply_rules=False, rollup_interval=0, retention_interval=0, arp_interval=0,
+                                   config_path=os.path.join(self.workdir, "netmon"))
+        await self.daemon.start()
+        self.pool = ConnectionPool("127.0.0.1", self.daemon.port, size=1, timeout=10)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        await self.daemon.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def rename(self, ip, hostname):
+        db = sqlite3.connect(self.db_path)
+        try:
+            db.execute("UPDATE advanced_devices SET hostname = ? WHERE ip = ?", (hostname, ip))
+            db.commit()
+        finally:
+            db.close()
+
+    async def get(self, path, headers=None):
+        response = await self.pool.request("GET", path, headers=headers)
+        return response, json.loads(response["body"]) if response["body"] else None
+
+    async def test_unchanged_devices_answer_304(self):
+        response, data = await self.get(DEVICES_PATH)
+        etag = response["headers"]["etag"]
+        self.assertEqual(response["headers"]["cache-control"], "no-cache")
+        self.assertEqual(len(data["devices"]), 5)
+
+        await self.daemon.refresh()  # nothing changed: same version, same ETag
+        response, _ = await self.get(DEVICES_PATH, {"If-None-Match": etag})
+        self.assertEqual(response["status"], 304)
+        self.assertEqual(response["body"], b"")
+
+        self.rename(self.devices[0]["ip"], "renamed")
+        await self.daemon.refresh()
+        response, data = await self.get(DEVICES_PATH, {"If-None-Match": etag})
+        self.assertEqual(response["status"], 200)
+        self.assertNotEqual(response["headers"]["etag"], etag)
+        self.assertIn("renamed", [device["hostname"] for device in data["devices"]])
+
+    async def test_since_returns_only_what_changed(self):
+        _, data = await self.get(DEVICES_PATH)
+        first = data["version"]
+
+        self.rename(self.devices[1]["ip"], "renamed")
+        write_arp_fixture(self.arp_path, self.devices[:4])
+        await self.daemon.refresh()
+        _, delta = await self.get(f"{DEVICES_PATH}&since={first}")
+        self.assertTrue(delta["delta"])
+        self.assertEqual(delta["since"], first)
+        self.assertNotEqual(delta["version"], first)
+        self.assertEqual([d["hostname"] for d in delta["changed"]], ["renamed"])
+        self.assertEqual(delta["added"], [])
+        self.assertEqual(delta["removed"], [self.devices[4]["ip"]])
+        self.assertEqual(delta["changed"][0]["last_seen"], delta["last_seen"])
+
+        _, same = await self.get(f"{DEVICES_PATH}&since={delta['version']}")
+        self.assertEqual((same["added"], same["changed"], same["removed"]), ([], [], []))
+
+    async def test_unknown_since_gets_the_full_list(self):
+        _, data = await self.get(f"{DEVICES_PATH}&since=0.0")
+        self.assertNotIn("delta", data)
+        self.assertEqual(len(data["devices"]), 5)
+
+    async def test_bad_cgi_status_is_a_502(self):
+        response = await self.pool.request("GET", "/cgi-bin/bad-status.sh")
+        self.assertEqual(response["status"], 502)
+        response = await self.pool.request("GET", "/cgi-bin/created.sh")
+        self.assertEqual((response["status"], response["body"]), (201, b"x"))
+
+    async def test_failed_request_is_a_500_and_the_server_stays_up(self):
+        def broken(request):
+            raise RuntimeError("boom")
+        self.daemon.handle_static = broken
+        response = await self.pool.request("GET", "/index.html")
+        self.assertEqual(response["status"], 500)
+        response, data = await self.get(DEVICES_PATH)
+        self.assertEqual(response["status"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Batched retention deletes, held back by the rollup high-water mark"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from netmon_retention import delete_batches, run_retention
+from netmon_rollup import DAY, HOUR, high_water_mark, run_rollup
+from netmon_schema import create_schema
+
+NOW = 1_700_006_400 + 40 * DAY
+
+
+class RetentionTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="netmon-test-")
+        self.db_path = os.path.join(self.workdir, "netmon.db")
+        self.db = sqlite3.connect(self.db_path)
+        create_schema(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def add_traffic(self, timestamps):
+        self.db.executemany("INSERT INTO traffic (ip, url, timestamp, bytes_sent, bytes_received) "
+                            "VALUES ('192.168.1.2', 'example.com', ?, 1, 2)", [(t,) for t in timestamps])
+        self.db.commit()
+
+    def count(self, table):
+        return self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_rows_past_the_mark_are_kept(self):
+        old = NOW - 2 * DAY
+        self.add_traffic([old + i for i in range(10)])
+        run_rollup(self.db_path)
+        self.add_traffic([old + 100 + i for i in range(5)])  # just as old, but not rolled up yet
+        guard = high_water_mark(self.db, "traffic")
+        deleted = delete_batches(self.db, "traffic", "timestamp", NOW - HOUR, guard, batch=3)
+        self.assertEqual(deleted, 10)
+        self.assertEqual(self.count("traffic"), 5)
+        self.assertEqual(self.db.execute("SELECT MIN(id) FROM traffic").fetchone()[0], guard + 1)
+
+    def test_batches_stop_at_max_batches(self):
+        self.add_traffic([NOW - 2 * DAY + i for i in range(10)])
+        self.assertEqual(delete_batches(self.db, "traffic", "timestamp", NOW, batch=3, max_batches=2), 6)
+        self.assertEqual(self.count("traffic"), 4)
+
+    def test_run_retention_keeps_the_summaries(self):
+        self.add_traffic([NOW - 2 * DAY + i * 60 for i in range(20)] + [NOW - 60 * i for i in range(5)])
+        report = run_retention(self.db_path, {"raw_retention_hours": 24, "max_db_size_mb": 0}, now=NOW)
+        self.assertEqual(report["rolled_up"]["traffic"], 25)
+        self.assertEqual(report["deleted"], {"traffic": 20})
+        self.assertEqual(self.count("traffic"), 5)
+        totals = self.db.execute("SELECT SUM(bytes_sent), SUM(bytes_received) FROM traffic_daily").fetchone()
+        self.assertEqual(totals, (25, 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Rollup high-water mark, overlapping passes and the rollup/raw split of report totals"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import netmon_rollup
+from netmon_rollup import DAY, high_water_mark, run_rollup, traffic_totals
+from netmon_schema import create_schema
+
+START = 1_700_006_400  # midnight UTC
+
+
+class RollupTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="netmon-test-")
+        self.db_path = os.path.join(self.workdir, "netmon.db")
+        self.db = sqlite3.connect(self.db_path)
+        create_schema(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def add_traffic(self, rows):
+        """rows of (timestamp, bytes_sent, bytes_received) for one device and domain"""
+        self.db.executemany("INSERT INTO traffic (ip, url, timestamp, bytes_sent, bytes_received) "
+                            "VALUES ('192.168.1.2', 'example.com', ?, ?, ?)", rows)
+        self.db.commit()
+
+    def daily(self):
+        return self.db.execute("SELECT SUM(bytes_sent), SUM(bytes_received), SUM(packets) "
+                               "FROM traffic_daily").fetchone()
+
+    def test_pass_folds_each_row_once(self):
+        self.add_traffic([(START + i * 60, 1, 1) for i in range(10)])
+        summary = run_rollup(self.db_path, batch_rows=3)
+        self.assertEqual(summary["ids"]["traffic"], 10)
+        self.assertEqual(self.daily(), (10, 10, 10))
+
+        self.add_traffic([(START + 3600, 5, 7)])
+        summary = run_rollup(self.db_path)
+        self.assertEqual(summary["ids"]["traffic"], 1)
+        self.assertEqual(self.daily(), (15, 17, 11))
+        self.assertEqual(high_water_mark(self.db, "traffic"), 11)
+
+    def test_overlapping_passes_do_not_double_count(self):
+        self.add_traffic([(START + i * 60, 1, 1) for i in range(10)])
+        real_mark = netmon_rollup.high_water_mark
+        reads, overlapped = [], []
+
+        def mark_then_overlap(db, source):
+            mark = real_mark(db, source)
+            if source == "traffic":
+                reads.append(mark)
+                # The 2nd read is roll_up_source's own; a second pass (the retention
+                # loop's) then runs to completion before this one writes
+                if len(reads) == 2:
+                    overlapped.append(run_rollup(self.db_path))
+            return mark
+
+        with mock.patch.object(netmon_rollup, "high_water_mark", mark_then_overlap):
+            run_rollup(self.db_path)
+        self.assertEqual(overlapped[0]["ids"]["traffic"], 10)
+        self.assertEqual(self.daily(), (10, 10, 10))
+        self.assertEqual(real_mark(self.db, "traffic"), 10)
+
+    def test_totals_split_matches_raw_sums(self):
+        # Two partial days around a whole one, half rolled up and half past the mark
+        rows = [(START - 3600 + i * 1800, i, 2 * i) for i in range(2 * 24 + 4)]
+        self.add_traffic(rows[:30])
+        run_rollup(self.db_path)
+        self.add_traffic(rows[30:])
+        start, end = START - 1800, START + DAY + 3600
+        expected = [(sent, received) for ts, sent, received in rows if start <= ts <= end]
+        download, upload, websites = traffic_totals(self.db, start, end)
+        self.assertEqual((download, upload), (sum(r for _, r in expected), sum(s for s, _ in expected)))
+        self.assertEqual(websites, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()